@@ -1,7 +1,13 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 from config import config
 from models import init_db
+from services.refresh_queue import init_refresh_queue
+from services.write_behind import init_write_buffer
+from services.metrics import init_metrics
+from services.tracing import init_tracing
+from services.warmup import init_warmup
+from cli import register_cli
 from datetime import datetime
 import os
 
@@ -21,14 +27,30 @@ def create_app(config_name=None):
     # Enable CORS for React frontend
     CORS(app, origins=['http://localhost:3000', 'http://127.0.0.1:3000'])
 
-    # Initialize database
+    # Request latency, status, response size and SQL statement metrics
+    metrics = init_metrics(app)
+    init_tracing(app, metrics)
+
+    # Initialize database (schema and sample data come from `flask schema create` / `flask data seed`)
     init_db(app)
 
+    # Start the background worker that refreshes recommendations after interactions
+    init_refresh_queue(app)
+
+    # Optional write-behind buffering for view/click events
+    init_write_buffer(app)
+
     # Register blueprints
     app.register_blueprint(products_bp, url_prefix='/api/products')
     app.register_blueprint(users_bp, url_prefix='/api/users')
     app.register_blueprint(recommendations_bp, url_prefix='/api/recommendations')
 
+    # Register CLI commands (flask recommend ...)
+    register_cli(app)
+
+    # Optionally load numpy/scipy/sklearn and the shared models now rather than on the first request
+    init_warmup(app)
+
     @app.route('/api/health')
     def health_check():
         """Health check endpoint"""
@@ -38,6 +60,13 @@ def create_app(config_name=None):
             'timestamp': datetime.now().isoformat()
         })
 
+    @app.route('/api/metrics')
+    def metrics_endpoint():
+        """Request metrics in Prometheus text format"""
+        if metrics is None:
+            return jsonify({'error': 'Metrics are disabled'}), 404
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
     @app.errorhandler(404)
     def not_found(error):
         return jsonify({'error': 'Endpoint not found'}), 404
@@ -0,0 +1,144 @@
+"""Recall and latency of the IVF approximate index against brute force.
+
+Indexes seeded, clustered unit vectors (power-law cluster sizes plus noise)
+and compares top-k search over a range of nprobe values with an exact scan,
+including vectors inserted after the build. With --catalog it also builds
+the content index's neighbour lists for a synthetic catalog both ways:
+
+    python -m benchmarks.bench_ann --sizes 100000 500000 --nprobe 1 4 8 16 32
+    python -m benchmarks.bench_ann --sizes 100000 --catalog 100000
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def clustered_vectors(n, dim, clusters, noise, rng):
+    weights = 1.0 / np.arange(1, clusters + 1)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centers[rng.choice(clusters, n, p=weights / weights.sum())]
+    vectors += noise * rng.standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def recall_at_k(found, exact_scores, k):
+    """Share of returned results scoring at least the true kth score (ties count as hits)"""
+    kth = np.sort(exact_scores, axis=1)[:, -k][:, None]
+    return float(np.mean(np.sum(found >= kth - 1e-5, axis=1) / k))
+
+def exact_top_scores(vectors, queries, k, chunk_size=100):
+    top = np.empty((len(queries), k), dtype=np.float32)
+    for start in range(0, len(queries), chunk_size):
+        scores = queries[start:start + chunk_size] @ vectors.T
+        top[start:start + chunk_size] = np.take_along_axis(scores, np.argpartition(-scores, k - 1, axis=1)[:, :k], axis=1)
+    return top
+
+def bench_vectors(n, args):
+    from services.ann_index import IVFIndex
+
+    rng = np.random.default_rng(args.seed)
+    vectors = clustered_vectors(n + args.queries, args.dim, args.clusters, args.noise, rng)
+    queries, vectors = vectors[:args.queries], vectors[args.queries:]
+    inserted = int(n * args.insert_fraction)
+    base = n - inserted
+    k = args.k
+
+    start = time.perf_counter()
+    for query in queries[:args.latency_queries]:
+        scores = vectors @ query
+        np.argpartition(-scores, k - 1)[:k]
+    brute_ms = (time.perf_counter() - start) / args.latency_queries * 1000
+    exact = exact_top_scores(vectors, queries, k)
+
+    start = time.perf_counter()
+    index = IVFIndex(nlist=args.nlist, nprobe=args.nprobe[0], seed=args.seed).build(vectors[:base])
+    build_s = time.perf_counter() - start
+    start = time.perf_counter()
+    for offset in range(base, n, args.insert_batch):
+        index.add(vectors[offset:offset + args.insert_batch])
+    insert_ms = (time.perf_counter() - start) / max(1, inserted) * 1000
+    stats = index.stats()
+
+    print(f"\n{n} vectors x {args.dim} dims: built on {base} in {build_s:.2f}s, {inserted} inserted after "
+          f"({insert_ms:.4f} ms/vector in batches of {args.insert_batch}); nlist={stats['nlist']}, "
+          f"lists {stats['min_list']}-{stats['max_list']} (mean {stats['mean_list']})")
+    print(f"{'nprobe':>8} {'recall@' + str(k):>10} {'mean_ms':>9} {'p95_ms':>9} {'speedup':>8} {'batch_recall':>13} {'batch_ms/q':>11}")
+    for nprobe in args.nprobe:
+        timings, scores = [], []
+        for query in queries:
+            start = time.perf_counter()
+            scores.append(index.search(query[None], k, nprobe=nprobe)[1][0])
+            timings.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        _, batch_scores = index.search(queries, k, nprobe=nprobe)
+        batch_ms = (time.perf_counter() - start) / len(queries) * 1000
+        mean_ms = sum(timings) / len(timings) * 1000
+        print(f"{nprobe:>8} {recall_at_k(np.array(scores), exact, k):>10.3f} {mean_ms:>9.3f} "
+              f"{percentile(timings, 0.95) * 1000:>9.3f} {brute_ms / mean_ms:>7.1f}x "
+              f"{recall_at_k(batch_scores, exact, k):>13.3f} {batch_ms:>11.4f}")
+    print(f"{'brute':>8} {1.0:>10.3f} {brute_ms:>9.3f}")
+
+def bench_catalog(args):
+    from app import create_app
+    from models.database import create_schema, populate_sample_data
+    from models import db
+    from services.content_index import ContentIndex
+    from services.synthetic_data import generate_synthetic_data
+
+    app = create_app()
+    with app.app_context():
+        create_schema()
+        populate_sample_data()
+    with app.app_context():
+        generate_synthetic_data(100, args.catalog, 1000, seed=args.seed, echo=lambda message: None)
+        # Approximate builds first: the exact build's dense score blocks are large enough to skew later timings
+        approx = {}
+        for nprobe in args.nprobe:
+            start = time.perf_counter()
+            index = ContentIndex(ann_min_products=0, ann_nlist=args.nlist, ann_nprobe=nprobe).build()
+            approx[nprobe] = (time.perf_counter() - start, index.neighbors)
+        start = time.perf_counter()
+        exact = ContentIndex(ann_min_products=float('inf')).build()
+        exact_s = time.perf_counter() - start
+        db.session.remove()
+
+    print(f"\nContent index for {args.catalog} products: exact neighbour lists in {exact_s:.1f}s")
+    print(f"{'nprobe':>8} {'build_s':>9} {'speedup':>8} {'recall@' + str(exact.top_k):>10}")
+    truth = exact.neighbors
+    for nprobe, (build_s, neighbors) in approx.items():
+        recalls = []
+        for row in range(0, args.catalog, max(1, args.catalog // 2000)):
+            expected = truth.data[truth.indptr[row]:truth.indptr[row + 1]]
+            if len(expected) == 0:
+                continue
+            found = neighbors.data[neighbors.indptr[row]:neighbors.indptr[row + 1]]
+            recalls.append(min(1.0, np.sum(found >= expected.min() - 1e-5) / len(expected)))
+        print(f"{nprobe:>8} {build_s:>9.1f} {exact_s / build_s:>7.1f}x {np.mean(recalls):>10.3f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100000])
+    parser.add_argument('--dim', type=int, default=64)
+    parser.add_argument('--clusters', type=int, default=200, help='mixture components in the synthetic vectors')
+    parser.add_argument('--noise', type=float, default=1.0, help='noise scale relative to the cluster centres')
+    parser.add_argument('--nlist', type=int, default=None, help='default: sqrt(size)')
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 4, 8, 16, 32])
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--latency-queries', type=int, default=200, help='queries timed for the brute-force baseline')
+    parser.add_argument('--insert-fraction', type=float, default=0.1, help='share of vectors added after the build')
+    parser.add_argument('--insert-batch', type=int, default=100)
+    parser.add_argument('--catalog', type=int, default=0, help='also benchmark content index builds for this many products')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    # Before anything imports config
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_ann.db')}"
+    for size in args.sizes:
+        bench_vectors(size, args)
+    if args.catalog:
+        bench_catalog(args)
@@ -0,0 +1,122 @@
+"""Per-worker load time and memory of saved model artifacts.
+
+Builds and saves the content index and MF model for a synthetic catalog,
+then forks N worker processes per mode that each load them and touch every
+page (as serving eventually does), and reports load time and the memory
+each worker added once all N are up:
+
+- mmap:    artifacts memory-mapped read-only (ARTIFACT_MMAP=true)
+- copy:    artifacts read into private memory (ARTIFACT_MMAP=false)
+- rebuild: no artifacts, every worker builds the content index itself
+
+PSS divides shared pages between the processes mapping them, so its total
+is what the workers really cost together; RSS counts shared pages in full:
+
+    python -m benchmarks.bench_artifacts --products 20000 --workers 4
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+import numpy as np
+
+def memory_kb():
+    """(pss, rss) of this process in kB"""
+    values = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            name, _, rest = line.partition(':')
+            if name in ('Pss', 'Rss'):
+                values[name] = int(rest.split()[0])
+    return values['Pss'], values['Rss']
+
+def touch(arrays):
+    for array in arrays:
+        float(np.asarray(array).sum())
+
+def worker(app, mode, barrier, results):
+    from models import db
+    from services.content_index import ContentIndex
+    from services.matrix_factorization import ImplicitMatrixFactorization
+
+    with app.app_context():
+        db.engine.dispose()  # connections are not shared across fork
+        # Baseline once every worker has forked, so pages inherited from the parent are already split
+        barrier.wait()
+        base_pss, base_rss = memory_kb()
+        start = time.perf_counter()
+        if mode == 'rebuild':
+            index, model = ContentIndex().build(), None
+        else:
+            mmap = mode == 'mmap'
+            index = ContentIndex.load(app.config['CONTENT_INDEX_DIR'], mmap=mmap)
+            model = ImplicitMatrixFactorization.load(app.config['MF_MODEL_DIR'], mmap=mmap)
+        load_s = time.perf_counter() - start
+
+        touch([index.product_ids, index.neighbors.data, index.neighbors.indices, index.tfidf_matrix.data])
+        if model is not None:
+            touch([model.user_factors, model.item_factors, model.seen.data, model.seen.indices])
+        # Measure only once every worker holds its copy, so shared pages are split between them
+        barrier.wait()
+        pss, rss = memory_kb()
+        results.put((load_s, (pss - base_pss) / 1024, (rss - base_rss) / 1024))
+        barrier.wait()
+
+def run_mode(app, mode, workers):
+    context = multiprocessing.get_context('fork')
+    barrier, results = context.Barrier(workers), context.Queue()
+    processes = [context.Process(target=worker, args=(app, mode, barrier, results)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    rows = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    load_s, pss, rss = (np.array(column) for column in zip(*rows))
+    print(f"{mode:>8} {load_s.mean():>10.3f} {pss.mean():>10.1f} {rss.mean():>10.1f} {pss.sum():>10.1f}")
+
+def run(args):
+    directory = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(directory, 'bench_artifacts.db')}"
+    os.environ['MF_MODEL_DIR'] = os.path.join(directory, 'mf')
+    os.environ['CONTENT_INDEX_DIR'] = os.path.join(directory, 'content')
+
+    from app import create_app
+    from models.database import create_schema, populate_sample_data
+    from models import db
+    from services.content_index import ContentIndex
+    from services.matrix_factorization import ImplicitMatrixFactorization
+    from services.synthetic_data import generate_synthetic_data
+
+    app = create_app()
+    with app.app_context():
+        create_schema()
+        populate_sample_data()
+    with app.app_context():
+        generate_synthetic_data(args.users, args.products, args.interactions, seed=args.seed, echo=lambda message: None)
+        start = time.perf_counter()
+        index = ContentIndex().build()
+        index.save(app.config['CONTENT_INDEX_DIR'])
+        model = ImplicitMatrixFactorization.train_from_database(factors=args.factors, iterations=5)
+        model.save(app.config['MF_MODEL_DIR'])
+        print(f"Saved content index ({len(index.product_ids)} products, {index.neighbors.nnz} neighbour pairs) "
+              f"and MF model ({len(model.user_ids)} users x {args.factors} factors) in {time.perf_counter() - start:.1f}s")
+        del index, model
+        db.session.remove()
+        db.engine.dispose()
+
+    print(f"\n{args.workers} workers per mode; memory is what each worker added after loading, in MB")
+    print(f"{'mode':>8} {'load_s':>10} {'pss':>10} {'rss':>10} {'total_pss':>10}")
+    for mode in args.modes:
+        run_mode(app, mode, args.workers)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--products', type=int, default=20000)
+    parser.add_argument('--interactions', type=int, default=500000)
+    parser.add_argument('--factors', type=int, default=64)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--modes', nargs='+', default=['mmap', 'copy', 'rebuild'], choices=['mmap', 'copy', 'rebuild'])
+    parser.add_argument('--seed', type=int, default=42)
+    run(parser.parse_args())
@@ -0,0 +1,95 @@
+"""Compare the legacy pandas pivot collaborative filter with the sparse CSR backend.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_collaborative --sizes 10000 100000 1000000
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from sklearn.metrics.pairwise import cosine_similarity
+from services.collaborative import SparseCollaborativeFilter
+
+def make_ratings(num_interactions, users_per_interaction=0.05, products_per_interaction=0.01, seed=42):
+    """Synthetic (user, product, rating) triples with power-law user and product activity"""
+    rng = np.random.default_rng(seed)
+    num_users = max(10, int(num_interactions * users_per_interaction))
+    num_products = max(10, int(num_interactions * products_per_interaction))
+
+    users = np.minimum(rng.zipf(1.3, num_interactions), num_users) - 1
+    products = np.minimum(rng.zipf(1.2, num_interactions), num_products) - 1
+    users = rng.permutation(num_users)[users] + 1
+    products = rng.permutation(num_products)[products] + 1
+    ratings = rng.integers(1, 6, num_interactions).astype(np.float32)
+
+    # One averaged rating per (user, product) pair, like the SQL GROUP BY
+    df = pd.DataFrame({'user_id': users, 'product_id': products, 'rating': ratings})
+    return df.groupby(['user_id', 'product_id'], as_index=False)['rating'].mean()
+
+def legacy_collaborative(df, user_id, num_recommendations=5):
+    """The pre-sparse implementation: dense pivot plus a full users x users similarity"""
+    user_item_matrix = df.pivot_table(index='user_id', columns='product_id', values='rating', fill_value=0)
+    if user_id not in user_item_matrix.index:
+        return []
+
+    user_similarities = cosine_similarity(user_item_matrix)
+    user_sim_df = pd.DataFrame(user_similarities, index=user_item_matrix.index, columns=user_item_matrix.index)
+    similar_users = user_sim_df[user_id].sort_values(ascending=False)[1:6]
+
+    user_products = set(df[df['user_id'] == user_id]['product_id'].tolist())
+    unique_recs = {}
+    for similar_user_id, similarity in similar_users.items():
+        if similarity < 0.1:
+            continue
+        liked = df[(df['user_id'] == similar_user_id) & (df['rating'] >= 4)]['product_id'].tolist()
+        for product_id in liked:
+            if product_id not in user_products:
+                score = similarity * 0.8
+                if product_id not in unique_recs or score > unique_recs[product_id]:
+                    unique_recs[product_id] = score
+
+    return sorted(unique_recs.items(), key=lambda x: x[1], reverse=True)[:num_recommendations]
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def run(sizes, queries, max_dense_gb):
+    print(f"{'interactions':>12} {'users':>8} {'products':>9} {'path':>8} {'build_s':>9} {'query_ms':>9}")
+    for size in sizes:
+        df = make_ratings(size)
+        num_users = df['user_id'].nunique()
+        num_products = df['product_id'].nunique()
+        sample_users = df['user_id'].drop_duplicates().sample(min(queries, num_users), random_state=0).tolist()
+
+        model, build_time = timed(
+            SparseCollaborativeFilter.from_arrays,
+            df['user_id'].to_numpy(), df['product_id'].to_numpy(), df['rating'].to_numpy()
+        )
+        _, query_time = timed(lambda: [model.recommend(u) for u in sample_users])
+        print(f"{size:>12} {num_users:>8} {num_products:>9} {'sparse':>8} {build_time:>9.3f} "
+              f"{query_time / len(sample_users) * 1000:>9.2f}")
+
+        # The legacy path holds a dense users x products pivot and a users x users similarity matrix
+        dense_gb = (num_users * num_users + num_users * num_products) * 8 / 1e9
+        if dense_gb > max_dense_gb:
+            print(f"{size:>12} {num_users:>8} {num_products:>9} {'pandas':>8} "
+                  f"{'skipped':>9} (needs ~{dense_gb:.1f} GB dense)")
+            continue
+
+        legacy_queries = sample_users[:max(1, min(3, len(sample_users)))]
+        _, legacy_time = timed(lambda: [legacy_collaborative(df, u) for u in legacy_queries])
+        # Every legacy call rebuilds the pivot, so build and query cost are the same number
+        print(f"{size:>12} {num_users:>8} {num_products:>9} {'pandas':>8} {'-':>9} "
+              f"{legacy_time / len(legacy_queries) * 1000:>9.2f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--queries', type=int, default=20, help='users scored per size')
+    parser.add_argument('--max-dense-gb', type=float, default=4.0,
+                        help='skip the pandas path when its dense matrices exceed this size')
+    args = parser.parse_args()
+    run(args.sizes, args.queries, args.max_dense_gb)
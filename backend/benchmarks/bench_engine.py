@@ -0,0 +1,195 @@
+"""Per-stage timing and peak memory for RecommendationEngine on synthetic data.
+
+Generates a seeded power-law dataset in a throwaway SQLite database (or
+reuses --database-url), then times each engine stage and records its peak
+traced memory. The per-stage numbers use a pinned model and content index;
+the served stages go through the shared ones with the same per-request
+sync and freshness checks as the routes, with and without a rating written
+before each call. Results are written as JSON so runs can be compared
+across commits:
+
+    python -m benchmarks.bench_engine --interactions 1000000 --output before.json
+    python -m benchmarks.bench_engine --interactions 1000000 --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+def summarize(durations, peak_bytes):
+    durations = sorted(durations)
+    return {
+        'calls': len(durations),
+        'mean_ms': round(sum(durations) / len(durations) * 1000, 3),
+        'p50_ms': round(durations[len(durations) // 2] * 1000, 3),
+        'p95_ms': round(durations[min(len(durations) - 1, int(len(durations) * 0.95))] * 1000, 3),
+        'max_ms': round(durations[-1] * 1000, 3),
+        'peak_mb': round(peak_bytes / 1e6, 2) if peak_bytes is not None else None
+    }
+
+def measure(fn, inputs, memory_samples):
+    """Time fn over every input, then re-run a few inputs under tracemalloc for peak memory"""
+    durations = []
+    for value in inputs:
+        start = time.perf_counter()
+        fn(value)
+        durations.append(time.perf_counter() - start)
+
+    peak = None
+    if memory_samples:
+        tracemalloc.start()
+        for value in inputs[:memory_samples]:
+            tracemalloc.reset_peak()
+            fn(value)
+            peak = max(peak or 0, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return summarize(durations, peak)
+
+def run(args):
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    else:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_engine.db')}"
+
+    from app import create_app
+    from models.database import create_schema, populate_sample_data
+    from models import db, Interaction, Product, User
+    from services import RecommendationEngine
+    from services.content_index import ContentIndex
+    from services.popularity import get_popularity_service
+    from services.synthetic_data import generate_synthetic_data
+    from services.user_item_model import UserItemModel, get_user_item_model
+
+    app = create_app()
+    with app.app_context():
+        create_schema()
+        populate_sample_data()
+    results = {
+        'commit': git_commit(),
+        'created_at': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'args': vars(args),
+        'stages': {}
+    }
+    stages = results['stages']
+    memory_samples = 0 if args.no_memory else args.memory_samples
+
+    with app.app_context():
+        if not args.database_url:
+            users = args.users or max(100, args.interactions // 20)
+            products = args.products or max(50, args.interactions // 200)
+            start = time.perf_counter()
+            results['data'] = generate_synthetic_data(users, products, args.interactions, seed=args.seed, echo=lambda message: None)
+            stages['generate_data'] = summarize([time.perf_counter() - start], None)
+        results['rows'] = {
+            'users': User.query.count(),
+            'interactions': Interaction.query.count()
+        }
+        print(f"Dataset: {results['rows']['users']} users, {results['rows']['interactions']} interactions")
+
+        # Build stages run once each
+        stages['model_load'] = measure(lambda _: UserItemModel().load(), [None], memory_samples and 1)
+        model = UserItemModel().load()
+        stages['collaborative_build'] = measure(
+            lambda _: (setattr(model, '_collaborative', None), model.collaborative_filter()), [None], memory_samples and 1
+        )
+        stages['content_index_build'] = measure(lambda _: ContentIndex().build(), [None], memory_samples and 1)
+        content_index = ContentIndex().build()
+        stages['popularity_load'] = measure(
+            lambda _: (get_popularity_service().invalidate(), get_popularity_service().top(10)), [None], memory_samples and 1
+        )
+
+        # Per-user stages over a seeded sample of users with enough history for the hybrid path
+        engine = RecommendationEngine(model=model, content_index=content_index)
+        eligible = [user_id for user_id, count in model.user_interaction_counts.items() if count >= engine.min_interactions]
+        sample = random.Random(args.seed).sample(eligible, min(args.sample_users, len(eligible)))
+        results['sampled_users'] = len(sample)
+        n = args.count
+
+        stages['collaborative'] = measure(lambda user_id: engine._collaborative_filtering(user_id, n), sample, memory_samples)
+        stages['content_based'] = measure(lambda user_id: engine._content_based_filtering(user_id, n), sample, memory_samples)
+        stages['popular'] = measure(lambda user_id: engine._get_popular_recommendations(user_id, n), sample, memory_samples)
+        candidates = {
+            user_id: (engine._collaborative_filtering(user_id, n), engine._content_based_filtering(user_id, n))
+            for user_id in sample
+        }
+        stages['combine'] = measure(lambda user_id: engine._combine_recommendations(*candidates[user_id], n), sample, memory_samples)
+        stages['generate_recommendations'] = measure(lambda user_id: engine.generate_recommendations(user_id, n), sample, memory_samples)
+        generated = {user_id: engine.generate_recommendations(user_id, n) for user_id in sample}
+        stages['save_recommendations'] = measure(
+            lambda user_id: engine.save_recommendations(user_id, generated[user_id]), sample, memory_samples
+        )
+
+        # The served path: shared model and content index, synced and freshness-checked per call like the routes
+        served = RecommendationEngine()
+        served.generate_recommendations(sample[0], n)  # loads the shared model and index outside the timings
+        stages['sync_model'] = measure(lambda _: get_user_item_model().sync(), sample, memory_samples)
+        stages['generate_served'] = measure(lambda user_id: served.generate_recommendations(user_id, n), sample, memory_samples)
+        if not args.database_url:
+            # One rating committed before each call, as under write traffic; never on a database we did not generate
+            rng = random.Random(args.seed)
+            product_ids = [product_id for (product_id,) in db.session.query(Product.id)]
+            stages['rate_then_generate_served'] = measure(lambda user_id: (
+                Interaction.create_interaction(user_id, rng.choice(product_ids), 'rating', rng.randint(1, 5)),
+                served.generate_recommendations(user_id, n)
+            ), sample, memory_samples)
+        db.session.remove()
+
+    print(f"{'stage':<26} {'calls':>6} {'mean_ms':>10} {'p50_ms':>10} {'p95_ms':>10} {'peak_mb':>8}")
+    for name, stage in stages.items():
+        peak = f"{stage['peak_mb']:>8.2f}" if stage['peak_mb'] is not None else f"{'-':>8}"
+        print(f"{name:<26} {stage['calls']:>6} {stage['mean_ms']:>10.3f} {stage['p50_ms']:>10.3f} {stage['p95_ms']:>10.3f} {peak}")
+    return results
+
+def compare(results, baseline_path):
+    """Print mean time and peak memory ratios against an earlier results file"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path} (commit {baseline.get('commit')}); ratio < 1 is faster/smaller")
+    print(f"{'stage':<26} {'mean_ms':>10} {'baseline':>10} {'ratio':>7} {'mem_ratio':>10}")
+    for name, stage in results['stages'].items():
+        before = baseline.get('stages', {}).get(name)
+        if not before:
+            continue
+        ratio = stage['mean_ms'] / before['mean_ms'] if before['mean_ms'] else float('inf')
+        mem_ratio = (
+            f"{stage['peak_mb'] / before['peak_mb']:>10.2f}"
+            if stage['peak_mb'] and before.get('peak_mb') else f"{'-':>10}"
+        )
+        print(f"{name:<26} {stage['mean_ms']:>10.3f} {before['mean_ms']:>10.3f} {ratio:>7.2f} {mem_ratio}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--interactions', type=int, default=100000)
+    parser.add_argument('--users', type=int, default=None, help='default: interactions / 20')
+    parser.add_argument('--products', type=int, default=None, help='default: interactions / 200')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database-url', default=None, help='benchmark an existing database instead of generating one')
+    parser.add_argument('--sample-users', type=int, default=50)
+    parser.add_argument('--count', type=int, default=5, help='recommendations per user')
+    parser.add_argument('--memory-samples', type=int, default=3, help='inputs re-run under tracemalloc per stage')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc passes')
+    parser.add_argument('--output', default=None, help='write JSON results to this path')
+    parser.add_argument('--compare', default=None, help='JSON results from an earlier run to compare against')
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
@@ -0,0 +1,66 @@
+"""Load-test batched explanation generation against the local LLM stub.
+
+Starts the stub in-process and reports batch latency percentiles and
+template fallbacks for each concurrency level.
+
+    python -m benchmarks.bench_llm_batch --concurrency 1 4 16 --batch-size 10 --tail-rate 0.05
+"""
+import argparse
+import threading
+import time
+from config import Config
+from benchmarks.llm_stub_server import make_server
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def run(args):
+    server = make_server(port=0, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                         tail_ms=args.tail_ms, tail_rate=args.tail_rate, error_rate=args.error_rate, seed=1)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    Config.LLM_PROVIDER = 'stub'
+    Config.LLM_STUB_URL = f"http://127.0.0.1:{server.server_address[1]}/explain"
+    Config.LLM_CALL_TIMEOUT = args.call_timeout
+    Config.LLM_BATCH_DEADLINE = args.deadline
+    Config.LLM_CACHE_PATH = None
+
+    from services.llm_service import LLMService
+
+    print(f"{'concurrency':>11} {'p50_ms':>8} {'p95_ms':>8} {'p99_ms':>8} {'max_ms':>8} {'fallbacks':>10}")
+    for concurrency in args.concurrency:
+        Config.LLM_MAX_CONCURRENCY = concurrency
+        service = LLMService()
+        timings, fallbacks = [], 0
+        for batch in range(args.batches):
+            # A distinct user segment per batch keeps every lookup a cache miss
+            profile = {'favorite_categories': [f'segment-{concurrency}-{batch}']}
+            items = [
+                ({'id': i, 'name': f'Product {i}', 'category': 'Electronics', 'price': 10.0},
+                 {'algorithm': 'hybrid'})
+                for i in range(args.batch_size)
+            ]
+            start = time.perf_counter()
+            explanations = service.generate_explanations(profile, items)
+            timings.append(time.perf_counter() - start)
+            fallbacks += sum(not explanation.startswith('[stub]') for explanation in explanations)
+
+        print(f"{concurrency:>11} {percentile(timings, 0.5) * 1000:>8.0f} {percentile(timings, 0.95) * 1000:>8.0f} "
+              f"{percentile(timings, 0.99) * 1000:>8.0f} {max(timings) * 1000:>8.0f} {fallbacks:>10}")
+
+    server.shutdown()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--batches', type=int, default=20)
+    parser.add_argument('--batch-size', type=int, default=10)
+    parser.add_argument('--latency-ms', type=float, default=100)
+    parser.add_argument('--jitter-ms', type=float, default=30)
+    parser.add_argument('--tail-ms', type=float, default=2000)
+    parser.add_argument('--tail-rate', type=float, default=0.05)
+    parser.add_argument('--error-rate', type=float, default=0.02)
+    parser.add_argument('--call-timeout', type=float, default=0.5)
+    parser.add_argument('--deadline', type=float, default=1.5)
+    run(parser.parse_args())
@@ -0,0 +1,106 @@
+"""Compare the implicit MF model with the hybrid path on synthetic data.
+
+Holds out one positive interaction (purchase, favorite or a 4-5 star
+rating) for a sample of users, trains both on the rest, and reports
+leave-one-out hit rate@k and per-user serving latency for MF, hybrid and
+popularity:
+
+    python -m benchmarks.bench_mf --interactions 1000000 --sample-users 500
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def run(args):
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_mf.db')}"
+
+    from sqlalchemy import delete, tuple_
+    from app import create_app
+    from models.database import create_schema, populate_sample_data
+    from models import db, Interaction, ProductStats, UserStats
+    from services import RecommendationEngine
+    from services.content_index import ContentIndex
+    from services.matrix_factorization import ImplicitMatrixFactorization
+    from services.popularity import get_popularity_service
+    from services.synthetic_data import generate_synthetic_data
+    from services.user_item_model import UserItemModel
+
+    app = create_app()
+    with app.app_context():
+        create_schema()
+        populate_sample_data()
+    with app.app_context():
+        users = args.users or max(100, args.interactions // 20)
+        products = args.products or max(50, args.interactions // 200)
+        generate_synthetic_data(users, products, args.interactions, seed=args.seed, echo=lambda message: None)
+
+        # One held-out positive per sampled user; all of that user's rows for the product are removed
+        positives = db.session.query(Interaction.user_id, Interaction.product_id).filter(
+            Interaction.interaction_type.in_(['purchase', 'favorite']) |
+            ((Interaction.interaction_type == 'rating') & (Interaction.rating >= 4))
+        ).all()
+        by_user = {}
+        for user_id, product_id in positives:
+            by_user.setdefault(user_id, []).append(product_id)
+        rng = random.Random(args.seed)
+        candidates = sorted(user_id for user_id, items in by_user.items() if len(items) >= 2)
+        held_out = {user_id: rng.choice(by_user[user_id])
+                    for user_id in rng.sample(candidates, min(args.sample_users, len(candidates)))}
+        pairs = list(held_out.items())
+        for start in range(0, len(pairs), 500):
+            db.session.execute(delete(Interaction).where(
+                tuple_(Interaction.user_id, Interaction.product_id).in_(pairs[start:start + 500])
+            ))
+        db.session.commit()
+        ProductStats.rebuild()
+        UserStats.rebuild()
+        get_popularity_service().invalidate()
+        print(f"Held out {len(held_out)} positives; {Interaction.query.count()} training interactions")
+
+        start = time.perf_counter()
+        mf_model = ImplicitMatrixFactorization.train_from_database(
+            factors=args.factors, iterations=args.iterations, alpha=args.alpha, regularization=args.regularization
+        )
+        print(f"MF trained in {time.perf_counter() - start:.1f}s ({args.factors} factors, {args.iterations} iterations)")
+
+        start = time.perf_counter()
+        engine = RecommendationEngine(model=UserItemModel().load(), content_index=ContentIndex().build(), algorithm='hybrid')
+        print(f"Hybrid model and content index built in {time.perf_counter() - start:.1f}s")
+
+        paths = {
+            'mf': lambda user_id: mf_model.recommend(user_id, args.k),
+            'hybrid': lambda user_id: engine.generate_recommendations(user_id, args.k),
+            'popularity': lambda user_id: engine._get_popular_recommendations(user_id, args.k)
+        }
+        print(f"\n{'algorithm':<12} {'hit_rate@' + str(args.k):>12} {'mean_ms':>9} {'p95_ms':>9} {'empty':>6}")
+        for name, recommend in paths.items():
+            hits, empty, timings = 0, 0, []
+            for user_id, product_id in held_out.items():
+                start = time.perf_counter()
+                recommendations = recommend(user_id)
+                timings.append(time.perf_counter() - start)
+                hits += any(rec['product_id'] == product_id for rec in recommendations)
+                empty += not recommendations
+            print(f"{name:<12} {hits / len(held_out):>12.3f} {sum(timings) / len(timings) * 1000:>9.3f} "
+                  f"{percentile(timings, 0.95) * 1000:>9.3f} {empty:>6}")
+        db.session.remove()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--interactions', type=int, default=200000)
+    parser.add_argument('--users', type=int, default=None, help='default: interactions / 20')
+    parser.add_argument('--products', type=int, default=None, help='default: interactions / 200')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--sample-users', type=int, default=500)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--factors', type=int, default=32)
+    parser.add_argument('--iterations', type=int, default=15)
+    parser.add_argument('--alpha', type=float, default=5.0)
+    parser.add_argument('--regularization', type=float, default=5.0)
+    run(parser.parse_args())
@@ -0,0 +1,93 @@
+"""Compare the per-row and single-transaction paths for saving recommendations.
+
+Uses a throwaway on-disk SQLite database so commit/fsync cost is included.
+
+    python -m benchmarks.bench_save_recommendations --sizes 5 50 500
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+def legacy_save(user_id, recommendations):
+    """The previous save path: one SELECT and one commit per recommendation"""
+    from models import Recommendation
+
+    for rec in Recommendation.query.filter_by(user_id=user_id, is_active=True).all():
+        rec.is_active = False
+    return [
+        Recommendation.create_recommendation(
+            user_id=user_id,
+            product_id=rec['product_id'],
+            score=rec['score'],
+            explanation=rec['explanation'],
+            algorithm_used=rec['algorithm']
+        )
+        for rec in recommendations
+    ]
+
+def make_recommendations(product_ids, size, rng):
+    return [
+        {
+            'product_id': product_id,
+            'score': rng.random(),
+            'algorithm': 'hybrid',
+            'explanation': 'benchmark recommendation'
+        }
+        for product_id in rng.sample(product_ids, size)
+    ]
+
+def run(sizes, repeats):
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench_save.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+
+    from sqlalchemy import event
+    from app import create_app
+    from models.database import create_schema, populate_sample_data
+    from models import db, Product, User
+    from services import RecommendationEngine
+
+    app = create_app()
+    with app.app_context():
+        create_schema()
+        populate_sample_data()
+    rng = random.Random(0)
+    with app.app_context():
+        db.session.add_all(
+            Product(name=f'Bench Product {i}', description='benchmark', price=1.0, category='Bench')
+            for i in range(max(sizes))
+        )
+        db.session.commit()
+        product_ids = [product_id for (product_id,) in db.session.query(Product.id).all()]
+        user_id = User.query.first().id
+
+        counters = {'statements': 0, 'commits': 0}
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda *args: counters.__setitem__('statements', counters['statements'] + 1))
+        event.listen(db.engine, 'commit', lambda *args: counters.__setitem__('commits', counters['commits'] + 1))
+
+        engine = RecommendationEngine()
+        paths = {'per-row': legacy_save, 'bulk': engine.save_recommendations}
+
+        print(f"{'size':>6} {'path':>8} {'ms':>9} {'statements':>11} {'commits':>8}")
+        for size in sizes:
+            for name, save in paths.items():
+                timings = []
+                for _ in range(repeats):
+                    recommendations = make_recommendations(product_ids, size, rng)
+                    counters.update(statements=0, commits=0)
+                    start = time.perf_counter()
+                    saved = save(user_id, recommendations)
+                    timings.append(time.perf_counter() - start)
+                    assert len(saved) == size
+                    db.session.expunge_all()
+                print(f"{size:>6} {name:>8} {sorted(timings)[len(timings) // 2] * 1000:>9.2f} "
+                      f"{counters['statements']:>11} {counters['commits']:>8}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5, 50, 500])
+    parser.add_argument('--repeats', type=int, default=5, help='runs per size; the median is reported')
+    args = parser.parse_args()
+    run(args.sizes, args.repeats)
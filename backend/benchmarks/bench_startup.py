@@ -0,0 +1,89 @@
+"""Application startup time: import, create_app and first requests.
+
+Each run starts a fresh interpreter against a prepared synthetic database
+and times importing app, create_app(), the first /api/health request and
+the first recommendation refresh for an active user, for each WARMUP mode.
+It also lists which heavy libraries were already imported when create_app
+returned:
+
+    python -m benchmarks.bench_startup --runs 5 --warmup off blocking
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+heavy = [name for name in ('numpy', 'scipy', 'sklearn', 'pandas') if name in sys.modules]
+client = app.test_client()
+assert client.get('/api/health').status_code == 200
+health = time.perf_counter()
+assert client.get('/api/recommendations/%d?refresh=1').status_code == 200
+recommended = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_health_ms': (health - created) * 1000,
+    'first_recommendation_ms': (recommended - health) * 1000,
+    'to_first_recommendation_ms': (recommended - start) * 1000,
+    'heavy': heavy
+}))
+"""
+
+COLUMNS = ['import_ms', 'create_app_ms', 'first_health_ms', 'first_recommendation_ms', 'to_first_recommendation_ms']
+
+def prepare_database(args):
+    from app import create_app
+    from models import db, Interaction
+    from models.database import create_schema, populate_sample_data
+    from services.synthetic_data import generate_synthetic_data
+
+    app = create_app()
+    with app.app_context():
+        create_schema()
+        populate_sample_data()
+        generate_synthetic_data(args.users, args.products, args.interactions, seed=args.seed, echo=lambda message: None)
+        user_id, = db.session.query(Interaction.user_id).group_by(Interaction.user_id).order_by(
+            db.func.count().desc()
+        ).first()
+        db.session.remove()
+    return user_id
+
+def run_probe(user_id, warmup):
+    env = dict(os.environ, WARMUP=warmup, METRICS_ENABLED='false')
+    output = subprocess.run([sys.executable, '-c', PROBE % user_id], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def run(args):
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_startup.db')}"
+    user_id = prepare_database(args)
+    print(f"{args.users} users, {args.products} products, {args.interactions} interactions; "
+          f"median of {args.runs} fresh processes, first recommendation for user {user_id}")
+
+    print(f"\n{'warmup':>10} " + ' '.join(f"{column[:-3]:>22}" for column in COLUMNS) + "  heavy imports after create_app")
+    for warmup in args.warmup:
+        runs = [run_probe(user_id, warmup) for _ in range(args.runs)]
+        medians = [statistics.median(run[column] for run in runs) for column in COLUMNS]
+        print(f"{warmup:>10} " + ' '.join(f"{value:>22.0f}" for value in medians) + f"  {','.join(runs[-1]['heavy']) or '-'}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--interactions', type=int, default=50000)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--warmup', nargs='+', default=['off', 'blocking'], choices=['off', 'background', 'blocking'])
+    parser.add_argument('--seed', type=int, default=42)
+    run(parser.parse_args())
@@ -0,0 +1,132 @@
+"""Trending scores: per-interaction update cost and top-k latency.
+
+Builds a synthetic catalog with interactions spread over the last --days,
+loads the trending window from it, then replays a stream of interactions
+through the trending service and compares:
+
+- recompute: the grouped SQL over the window plus a decayed full sort, per request
+- full sort: sorting every in-memory score, per request
+- heap:      TrendingService.top with the incremental heaps
+
+Top-k is measured after every --batch interactions, so each query also
+pays for pushing the products changed since the previous one:
+
+    python -m benchmarks.bench_trending --products 20000 --interactions 500000
+"""
+import argparse
+import heapq
+import math
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+def recompute(service, category=None, limit=10):
+    """Trending top-k straight from the interactions table, as a request would without the service"""
+    from models import db, Product, Interaction
+    from services.trending import EPOCH, _bucket_expression
+    from sqlalchemy import func
+
+    now_bucket = service._bucket_at(time.time())
+    start = EPOCH + timedelta(seconds=(now_bucket - service.window_buckets + 1) * service.bucket_seconds)
+    bucket = _bucket_expression(service.bucket_seconds)
+    query = db.session.query(
+        Interaction.product_id, Interaction.interaction_type, bucket, func.count(Interaction.id)
+    ).filter(Interaction.timestamp >= start)
+    if category is not None:
+        query = query.join(Product, Product.id == Interaction.product_id).filter(Product.category == category)
+    scores = {}
+    for product_id, interaction_type, row_bucket, count in query.group_by(
+        Interaction.product_id, Interaction.interaction_type, bucket
+    ):
+        decay = math.exp(-service.rate * (now_bucket - min(int(row_bucket), now_bucket)))
+        scores[product_id] = scores.get(product_id, 0.0) + service.weights.get(interaction_type, 0) * count * decay
+    return sorted(scores.items(), key=lambda item: -item[1])[:limit]
+
+def full_sort(service, category=None, limit=10):
+    scores = service._scores.items()
+    if category is not None:
+        scores = [(product_id, score) for product_id, score in scores if service._categories.get(product_id) == category]
+    return heapq.nlargest(limit, scores, key=lambda item: item[1])
+
+def timed_ms(function, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+def run(args):
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_trending.db')}"
+
+    from app import create_app
+    from models import db, Product
+    from models.database import create_schema, populate_sample_data
+    from services.synthetic_data import generate_synthetic_data
+    from services.trending import TrendingService
+
+    app = create_app()
+    with app.app_context():
+        create_schema()
+        populate_sample_data()
+        generate_synthetic_data(args.users, args.products, args.interactions, seed=args.seed, days=args.days,
+                                echo=lambda message: None)
+
+        service = TrendingService(reload_interval=float('inf'))
+        start = time.perf_counter()
+        service.top(args.limit)
+        print(f"{args.interactions} interactions over {args.days} days, {args.products} products; "
+              f"window load {time.perf_counter() - start:.2f}s, {len(service._scores)} products in the window")
+
+        rng = random.Random(args.seed)
+        product_ids = [product_id for (product_id,) in db.session.query(Product.id)]
+        categories = [category for (category,) in db.session.query(Product.category).distinct()]
+        types = list(service.weights)
+        now = datetime.utcnow()
+        stream = [
+            SimpleNamespace(product_id=rng.choice(product_ids), interaction_type=rng.choice(types), timestamp=now)
+            for _ in range(args.stream)
+        ]
+
+        start = time.perf_counter()
+        heap_ms = []
+        for offset in range(0, len(stream), args.batch):
+            for interaction in stream[offset:offset + args.batch]:
+                service.record_interaction(interaction)
+            query_start = time.perf_counter()
+            service.top(args.limit)
+            heap_ms.append((time.perf_counter() - query_start) * 1000)
+        total_s = time.perf_counter() - start
+        update_us = (total_s - sum(heap_ms) / 1000) / len(stream) * 1e6
+        print(f"update: {update_us:.2f}us per interaction over {len(stream)} interactions")
+
+        print(f"\ntop-{args.limit} latency in ms (median), heap after every {args.batch} interactions")
+        print(f"{'scope':>20} {'recompute':>10} {'full_sort':>10} {'heap':>10}")
+        scopes = [None] + categories[:args.categories]
+        for category in scopes:
+            if category is None:
+                heap = statistics.median(heap_ms)
+            else:
+                heap = timed_ms(lambda: service.top(args.limit, category=category), args.repeats)
+            print(f"{category or 'overall':>20} "
+                  f"{timed_ms(lambda: recompute(service, category, args.limit), 3):>10.2f} "
+                  f"{timed_ms(lambda: full_sort(service, category, args.limit), args.repeats):>10.3f} "
+                  f"{heap:>10.3f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--products', type=int, default=20000)
+    parser.add_argument('--interactions', type=int, default=500000)
+    parser.add_argument('--days', type=int, default=14)
+    parser.add_argument('--stream', type=int, default=100000)
+    parser.add_argument('--batch', type=int, default=100)
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--categories', type=int, default=3)
+    parser.add_argument('--repeats', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=42)
+    run(parser.parse_args())
@@ -0,0 +1,91 @@
+"""Assert a maximum number of SQL statements per API endpoint.
+
+Seeds a throwaway SQLite database, calls each endpoint and counts the
+statements it issues. Exits non-zero if any endpoint exceeds its budget, so
+an N+1 regression in serialization shows up as a failure.
+
+    python -m benchmarks.check_query_counts
+"""
+import os
+import random
+import sys
+import tempfile
+
+# Endpoint -> maximum SQL statements, independent of how many rows are returned
+QUERY_BUDGETS = {
+    '/api/products/': 2,
+    '/api/products/1': 1,
+    '/api/products/popular': 2,  # popularity cache load on a miss + one product IN lookup
+    '/api/recommendations/popular': 2,
+    '/api/products/popular?ranking=trending': 3,  # trending window + category load on a miss + one product IN lookup
+    '/api/recommendations/1': 3,
+    '/api/users/': 1,
+    '/api/users/?format=ndjson': 1,
+    '/api/users/1': 1,  # user, aggregates and category rows in one joined read
+    '/api/users/1/interactions': 5,
+    '/api/users/1/stats': 4,
+    '/api/users/1/interactions?format=ndjson': 4,  # user lookup + one streamed SELECT + two prefetches per chunk
+}
+
+def seed(num_users=20, num_interactions=500, seed_value=7):
+    from models import db, User, Product, Interaction, ProductStats, UserStats, Recommendation
+
+    rng = random.Random(seed_value)
+    for i in range(num_users):
+        db.session.add(User(name=f'Bench User {i}', email=f'bench{i}@example.com'))
+    db.session.commit()
+
+    product_ids = [product_id for (product_id,) in db.session.query(Product.id).all()]
+    user_ids = [user_id for (user_id,) in db.session.query(User.id).all()]
+    for _ in range(num_interactions):
+        interaction_type = rng.choice(['view', 'click', 'rating', 'favorite', 'purchase'])
+        db.session.add(Interaction(
+            user_id=rng.choice(user_ids),
+            product_id=rng.choice(product_ids),
+            interaction_type=interaction_type,
+            rating=rng.randint(1, 5) if interaction_type == 'rating' else None
+        ))
+    for product_id in product_ids:
+        db.session.add(Recommendation(user_id=user_ids[0], product_id=product_id, score=rng.random(),
+                                      explanation='seeded', algorithm_used='hybrid'))
+    db.session.commit()
+    ProductStats.rebuild()
+    UserStats.rebuild()
+
+def main():
+    db_path = os.path.join(tempfile.mkdtemp(), 'query_counts.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+
+    from sqlalchemy import event
+    from app import create_app
+    from models.database import create_schema, populate_sample_data
+    from models import db
+
+    app = create_app()
+    with app.app_context():
+        create_schema()
+        populate_sample_data()
+    with app.app_context():
+        seed()
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+
+    client = app.test_client()
+    failures = 0
+    for endpoint, budget in QUERY_BUDGETS.items():
+        statements.clear()
+        response = client.get(endpoint)
+        response.get_data()  # drain streamed responses before counting
+        count = len(statements)
+        ok = response.status_code == 200 and count <= budget
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {endpoint:<44} status={response.status_code} queries={count} budget={budget}")
+        if not ok:
+            for statement in statements:
+                print(f"       {' '.join(statement.split())[:120]}")
+
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""Assert that user-item models fed by different writers converge on the table.
+
+Seeds a throwaway SQLite database and loads two models, standing in for two
+worker processes. Interactions are committed in a random interleaving and
+each one is applied only to the model of the worker that wrote it, so every
+model sees gaps filled by the other. After sync() both must match a model
+loaded from scratch. Exits non-zero on any difference.
+
+    python -m benchmarks.check_user_item_sync
+"""
+import os
+import random
+import sys
+import tempfile
+
+def snapshot(model):
+    """Everything the model derives from the table, in comparable form"""
+    pairs = {
+        pair: (model._slot_sums[slot], model._slot_counts[slot])
+        for pair, slot in model._pair_slots.items()
+    }
+    return {
+        'interaction_count': model.interaction_count,
+        'max_interaction_id': model.max_interaction_id,
+        'user_interaction_counts': model.user_interaction_counts,
+        'user_liked_products': model.user_liked_products,
+        'pairs': pairs,
+    }
+
+def main(num_interactions=500, seed_value=7):
+    db_path = os.path.join(tempfile.mkdtemp(), 'user_item_sync.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+
+    from app import create_app
+    from models import db, User, Product, Interaction
+    from models.database import create_schema, populate_sample_data
+    from services.user_item_model import UserItemModel
+
+    app = create_app()
+    failures = 0
+    with app.app_context():
+        create_schema()
+        populate_sample_data()
+
+        rng = random.Random(seed_value)
+        user_ids = [user_id for (user_id,) in db.session.query(User.id)]
+        product_ids = [product_id for (product_id,) in db.session.query(Product.id)]
+        workers = [UserItemModel().load(), UserItemModel().load()]
+
+        for _ in range(num_interactions):
+            interaction_type = rng.choice(Interaction.INTERACTION_TYPES)
+            interaction = Interaction(
+                user_id=rng.choice(user_ids),
+                product_id=rng.choice(product_ids),
+                interaction_type=interaction_type,
+                rating=rng.randint(1, 5) if interaction_type == 'rating' else None
+            )
+            db.session.add(interaction)
+            db.session.commit()
+            rng.choice(workers).apply_interaction(interaction)
+
+        expected = snapshot(UserItemModel().load())
+        for index, model in enumerate(workers):
+            model.sync()
+            actual = snapshot(model)
+            different = [key for key in expected if actual[key] != expected[key]]
+            failures += bool(different)
+            print(f"{'FAIL' if different else 'ok  '} worker {index} "
+                  f"interactions={actual['interaction_count']} expected={expected['interaction_count']}"
+                  + (f" differs in {', '.join(different)}" if different else ''))
+
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
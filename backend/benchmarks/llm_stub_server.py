@@ -0,0 +1,71 @@
+"""Local HTTP stand-in for an LLM provider with configurable latency.
+
+Answers POST requests with {"explanation": ...} after a simulated delay:
+latency_ms +/- jitter_ms, with tail_rate of requests taking tail_ms instead
+and error_rate of them failing with HTTP 503.
+
+    python -m benchmarks.llm_stub_server --port 8765 --latency-ms 300 --tail-ms 3000 --tail-rate 0.05
+    LLM_PROVIDER=stub LLM_STUB_URL=http://127.0.0.1:8765/explain python app.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def make_server(host='127.0.0.1', port=8765, latency_ms=300, jitter_ms=100, tail_ms=3000,
+                tail_rate=0.0, error_rate=0.0, seed=None):
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            with rng_lock:
+                tail = rng.random() < tail_rate
+                fail = rng.random() < error_rate
+                delay = tail_ms if tail else max(0.0, latency_ms + rng.uniform(-jitter_ms, jitter_ms))
+            time.sleep(delay / 1000)
+
+            if fail:
+                self.send_response(503)
+                self.end_headers()
+                return
+
+            product = body.get('product') or {}
+            payload = json.dumps({
+                'explanation': f"[stub] {product.get('name', 'This product')} suits your interest in "
+                               f"{(product.get('category') or 'these').lower()} items."
+            }).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            try:
+                self.wfile.write(payload)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the client gave up waiting, as timed-out callers do
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    return server
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=300)
+    parser.add_argument('--jitter-ms', type=float, default=100)
+    parser.add_argument('--tail-ms', type=float, default=3000)
+    parser.add_argument('--tail-rate', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.latency_ms, args.jitter_ms,
+                         args.tail_ms, args.tail_rate, args.error_rate)
+    print(f"LLM stub listening on http://{args.host}:{args.port}/explain")
+    server.serve_forever()
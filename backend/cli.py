@@ -0,0 +1,165 @@
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+recommend_cli = AppGroup('recommend', help='Recommendation maintenance commands.')
+
+@recommend_cli.command('precompute')
+@click.option('--users', default=None, help='Comma-separated user IDs (default: all users).')
+@click.option('--processes', default=None, type=int, help='Worker processes (default: CPU count).')
+@click.option('--chunk-size', default=500, show_default=True, help='Users per worker task and per write transaction.')
+@click.option('--count', default=5, show_default=True, help='Recommendations per user.')
+@click.option('--checkpoint', default=None, type=click.Path(dir_okay=False), help='Checkpoint file for resumable runs.')
+@click.option('--resume', is_flag=True, help='Skip users already committed according to the checkpoint.')
+def precompute(users, processes, chunk_size, count, checkpoint, resume):
+    """Generate and save recommendations for many users in parallel."""
+    from services.precompute import precompute_recommendations
+
+    user_ids = [int(user_id) for user_id in users.split(',')] if users else None
+    if resume and not checkpoint:
+        raise click.UsageError('--resume requires --checkpoint')
+
+    summary = precompute_recommendations(
+        current_app._get_current_object(),
+        user_ids=user_ids,
+        processes=processes,
+        chunk_size=chunk_size,
+        num_recommendations=count,
+        checkpoint_path=checkpoint,
+        resume=resume,
+        echo=click.echo
+    )
+    click.echo(f"Done: {summary['processed']} users, {summary['saved']} recommendations in {summary['seconds']}s")
+
+@recommend_cli.command('train-mf')
+@click.option('--factors', default=32, show_default=True, help='Latent factors per user and product.')
+@click.option('--iterations', default=15, show_default=True, help='ALS iterations.')
+@click.option('--regularization', default=5.0, show_default=True, help='L2 regularization.')
+@click.option('--alpha', default=5.0, show_default=True, help='Confidence scaling of implicit weights.')
+@click.option('--keep', default=None, type=int, help='Saved versions to keep (default: MF_KEEP_VERSIONS).')
+def train_mf(factors, iterations, regularization, alpha, keep):
+    """Train the implicit matrix factorization model and save it as the latest version."""
+    from services.matrix_factorization import ImplicitMatrixFactorization
+
+    model = ImplicitMatrixFactorization.train_from_database(
+        factors=factors, iterations=iterations, regularization=regularization, alpha=alpha
+    )
+    if len(model.product_ids) >= current_app.config['ANN_MIN_PRODUCTS']:
+        # Saved with the model so server workers map the index instead of each building it
+        model.build_ann_index(nlist=current_app.config['ANN_NLIST'] or None, nprobe=current_app.config['ANN_NPROBE'])
+    directory = current_app.config['MF_MODEL_DIR']
+    version = model.save(directory, keep=keep or current_app.config['MF_KEEP_VERSIONS'])
+    click.echo(f"Trained {version} on {len(model.user_ids)} users x {len(model.product_ids)} products "
+               f"({model.seen.nnz} pairs) in {model.training_seconds}s; saved to {directory}")
+
+@recommend_cli.command('build-content-index')
+@click.option('--keep', default=None, type=int, help='Saved versions to keep (default: CONTENT_INDEX_KEEP_VERSIONS).')
+def build_content_index(keep):
+    """Build the content similarity index and save it as the latest version."""
+    import time
+    from services.content_index import ContentIndex
+
+    start = time.perf_counter()
+    index = ContentIndex().build()
+    directory = current_app.config['CONTENT_INDEX_DIR']
+    version = index.save(directory, keep=keep or current_app.config['CONTENT_INDEX_KEEP_VERSIONS'])
+    click.echo(f"Built {version} for {len(index.product_ids)} products ({index.neighbors.nnz} neighbour pairs) "
+               f"in {time.perf_counter() - start:.1f}s; saved to {directory}")
+
+ARTIFACT_DIRS = {'mf': 'MF_MODEL_DIR', 'content': 'CONTENT_INDEX_DIR'}
+
+@recommend_cli.command('versions')
+@click.argument('artifact', type=click.Choice(sorted(ARTIFACT_DIRS)))
+@click.option('--activate', default=None, help='Make this saved version the one served (rollback).')
+def versions(artifact, activate):
+    """List saved versions of a model artifact (mf or content)."""
+    from services.artifacts import ArtifactStore
+
+    store = ArtifactStore(current_app.config[ARTIFACT_DIRS[artifact]], artifact)
+    if activate:
+        try:
+            store.activate(activate)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+    latest = store.latest()
+    for version in store.versions():
+        click.echo(f"{'*' if version == latest else ' '} {version}")
+
+aggregates_cli = AppGroup('aggregates', help='Denormalized aggregate maintenance commands.')
+
+@aggregates_cli.command('rebuild-products')
+def rebuild_products():
+    """Recompute product rating and interaction aggregates from scratch."""
+    from models import ProductStats
+
+    count = ProductStats.rebuild()
+    click.echo(f"Rebuilt aggregates for {count} products")
+
+@aggregates_cli.command('rebuild-users')
+def rebuild_users():
+    """Recompute per-user interaction, rating and category aggregates from scratch."""
+    from models import UserStats
+
+    count = UserStats.rebuild()
+    click.echo(f"Rebuilt aggregates for {count} users")
+
+schema_cli = AppGroup('schema', help='Database schema commands.')
+
+@schema_cli.command('create')
+def create_schema():
+    """Create missing tables and backfill aggregates for databases that predate them."""
+    from models.database import create_schema
+
+    create_schema()
+    click.echo("Schema up to date")
+
+@schema_cli.command('add-indexes')
+def add_indexes():
+    """Create indexes declared on the models that an existing database lacks."""
+    from models.database import migrate_indexes
+
+    created = migrate_indexes()
+    click.echo(f"Created {len(created)} indexes: {', '.join(created)}" if created else "All indexes present")
+
+@schema_cli.command('check-plans')
+def check_plans():
+    """Fail if any hot query falls back to a full table scan (SQLite)."""
+    from models.query_plans import check_query_plans
+
+    failures = 0
+    for name, (plan, full_scans) in check_query_plans().items():
+        failures += bool(full_scans)
+        click.echo(f"{'FAIL' if full_scans else 'ok  '} {name}: {' | '.join(plan)}")
+    if failures:
+        raise click.ClickException(f"{failures} hot queries use a full scan")
+
+data_cli = AppGroup('data', help='Test and benchmark data commands.')
+
+@data_cli.command('seed')
+def seed_data():
+    """Add the sample products and users to an empty database."""
+    from models.database import populate_sample_data
+
+    if not populate_sample_data():
+        click.echo("Database already has products; nothing seeded")
+
+@data_cli.command('generate')
+@click.option('--users', default=10000, show_default=True, help='Users to create.')
+@click.option('--products', default=1000, show_default=True, help='Products to create.')
+@click.option('--interactions', default=200000, show_default=True, help='Interactions to create (up to ~10M).')
+@click.option('--seed', default=42, show_default=True, help='Random seed; the same seed reproduces the same data.')
+@click.option('--batch-size', default=50000, show_default=True, help='Rows per bulk insert transaction.')
+def generate_data(users, products, interactions, seed, batch_size):
+    """Append seeded synthetic power-law users, products and interactions."""
+    from services.synthetic_data import generate_synthetic_data
+
+    summary = generate_synthetic_data(users, products, interactions, seed=seed, batch_size=batch_size, echo=click.echo)
+    click.echo(f"Done: {summary['users']} users, {summary['products']} products, "
+               f"{summary['interactions']} interactions in {summary['seconds']}s")
+
+def register_cli(app):
+    """Attach the custom CLI command groups to the app"""
+    app.cli.add_command(recommend_cli)
+    app.cli.add_command(aggregates_cli)
+    app.cli.add_command(schema_cli)
+    app.cli.add_command(data_cli)
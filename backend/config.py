@@ -9,9 +9,91 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY') or 'your-openai-api-key-here'
 
+    # LLM explanation providers: auto (OpenAI when a key is set, else templates), openai, stub, template
+    LLM_PROVIDER = os.environ.get('LLM_PROVIDER', 'auto')
+    LLM_MODEL = os.environ.get('LLM_MODEL', 'gpt-4o-mini')
+    LLM_STUB_URL = os.environ.get('LLM_STUB_URL', 'http://127.0.0.1:8765/explain')
+    LLM_CALL_TIMEOUT = float(os.environ.get('LLM_CALL_TIMEOUT', 5.0))  # seconds per provider call
+    LLM_MAX_RETRIES = int(os.environ.get('LLM_MAX_RETRIES', 2))
+    LLM_BATCH_DEADLINE = float(os.environ.get('LLM_BATCH_DEADLINE', 8.0))  # seconds for a whole batch
+    LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', 8))
+
+    # LLM explanation cache
+    LLM_CACHE_MAX_ENTRIES = int(os.environ.get('LLM_CACHE_MAX_ENTRIES', 10000))
+    LLM_CACHE_PATH = os.environ.get('LLM_CACHE_PATH')  # SQLite file for a persistent cache; memory-only if unset
+    LLM_COST_PER_CALL = float(os.environ.get('LLM_COST_PER_CALL', 0.0005))  # USD, for cost-saved reporting
+
     # Recommendation settings
     MIN_INTERACTIONS_FOR_RECOMMENDATION = 3
     DEFAULT_RECOMMENDATION_COUNT = 5
+    RECOMMENDATION_ALGORITHMS = ('hybrid', 'mf')
+    RECOMMENDATION_ALGORITHM = os.environ.get('RECOMMENDATION_ALGORITHM', 'hybrid')  # default when a request names none
+
+    # Versioned model artifacts: matrix factorization (`flask recommend train-mf`) and the content index
+    # (`flask recommend build-content-index`), memory-mapped read-only so server workers share their pages
+    MF_MODEL_DIR = os.environ.get('MF_MODEL_DIR', 'artifacts/mf')
+    MF_KEEP_VERSIONS = int(os.environ.get('MF_KEEP_VERSIONS', 5))
+    CONTENT_INDEX_DIR = os.environ.get('CONTENT_INDEX_DIR', 'artifacts/content')
+    CONTENT_INDEX_KEEP_VERSIONS = int(os.environ.get('CONTENT_INDEX_KEEP_VERSIONS', 3))
+    ARTIFACT_MMAP = os.environ.get('ARTIFACT_MMAP', 'true').lower() == 'true'
+
+    # Approximate nearest-neighbour (IVF) indexes for item vectors, used once a catalog reaches ANN_MIN_PRODUCTS
+    ANN_MIN_PRODUCTS = int(os.environ.get('ANN_MIN_PRODUCTS', 50000))
+    ANN_NLIST = int(os.environ.get('ANN_NLIST', 0))  # inverted lists; 0 picks sqrt(products)
+    ANN_NPROBE = int(os.environ.get('ANN_NPROBE', 8))  # lists scanned per query: higher is slower but more exact
+
+    # In-memory user-item model: seconds between row-count checks on top of the per-request id watermark
+    USER_ITEM_VERIFY_INTERVAL = float(os.environ.get('USER_ITEM_VERIFY_INTERVAL', 300.0))
+
+    # Batch interaction ingestion
+    MAX_INTERACTION_BATCH = int(os.environ.get('MAX_INTERACTION_BATCH', 5000))
+
+    # User listing pagination and NDJSON exports
+    USER_PAGE_SIZE = int(os.environ.get('USER_PAGE_SIZE', 100))
+    MAX_USER_PAGE_SIZE = int(os.environ.get('MAX_USER_PAGE_SIZE', 1000))
+    STREAM_CHUNK_SIZE = int(os.environ.get('STREAM_CHUNK_SIZE', 1000))  # rows fetched per round trip
+
+    # Request metrics at /api/metrics and the slow-request log (0 disables it)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    SLOW_REQUEST_THRESHOLD_MS = float(os.environ.get('SLOW_REQUEST_THRESHOLD_MS', 0))
+    SLOW_REQUEST_TOP_STATEMENTS = int(os.environ.get('SLOW_REQUEST_TOP_STATEMENTS', 5))
+
+    # Per-stage spans in RecommendationEngine, exported as stage metrics
+    ENGINE_TRACING_ENABLED = os.environ.get('ENGINE_TRACING_ENABLED', 'true').lower() == 'true'
+
+    # Write-behind buffering for high-volume, low-value interaction types
+    WRITE_BEHIND_ENABLED = os.environ.get('WRITE_BEHIND_ENABLED', 'false').lower() == 'true'
+    WRITE_BEHIND_TYPES = ['view', 'click']
+    WRITE_BEHIND_MAX_SIZE = int(os.environ.get('WRITE_BEHIND_MAX_SIZE', 10000))
+    WRITE_BEHIND_FLUSH_SIZE = int(os.environ.get('WRITE_BEHIND_FLUSH_SIZE', 500))
+    WRITE_BEHIND_FLUSH_INTERVAL = float(os.environ.get('WRITE_BEHIND_FLUSH_INTERVAL', 1.0))  # seconds
+    WRITE_BEHIND_BLOCK_TIMEOUT = float(os.environ.get('WRITE_BEHIND_BLOCK_TIMEOUT', 0.5))  # seconds
+    WRITE_BEHIND_MAX_ATTEMPTS = int(os.environ.get('WRITE_BEHIND_MAX_ATTEMPTS', 3))  # per rejected event, then dropped
+    WRITE_BEHIND_DURABILITY = os.environ.get('WRITE_BEHIND_DURABILITY', 'memory')  # memory, journal, fsync
+    WRITE_BEHIND_JOURNAL = os.environ.get('WRITE_BEHIND_JOURNAL', 'instance/interactions.journal')  # one journal per process: <path>.<pid>
+
+    # Background recommendation refresh
+    REFRESH_QUEUE_WORKERS = int(os.environ.get('REFRESH_QUEUE_WORKERS', 2))
+    REFRESH_COALESCE_WINDOW = float(os.environ.get('REFRESH_COALESCE_WINDOW', 2.0))  # seconds
+
+    # Popularity ranking cache
+    POPULARITY_CACHE_TTL = float(os.environ.get('POPULARITY_CACHE_TTL', 60.0))  # seconds
+
+    # Trending products: type-weighted interactions in a ring of time buckets, decayed with a half-life
+    TRENDING_WEIGHTS = {'view': 1.0, 'click': 2.0, 'rating': 3.0, 'favorite': 5.0, 'purchase': 10.0}
+    TRENDING_BUCKET_SECONDS = int(os.environ.get('TRENDING_BUCKET_SECONDS', 3600))
+    TRENDING_WINDOW_BUCKETS = int(os.environ.get('TRENDING_WINDOW_BUCKETS', 168))  # a week of hours
+    TRENDING_HALF_LIFE_HOURS = float(os.environ.get('TRENDING_HALF_LIFE_HOURS', 24.0))
+    TRENDING_RELOAD_INTERVAL = float(os.environ.get('TRENDING_RELOAD_INTERVAL', 300.0))  # seconds
+    # Ranking behind /popular and the popularity fallback: all_time (interaction count) or trending
+    POPULAR_RANKINGS = ('all_time', 'trending')
+    POPULAR_RANKING = os.environ.get('POPULAR_RANKING', 'all_time')
+
+    # Product listing totals cache
+    CATALOG_COUNT_CACHE_TTL = float(os.environ.get('CATALOG_COUNT_CACHE_TTL', 60.0))  # seconds
+
+    # Load the recommendation stack at startup instead of on the first request: off, background or blocking
+    WARMUP = os.environ.get('WARMUP', 'off')
 
     # CORS settings
     CORS_ORIGINS = ['http://localhost:3000', 'http://127.0.0.1:3000']
@@ -23,6 +105,25 @@ class ProductionConfig(Config):
     DEBUG = False
     CORS_ORIGINS = ['https://your-frontend-domain.com']
 
+    # SQLite: WAL lets readers run alongside the writer; NORMAL sync is safe under WAL
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,  # ms to wait on a locked database instead of failing
+        'cache_size': -64000,  # 64 MB page cache
+        'temp_store': 'MEMORY',
+        'mmap_size': 268435456  # 256 MB
+    }
+
+    # Connection pool for server databases such as PostgreSQL
+    SQLALCHEMY_ENGINE_OPTIONS = {} if Config.SQLALCHEMY_DATABASE_URI.startswith('sqlite') else {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': 30,
+        'pool_recycle': 1800,  # seconds; stay under server and proxy idle timeouts
+        'pool_pre_ping': True
+    }
+
 config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
@@ -1,7 +1,10 @@
 from .database import db, init_db
 from .product import Product
+from .product_stats import ProductStats
+from .user_stats import UserStats, UserCategoryStats
 from .user import User
-from .interaction import Interaction
+from .interaction import Interaction, on_interaction_created
 from .recommendation import Recommendation
 
-__all__ = ['db', 'init_db', 'Product', 'User', 'Interaction', 'Recommendation']
+__all__ = ['db', 'init_db', 'Product', 'ProductStats', 'UserStats', 'UserCategoryStats', 'User', 'Interaction',
+           'Recommendation', 'on_interaction_created']
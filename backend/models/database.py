@@ -1,14 +1,89 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import and_, event, inspect
+from sqlalchemy.dialects import postgresql, sqlite
 from datetime import datetime
 
 db = SQLAlchemy()
 
+# Dialects with INSERT ... ON CONFLICT DO UPDATE
+_UPSERT_INSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+def upsert_deltas(model, key, deltas):
+    """Atomically add deltas to the row with this key in the current transaction, inserting it if missing.
+
+    On SQLite and PostgreSQL this is one INSERT ... ON CONFLICT DO UPDATE, so
+    concurrent first writes for a key cannot both insert; other backends
+    fall back to an UPDATE followed by an INSERT when no row matched.
+    """
+    table = model.__table__
+    row = {column.name: 0 for column in table.columns if column.name not in key}
+    row.update(deltas)
+    increments = {column: table.c[column] + value for column, value in deltas.items()}
+
+    insert = _UPSERT_INSERTS.get(db.session.get_bind().dialect.name)
+    if insert is not None:
+        db.session.execute(insert(table).values(**key, **row).on_conflict_do_update(
+            index_elements=list(key), set_=increments
+        ))
+        return
+
+    updated = db.session.execute(
+        table.update().where(and_(*(table.c[name] == value for name, value in key.items()))).values(increments)
+    )
+    if updated.rowcount == 0:
+        db.session.execute(table.insert().values(**key, **row))
+
 def init_db(app):
-    """Initialize database with Flask app"""
+    """Initialize database with Flask app; the schema is created with `flask schema create`"""
     db.init_app(app)
     with app.app_context():
-        db.create_all()
-        populate_sample_data()
+        configure_sqlite(app)
+
+def create_schema():
+    """Create missing tables and backfill aggregates for databases that predate them"""
+    db.create_all()
+    backfill_aggregates()
+
+def configure_sqlite(app):
+    """Apply the configured PRAGMAs to every new SQLite connection"""
+    pragmas = app.config.get('SQLITE_PRAGMAS')
+    if not pragmas or db.engine.dialect.name != 'sqlite':
+        return
+
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    event.listen(db.engine, 'connect', set_pragmas)
+
+def migrate_indexes():
+    """Create any index declared on the models that the database is missing"""
+    inspector = inspect(db.engine)
+    created = []
+    for table in db.metadata.sorted_tables:
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(db.engine)
+                created.append(index.name)
+    return created
+
+def backfill_aggregates():
+    """Build product and user aggregates once for databases that predate them"""
+    from .product_stats import ProductStats
+    from .user_stats import UserStats
+    from .interaction import Interaction
+
+    if Interaction.query.first() is None:
+        return
+    if ProductStats.query.first() is None:
+        ProductStats.rebuild()
+        print("✅ Product aggregates backfilled")
+    if UserStats.query.first() is None:
+        UserStats.rebuild()
+        print("✅ User aggregates backfilled")
 
 def populate_sample_data():
     """Populate database with sample data if empty"""
@@ -17,7 +92,7 @@ def populate_sample_data():
 
     # Check if data already exists
     if Product.query.first() is not None:
-        return
+        return False
 
     # Create sample products
     products = [
@@ -114,6 +189,8 @@ def populate_sample_data():
     try:
         db.session.commit()
         print("✅ Sample data populated successfully!")
+        return True
     except Exception as e:
         db.session.rollback()
         print(f"❌ Error populating sample data: {e}")
+        return False
@@ -1,8 +1,39 @@
 from .database import db
+from .product import Product
+from .product_stats import ProductStats
+from .user_stats import UserStats
 from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Callables notified with each interaction after it is committed
+_interaction_listeners = []
+
+def on_interaction_created(listener):
+    """Register a callable to be notified of every committed interaction"""
+    if listener not in _interaction_listeners:
+        _interaction_listeners.append(listener)
+    return listener
+
+def notify_interaction_created(interaction):
+    """Run registered listeners, never letting one break the write path"""
+    for listener in _interaction_listeners:
+        try:
+            listener(interaction)
+        except Exception as e:
+            logger.error(f"Interaction listener {listener} failed: {e}")
 
 class Interaction(db.Model):
     __tablename__ = 'interactions'
+    __table_args__ = (
+        db.Index('ix_interactions_user_timestamp', 'user_id', 'timestamp'),
+        db.Index('ix_interactions_product_type', 'product_id', 'interaction_type'),
+        db.Index('ix_interactions_user_rating_product', 'user_id', 'rating', 'product_id'),
+        db.Index('ix_interactions_timestamp', 'timestamp'),
+    )
+
+    INTERACTION_TYPES = ['view', 'click', 'rating', 'favorite', 'purchase']
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -33,8 +64,45 @@ class Interaction(db.Model):
             rating=rating
         )
         db.session.add(interaction)
+        # Keep product and user aggregates in the same transaction as the interaction row
+        category = db.session.query(Product.category).filter(Product.id == product_id).scalar()
+        ProductStats.record_interaction(product_id, interaction_type, rating)
+        UserStats.record_interaction(user_id, category, interaction_type, rating)
         db.session.commit()
+        notify_interaction_created(interaction)
         return interaction
 
+    @staticmethod
+    def bulk_create(rows):
+        """Insert many interactions with one executemany in one transaction.
+
+        rows are dicts with user_id, product_id, interaction_type, rating and
+        timestamp. Product and user aggregates are updated in the same transaction and
+        listeners are notified afterwards with detached rows built from
+        INSERT ... RETURNING, in id order.
+        """
+        if not rows:
+            return []
+
+        table = Interaction.__table__
+        columns = [table.c.id, table.c.user_id, table.c.product_id,
+                   table.c.interaction_type, table.c.rating, table.c.timestamp]
+        try:
+            result = db.session.execute(table.insert().returning(*columns), rows)
+            created = sorted(
+                (Interaction(**row._asdict()) for row in result),
+                key=lambda interaction: interaction.id
+            )
+            ProductStats.record_interactions(created)
+            UserStats.record_interactions(created)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        for interaction in created:
+            notify_interaction_created(interaction)
+        return created
+
     def __repr__(self):
         return f'<Interaction {self.user_id}->{self.product_id}: {self.interaction_type}>'
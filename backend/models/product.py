@@ -8,12 +8,13 @@ class Product(db.Model):
     name = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
     price = db.Column(db.Float, nullable=False)
-    category = db.Column(db.String(100), nullable=False)
+    category = db.Column(db.String(100), nullable=False, index=True)
     image_url = db.Column(db.String(500))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # Relationships
     interactions = db.relationship('Interaction', backref='product', lazy=True, cascade='all, delete-orphan')
+    stats = db.relationship('ProductStats', uselist=False, lazy='joined', cascade='all, delete-orphan')
 
     def to_dict(self):
         return {
@@ -29,15 +30,12 @@ class Product(db.Model):
         }
 
     def get_average_rating(self):
-        """Calculate average rating from user interactions"""
-        rating_interactions = [i for i in self.interactions if i.interaction_type == 'rating' and i.rating is not None]
-        if not rating_interactions:
-            return 0
-        return round(sum(i.rating for i in rating_interactions) / len(rating_interactions), 1)
+        """Average rating from the maintained aggregates"""
+        return self.stats.average_rating if self.stats else 0
 
     def get_interaction_count(self):
-        """Get total number of interactions for this product"""
-        return len(self.interactions)
+        """Total number of interactions from the maintained aggregates"""
+        return self.stats.total_interactions if self.stats else 0
 
     def __repr__(self):
         return f'<Product {self.name}>'
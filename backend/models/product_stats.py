@@ -0,0 +1,98 @@
+from .database import db, upsert_deltas
+from sqlalchemy import case, func
+
+class ProductStats(db.Model):
+    """Denormalized per-product rating and interaction aggregates"""
+    __tablename__ = 'product_stats'
+
+    # Interaction type -> counter column
+    TYPE_COLUMNS = {
+        'view': 'views',
+        'click': 'clicks',
+        'rating': 'ratings',
+        'favorite': 'favorites',
+        'purchase': 'purchases'
+    }
+
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), primary_key=True)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    rated_count = db.Column(db.Integer, nullable=False, default=0)  # ratings contributing to rating_sum
+    total_interactions = db.Column(db.Integer, nullable=False, default=0)
+    views = db.Column(db.Integer, nullable=False, default=0)
+    clicks = db.Column(db.Integer, nullable=False, default=0)
+    ratings = db.Column(db.Integer, nullable=False, default=0)
+    favorites = db.Column(db.Integer, nullable=False, default=0)
+    purchases = db.Column(db.Integer, nullable=False, default=0)
+
+    @property
+    def average_rating(self):
+        if not self.rated_count:
+            return 0
+        return round(self.rating_sum / self.rated_count, 1)
+
+    def counts_by_type(self):
+        return {interaction_type: getattr(self, column) or 0 for interaction_type, column in self.TYPE_COLUMNS.items()}
+
+    @classmethod
+    def deltas_for(cls, interaction_type, rating=None):
+        """Column increments for a single interaction"""
+        deltas = {'total_interactions': 1}
+        column = cls.TYPE_COLUMNS.get(interaction_type)
+        if column:
+            deltas[column] = 1
+        if interaction_type == 'rating' and rating is not None:
+            deltas['rating_sum'] = rating
+            deltas['rated_count'] = 1
+        return deltas
+
+    @classmethod
+    def apply_deltas(cls, product_id, deltas):
+        """Atomically add deltas to a product's row in the current transaction (no commit)"""
+        upsert_deltas(cls, {'product_id': product_id}, deltas)
+
+    @classmethod
+    def record_interaction(cls, product_id, interaction_type, rating=None):
+        """Add one interaction to the aggregates in the current transaction (no commit)"""
+        cls.apply_deltas(product_id, cls.deltas_for(interaction_type, rating))
+
+    @classmethod
+    def record_interactions(cls, interactions):
+        """Add many interactions with one UPDATE per distinct product (no commit)"""
+        deltas_by_product = {}
+        for interaction in interactions:
+            totals = deltas_by_product.setdefault(interaction.product_id, {})
+            for column, value in cls.deltas_for(interaction.interaction_type, interaction.rating).items():
+                totals[column] = totals.get(column, 0) + value
+        for product_id, deltas in deltas_by_product.items():
+            cls.apply_deltas(product_id, deltas)
+
+    @classmethod
+    def rebuild(cls):
+        """Recompute every product's aggregates from the interactions table"""
+        from .product import Product
+        from .interaction import Interaction
+
+        def count_type(interaction_type):
+            return func.coalesce(func.sum(case((Interaction.interaction_type == interaction_type, 1), else_=0)), 0)
+
+        is_rating = (Interaction.interaction_type == 'rating') & Interaction.rating.isnot(None)
+        aggregates = db.select(
+            Product.id,
+            func.coalesce(func.sum(case((is_rating, Interaction.rating), else_=0)), 0),
+            func.coalesce(func.sum(case((is_rating, 1), else_=0)), 0),
+            func.count(Interaction.id),
+            *[count_type(interaction_type) for interaction_type in cls.TYPE_COLUMNS]
+        ).select_from(Product).outerjoin(Interaction).group_by(Product.id)
+
+        columns = ['product_id', 'rating_sum', 'rated_count', 'total_interactions', *cls.TYPE_COLUMNS.values()]
+        try:
+            db.session.execute(cls.__table__.delete())
+            db.session.execute(cls.__table__.insert().from_select(columns, aggregates))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return cls.query.count()
+
+    def __repr__(self):
+        return f'<ProductStats {self.product_id}: {self.total_interactions} interactions>'
@@ -0,0 +1,55 @@
+from .database import db
+
+def hot_queries():
+    """The statements behind the API's hot paths, keyed by a readable name.
+
+    Whole-table loads (the user-item model, aggregate rebuilds) read every row
+    by design and are deliberately not listed.
+    """
+    from .interaction import Interaction
+    from .product import Product
+    from .recommendation import Recommendation
+
+    return {
+        'user interactions by recency': db.select(Interaction).where(
+            Interaction.user_id == 1
+        ).order_by(Interaction.timestamp.desc()).limit(50),
+        'user interaction counts by type': db.select(
+            Interaction.interaction_type, db.func.count(Interaction.id)
+        ).where(Interaction.user_id == 1).group_by(Interaction.interaction_type),
+        'user category preferences': db.select(
+            Product.category, db.func.count(Interaction.id)
+        ).join(Interaction).where(Interaction.user_id == 1).group_by(Product.category),
+        'user liked products': db.select(Interaction.product_id).where(
+            Interaction.user_id == 1, Interaction.rating >= 4
+        ),
+        'product interactions by type': db.select(db.func.count(Interaction.id)).where(
+            Interaction.product_id == 1, Interaction.interaction_type == 'rating'
+        ),
+        'interactions since timestamp': db.select(Interaction.product_id).where(
+            Interaction.timestamp >= '2024-01-01'
+        ),
+        'active recommendations by score': db.select(Recommendation).where(
+            Recommendation.user_id == 1, Recommendation.is_active.is_(True)
+        ).order_by(Recommendation.score.desc()).limit(5),
+        'products by exact category': db.select(Product).where(
+            Product.category == 'Electronics'
+        ).order_by(Product.id).limit(20),
+    }
+
+def check_query_plans():
+    """Return {name: (plan lines, full scan lines)} for every hot query on SQLite.
+
+    A line that starts with SCAN (rather than SEARCH) means SQLite reads the
+    whole table or index, i.e. no index serves the query's filter.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        raise RuntimeError('Query plan checks are only implemented for SQLite')
+
+    results = {}
+    for name, statement in hot_queries().items():
+        compiled = statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+        plan = [row[-1] for row in db.session.execute(db.text(f"EXPLAIN QUERY PLAN {compiled}"))]
+        full_scans = [line for line in plan if line.startswith('SCAN') and 'CONSTANT ROW' not in line]
+        results[name] = (plan, full_scans)
+    return results
@@ -1,8 +1,12 @@
 from .database import db
 from datetime import datetime
+from sqlalchemy.orm import make_transient_to_detached
 
 class Recommendation(db.Model):
     __tablename__ = 'recommendations'
+    __table_args__ = (
+        db.Index('ix_recommendations_user_active_score', 'user_id', 'is_active', 'score'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -13,6 +17,9 @@ class Recommendation(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True)  # For managing recommendation lifecycle
 
+    # Relationships
+    product = db.relationship('Product')
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -57,5 +64,65 @@ class Recommendation(db.Model):
             db.session.commit()
             return recommendation
 
+    @staticmethod
+    def replace_active(recommendations_by_user, return_rows=True):
+        """Replace users' active recommendations in one transaction.
+
+        Takes {user_id: [{'product_id', 'score', 'explanation', 'algorithm_used'}]},
+        deactivates the users' current rows with a single UPDATE and inserts the new
+        ones with a single executemany. When return_rows is set, the inserted rows
+        come back as persistent objects built from the INSERT ... RETURNING ids, so
+        no re-query is needed.
+        """
+        user_ids = list(recommendations_by_user)
+        now = datetime.utcnow()
+        rows = [
+            {
+                'user_id': user_id,
+                'product_id': rec['product_id'],
+                'score': rec['score'],
+                'explanation': rec['explanation'],
+                'algorithm_used': rec['algorithm_used'],
+                'created_at': now,
+                'is_active': True
+            }
+            for user_id, recs in recommendations_by_user.items()
+            for rec in recs
+        ]
+        table = Recommendation.__table__
+
+        try:
+            if user_ids:
+                # ORM-level update so rows already in the session see the change too
+                Recommendation.query.filter(
+                    Recommendation.user_id.in_(user_ids),
+                    Recommendation.is_active.is_(True)
+                ).update({'is_active': False})
+            ids = {}
+            if rows and return_rows:
+                # Match ids on (user, product) rather than asking for parameter order,
+                # which forces some backends into one INSERT per row
+                result = db.session.execute(
+                    table.insert().returning(table.c.id, table.c.user_id, table.c.product_id), rows
+                )
+                ids = {(user_id, product_id): row_id for row_id, user_id, product_id in result}
+            elif rows:
+                db.session.execute(table.insert(), rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        if not return_rows:
+            return len(rows)
+
+        saved = []
+        for row in rows:
+            recommendation = Recommendation(id=ids[(row['user_id'], row['product_id'])], **row)
+            make_transient_to_detached(recommendation)
+            db.session.add(recommendation)
+            saved.append(recommendation)
+        return saved
+
     def __repr__(self):
         return f'<Recommendation {self.user_id}->{self.product_id}: {self.score:.2f}>'
@@ -12,6 +12,7 @@ class User(db.Model):
     # Relationships
     interactions = db.relationship('Interaction', backref='user', lazy=True, cascade='all, delete-orphan')
     recommendations = db.relationship('Recommendation', backref='user', lazy=True, cascade='all, delete-orphan')
+    stats = db.relationship('UserStats', uselist=False, lazy=True, cascade='all, delete-orphan')
 
     def to_dict(self):
         return {
@@ -21,29 +22,22 @@ class User(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+    def get_total_interactions(self):
+        """Number of interactions this user has recorded, from the aggregates"""
+        return self.stats.total_interactions if self.stats else 0
+
     def get_favorite_categories(self, limit=5):
         """Get user's most interacted categories"""
-        from .interaction import Interaction
-        from .product import Product
-        from sqlalchemy import func
-
-        categories = db.session.query(
-            Product.category,
-            func.count(Interaction.id).label('interaction_count')
-        ).join(Interaction).filter(
-            Interaction.user_id == self.id
-        ).group_by(Product.category).order_by(
-            func.count(Interaction.id).desc()
-        ).limit(limit).all()
-
-        return [{'category': cat, 'count': count} for cat, count in categories]
+        if not self.stats:
+            return []
+        return [
+            {'category': stats.category, 'count': stats.total_interactions}
+            for stats in self.stats.favorite_categories(limit)
+        ]
 
     def get_average_rating_given(self):
         """Calculate average rating this user gives to products"""
-        rating_interactions = [i for i in self.interactions if i.interaction_type == 'rating' and i.rating is not None]
-        if not rating_interactions:
-            return 0
-        return round(sum(i.rating for i in rating_interactions) / len(rating_interactions), 1)
+        return self.stats.average_rating if self.stats else 0
 
     def __repr__(self):
         return f'<User {self.name}>'
@@ -0,0 +1,148 @@
+from .database import db, upsert_deltas
+from .product_stats import ProductStats
+from sqlalchemy import case, func
+
+class UserCategoryStats(db.Model):
+    """Denormalized per-user, per-category interaction and rating aggregates"""
+    __tablename__ = 'user_category_stats'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user_stats.user_id'), primary_key=True)
+    category = db.Column(db.String(100), primary_key=True)
+    total_interactions = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    rated_count = db.Column(db.Integer, nullable=False, default=0)
+
+    # Aggregate columns, in the order rebuild() selects them
+    DELTA_COLUMNS = ('total_interactions', 'rating_sum', 'rated_count')
+
+    @classmethod
+    def deltas_for(cls, rating=None):
+        """Column increments for a single interaction; any rated interaction counts toward the category average"""
+        deltas = {'total_interactions': 1}
+        if rating is not None:
+            deltas['rating_sum'] = rating
+            deltas['rated_count'] = 1
+        return deltas
+
+    @property
+    def average_rating(self):
+        return self.rating_sum / self.rated_count if self.rated_count else None
+
+    def __repr__(self):
+        return f'<UserCategoryStats {self.user_id} {self.category}: {self.total_interactions} interactions>'
+
+class UserStats(db.Model):
+    """Denormalized per-user interaction counts, rating totals and category breakdown.
+
+    Updated in the same transaction as each interaction, so the user detail
+    and stats endpoints read one row (plus its category rows) instead of
+    aggregating the user's history. Categories are the product's category
+    when the interaction was recorded; `flask aggregates rebuild-users`
+    recomputes everything from the interactions table.
+    """
+    __tablename__ = 'user_stats'
+
+    TYPE_COLUMNS = ProductStats.TYPE_COLUMNS
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    rated_count = db.Column(db.Integer, nullable=False, default=0)  # ratings contributing to rating_sum
+    total_interactions = db.Column(db.Integer, nullable=False, default=0)
+    views = db.Column(db.Integer, nullable=False, default=0)
+    clicks = db.Column(db.Integer, nullable=False, default=0)
+    ratings = db.Column(db.Integer, nullable=False, default=0)
+    favorites = db.Column(db.Integer, nullable=False, default=0)
+    purchases = db.Column(db.Integer, nullable=False, default=0)
+
+    categories = db.relationship('UserCategoryStats', lazy=True, cascade='all, delete-orphan',
+                                 order_by='UserCategoryStats.category')
+
+    @property
+    def average_rating(self):
+        if not self.rated_count:
+            return 0
+        return round(self.rating_sum / self.rated_count, 1)
+
+    def counts_by_type(self):
+        return {interaction_type: getattr(self, column) or 0 for interaction_type, column in self.TYPE_COLUMNS.items()}
+
+    def favorite_categories(self, limit=5):
+        """Categories with the most interactions, most first"""
+        ranked = sorted(self.categories, key=lambda stats: (-stats.total_interactions, stats.category))
+        return ranked[:limit]
+
+    @classmethod
+    def record_interaction(cls, user_id, category, interaction_type, rating=None):
+        """Add one interaction to the user's aggregates in the current transaction (no commit)"""
+        upsert_deltas(cls, {'user_id': user_id}, ProductStats.deltas_for(interaction_type, rating))
+        if category is not None:
+            upsert_deltas(UserCategoryStats, {'user_id': user_id, 'category': category},
+                          UserCategoryStats.deltas_for(rating))
+
+    @classmethod
+    def record_interactions(cls, interactions):
+        """Add many interactions with one UPDATE per distinct user and per distinct user category (no commit)"""
+        from .product import Product
+
+        product_ids = {interaction.product_id for interaction in interactions}
+        categories = dict(db.session.query(Product.id, Product.category).filter(Product.id.in_(product_ids)))
+
+        deltas_by_user, deltas_by_category = {}, {}
+        for interaction in interactions:
+            deltas = ProductStats.deltas_for(interaction.interaction_type, interaction.rating)
+            totals = deltas_by_user.setdefault(interaction.user_id, {})
+            for column, value in deltas.items():
+                totals[column] = totals.get(column, 0) + value
+            category = categories.get(interaction.product_id)
+            if category is not None:
+                totals = deltas_by_category.setdefault((interaction.user_id, category), {})
+                for column, value in UserCategoryStats.deltas_for(interaction.rating).items():
+                    totals[column] = totals.get(column, 0) + value
+
+        for user_id, deltas in deltas_by_user.items():
+            upsert_deltas(cls, {'user_id': user_id}, deltas)
+        for (user_id, category), deltas in deltas_by_category.items():
+            upsert_deltas(UserCategoryStats, {'user_id': user_id, 'category': category}, deltas)
+
+    @classmethod
+    def rebuild(cls):
+        """Recompute every user's aggregates from the interactions table"""
+        from .product import Product
+        from .interaction import Interaction
+
+        def count_type(interaction_type):
+            return func.coalesce(func.sum(case((Interaction.interaction_type == interaction_type, 1), else_=0)), 0)
+
+        is_rating = (Interaction.interaction_type == 'rating') & Interaction.rating.isnot(None)
+        rating_sum = func.coalesce(func.sum(case((is_rating, Interaction.rating), else_=0)), 0)
+        rated_count = func.coalesce(func.sum(case((is_rating, 1), else_=0)), 0)
+
+        users = db.select(
+            Interaction.user_id, rating_sum, rated_count, func.count(Interaction.id),
+            *[count_type(interaction_type) for interaction_type in cls.TYPE_COLUMNS]
+        ).group_by(Interaction.user_id)
+        # Category averages cover every rated interaction, not only the 'rating' type
+        has_rating = Interaction.rating.isnot(None)
+        user_categories = db.select(
+            Interaction.user_id, Product.category, func.count(Interaction.id),
+            func.coalesce(func.sum(case((has_rating, Interaction.rating), else_=0)), 0),
+            func.coalesce(func.sum(case((has_rating, 1), else_=0)), 0)
+        ).join(Product, Product.id == Interaction.product_id).group_by(Interaction.user_id, Product.category)
+
+        try:
+            db.session.execute(UserCategoryStats.__table__.delete())
+            db.session.execute(cls.__table__.delete())
+            db.session.execute(cls.__table__.insert().from_select(
+                ['user_id', 'rating_sum', 'rated_count', 'total_interactions', *cls.TYPE_COLUMNS.values()], users
+            ))
+            db.session.execute(UserCategoryStats.__table__.insert().from_select(
+                ['user_id', 'category', *UserCategoryStats.DELTA_COLUMNS], user_categories
+            ))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return cls.query.count()
+
+    def __repr__(self):
+        return f'<UserStats {self.user_id}: {self.total_interactions} interactions>'
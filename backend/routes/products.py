@@ -1,37 +1,71 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from models import db, Product, Interaction
-from services import RecommendationEngine
+from services.refresh_queue import get_refresh_queue
+from services.serialization import serialize_products, serialize_interactions, prefetch_products
+from services.popularity import get_popularity_service
+from services.trending import get_trending_service
+from services.catalog import get_catalog_counts
+from services.write_behind import get_write_buffer
 
 products_bp = Blueprint('products', __name__)
 
 @products_bp.route('/', methods=['GET'])
 def get_products():
-    """Get all products with optional filtering"""
+    """Get products with optional filtering and offset or cursor pagination"""
     try:
         # Get query parameters
         category = request.args.get('category')
+        category_match = request.args.get('category_match', default='contains')
         limit = request.args.get('limit', default=20, type=int)
         offset = request.args.get('offset', default=0, type=int)
+        cursor = request.args.get('cursor')  # last product id of the previous page
+
+        if cursor is not None:
+            try:
+                cursor = int(cursor)
+            except ValueError:
+                return jsonify({
+                    'success': False,
+                    'error': 'Invalid cursor. Must be an integer product id'
+                }), 400
+
+        if category_match not in ('contains', 'exact'):
+            return jsonify({
+                'success': False,
+                'error': "Invalid category_match. Must be one of: ['contains', 'exact']"
+            }), 400
 
         # Build query
         query = Product.query
 
-        if category:
+        if category and category_match == 'exact':
+            # Equality can use the products.category index
+            query = query.filter(Product.category == category)
+        elif category:
             query = query.filter(Product.category.ilike(f'%{category}%'))
 
-        # Apply pagination
-        products = query.offset(offset).limit(limit).all()
-        total = query.count()
+        # Filtered totals are cached until the catalog changes
+        total = get_catalog_counts().count((category, category_match), query)
+
+        # Keyset pagination on the primary key; offset kept for backward compatibility
+        query = query.order_by(Product.id)
+        if cursor is not None:
+            query = query.filter(Product.id > cursor)
+        else:
+            query = query.offset(offset)
+        products = query.limit(limit).all()
 
         # Convert to dict
-        products_data = [product.to_dict() for product in products]
+        products_data = serialize_products(products)
 
         return jsonify({
             'success': True,
             'products': products_data,
             'total': total,
             'limit': limit,
-            'offset': offset
+            'offset': offset if cursor is None else None,
+            'cursor': cursor,
+            'next_cursor': products[-1].id if len(products) == limit and products else None
         })
 
     except Exception as e:
@@ -50,6 +84,33 @@ def get_product(product_id):
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@products_bp.route('/<int:product_id>/similar', methods=['GET'])
+def get_similar_products(product_id):
+    """Get the products most similar to a product from the content index"""
+    try:
+        from services.content_index import get_content_index
+
+        Product.query.get_or_404(product_id)
+        limit = request.args.get('limit', default=10, type=int)
+
+        similar = get_content_index().similar_products(product_id, limit)
+        products = prefetch_products(similar_id for similar_id, _ in similar)
+
+        products_data = []
+        for similar_id, similarity in similar:
+            product_dict = products[similar_id].to_dict()
+            product_dict['similarity'] = similarity
+            products_data.append(product_dict)
+
+        return jsonify({
+            'success': True,
+            'product_id': product_id,
+            'products': products_data
+        })
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @products_bp.route('/interact', methods=['POST'])
 def interact_with_product():
     """Record user interaction with product"""
@@ -67,7 +128,7 @@ def interact_with_product():
             }), 400
 
         # Validate interaction type
-        valid_types = ['view', 'click', 'rating', 'favorite', 'purchase']
+        valid_types = Interaction.INTERACTION_TYPES
         if interaction_type not in valid_types:
             return jsonify({
                 'success': False,
@@ -81,6 +142,16 @@ def interact_with_product():
                 'error': 'Rating must be between 1 and 5'
             }), 400
 
+        # Low-value events go through the write-behind buffer when it is enabled
+        write_buffer = get_write_buffer()
+        if write_buffer and write_buffer.accepts(interaction_type):
+            if write_buffer.put(user_id, product_id, interaction_type, rating):
+                return jsonify({
+                    'success': True,
+                    'message': 'Interaction queued for recording',
+                    'queued': True
+                }), 202
+
         # Create interaction
         interaction = Interaction.create_interaction(
             user_id=user_id,
@@ -89,19 +160,64 @@ def interact_with_product():
             rating=rating
         )
 
-        # If this was a significant interaction, trigger recommendation update
+        # If this was a significant interaction, schedule a background recommendation update
         if interaction_type in ['rating', 'favorite', 'purchase']:
             try:
-                engine = RecommendationEngine()
-                recommendations = engine.generate_recommendations(user_id)
-                engine.save_recommendations(user_id, recommendations)
+                get_refresh_queue().enqueue(user_id)
             except Exception as rec_error:
-                print(f"Warning: Failed to update recommendations: {rec_error}")
+                print(f"Warning: Failed to schedule recommendation update: {rec_error}")
 
         return jsonify({
             'success': True,
             'message': 'Interaction recorded successfully',
-            'interaction': interaction.to_dict()
+            'interaction': serialize_interactions([interaction])[0]
+        })
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@products_bp.route('/interact/batch', methods=['POST'])
+def interact_with_products_batch():
+    """Record a batch of user interactions in one transaction"""
+    try:
+        from services.ingest import ingest_interactions
+
+        data = request.json or {}
+        interactions = data.get('interactions')
+
+        if not isinstance(interactions, list) or not interactions:
+            return jsonify({
+                'success': False,
+                'error': 'interactions must be a non-empty list'
+            }), 400
+
+        max_batch = current_app.config['MAX_INTERACTION_BATCH']
+        if len(interactions) > max_batch:
+            return jsonify({
+                'success': False,
+                'error': f'A batch can contain at most {max_batch} interactions'
+            }), 400
+
+        report = ingest_interactions(interactions)
+
+        return jsonify({
+            'success': report['inserted'] > 0 or report['rejected'] == 0,
+            'message': f"Recorded {report['inserted']} of {report['received']} interactions",
+            **report
+        })
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@products_bp.route('/write-buffer', methods=['GET'])
+def get_write_buffer_stats():
+    """Get write-behind buffer depth and flush latency metrics"""
+    try:
+        write_buffer = get_write_buffer()
+        return jsonify({
+            'success': True,
+            'enabled': write_buffer is not None,
+            'write_buffer': write_buffer.stats() if write_buffer else None
         })
 
     except Exception as e:
@@ -124,26 +240,43 @@ def get_categories():
 
 @products_bp.route('/popular', methods=['GET'])
 def get_popular_products():
-    """Get popular products based on interactions"""
+    """Get popular products based on all-time interactions or recent, decayed trending scores"""
     try:
         limit = request.args.get('limit', default=10, type=int)
+        ranking = request.args.get('ranking', current_app.config['POPULAR_RANKING'])
+        category = request.args.get('category')
+
+        rankings = current_app.config['POPULAR_RANKINGS']
+        if ranking not in rankings:
+            return jsonify({
+                'success': False,
+                'error': f'Invalid ranking. Must be one of: {list(rankings)}'
+            }), 400
+        if category and ranking != 'trending':
+            return jsonify({
+                'success': False,
+                'error': 'Filtering by category requires ranking=trending'
+            }), 400
 
-        # Get products with most interactions
-        popular_products = db.session.query(
-            Product,
-            db.func.count(Interaction.id).label('interaction_count')
-        ).outerjoin(Interaction).group_by(Product.id).order_by(
-            db.func.count(Interaction.id).desc()
-        ).limit(limit).all()
+        if ranking == 'trending':
+            # Top decayed, type-weighted scores from the in-memory trending buckets
+            popular = get_trending_service().top(limit, category=category)
+            score_field = 'trending_score'
+        else:
+            # Get products with most interactions from the shared popularity cache
+            popular = get_popularity_service().top(limit)
+            score_field = 'interaction_count'
+        products = prefetch_products(product_id for product_id, _ in popular)
 
         products_data = []
-        for product, interaction_count in popular_products:
-            product_dict = product.to_dict()
-            product_dict['interaction_count'] = interaction_count
+        for product_id, score in popular:
+            product_dict = products[product_id].to_dict()
+            product_dict[score_field] = round(score, 3) if ranking == 'trending' else score
             products_data.append(product_dict)
 
         return jsonify({
             'success': True,
+            'ranking': ranking,
             'products': products_data
         })
 
@@ -1,13 +1,32 @@
-from flask import Blueprint, request, jsonify
-from models import db, User, Product, Recommendation
-from services import RecommendationEngine, LLMService
+from flask import Blueprint, current_app, request, jsonify
+from models import User, Recommendation
+from services.llm_service import LLMService
+from services.refresh_queue import get_refresh_queue
+from services.serialization import serialize_recommendations, prefetch_products
+from services.popularity import get_popularity_service
+from services.trending import get_trending_service
+from services.tracing import Trace
 
 recommendations_bp = Blueprint('recommendations', __name__)
 
-# Initialize services
-engine = RecommendationEngine()
+# Initialize services; the engine on first use, keeping numpy/scipy/sklearn out of startup
+_engine = None
 llm_service = LLMService()
 
+def get_engine():
+    """Return the blueprint's recommendation engine, importing it on first use"""
+    global _engine
+    if _engine is None:
+        from services.recommendation_engine import RecommendationEngine
+        _engine = RecommendationEngine()
+    return _engine
+
+def _request_trace():
+    """A trace to return with the response when ?trace=1 is passed in debug mode"""
+    if current_app.debug and request.args.get('trace', type=int):
+        return Trace()
+    return None
+
 @recommendations_bp.route('/<int:user_id>', methods=['GET'])
 def get_user_recommendations(user_id):
     """Get recommendations for a specific user"""
@@ -15,12 +34,20 @@ def get_user_recommendations(user_id):
         user = User.query.get_or_404(user_id)
         limit = request.args.get('limit', default=5, type=int)
         refresh = request.args.get('refresh', default=False, type=bool)
+        algorithm = request.args.get('algorithm')
+        algorithms = current_app.config['RECOMMENDATION_ALGORITHMS']
+        if algorithm and algorithm not in algorithms:
+            return jsonify({
+                'success': False,
+                'error': f'Invalid algorithm. Must be one of: {list(algorithms)}'
+            }), 400
+        trace = _request_trace()
 
         if refresh:
             # Generate fresh recommendations
-            recommendations = engine.generate_recommendations(user_id, limit)
-            saved_recommendations = engine.save_recommendations(user_id, recommendations)
-            recommendations_data = [rec.to_dict() for rec in saved_recommendations]
+            recommendations = get_engine().generate_recommendations(user_id, limit, trace=trace, algorithm=algorithm)
+            saved_recommendations = get_engine().save_recommendations(user_id, recommendations, trace=trace)
+            recommendations_data = serialize_recommendations(saved_recommendations)
         else:
             # Get existing recommendations from database
             existing_recommendations = Recommendation.query.filter_by(
@@ -29,18 +56,21 @@ def get_user_recommendations(user_id):
 
             if not existing_recommendations:
                 # Generate new ones if none exist
-                recommendations = engine.generate_recommendations(user_id, limit)
-                saved_recommendations = engine.save_recommendations(user_id, recommendations)
-                recommendations_data = [rec.to_dict() for rec in saved_recommendations]
+                recommendations = get_engine().generate_recommendations(user_id, limit, trace=trace, algorithm=algorithm)
+                saved_recommendations = get_engine().save_recommendations(user_id, recommendations, trace=trace)
+                recommendations_data = serialize_recommendations(saved_recommendations)
             else:
-                recommendations_data = [rec.to_dict() for rec in existing_recommendations]
+                recommendations_data = serialize_recommendations(existing_recommendations)
 
-        return jsonify({
+        response = {
             'success': True,
             'user_id': user_id,
             'recommendations': recommendations_data,
             'count': len(recommendations_data)
-        })
+        }
+        if trace:
+            response['trace'] = trace.to_dict()
+        return jsonify(response)
 
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -52,9 +82,17 @@ def generate_recommendations(user_id):
         user = User.query.get_or_404(user_id)
         data = request.json or {}
         num_recommendations = data.get('count', 5)
+        algorithm = data.get('algorithm')
+        algorithms = current_app.config['RECOMMENDATION_ALGORITHMS']
+        if algorithm and algorithm not in algorithms:
+            return jsonify({
+                'success': False,
+                'error': f'Invalid algorithm. Must be one of: {list(algorithms)}'
+            }), 400
+        trace = _request_trace()
 
         # Generate recommendations
-        recommendations = engine.generate_recommendations(user_id, num_recommendations)
+        recommendations = get_engine().generate_recommendations(user_id, num_recommendations, trace=trace, algorithm=algorithm)
 
         if not recommendations:
             return jsonify({
@@ -63,50 +101,138 @@ def generate_recommendations(user_id):
                 'recommendations': []
             })
 
+        if data.get('explain'):
+            # Personalised explanations for the whole list, generated concurrently
+            user_profile = {
+                'favorite_categories': user.get_favorite_categories(),
+                'average_rating': user.get_average_rating_given()
+            }
+            products = prefetch_products(rec['product_id'] for rec in recommendations)
+            explanations = llm_service.generate_explanations(user_profile, [
+                (products[rec['product_id']].to_dict(), {'algorithm': rec['algorithm']}) for rec in recommendations
+            ])
+            for rec, explanation in zip(recommendations, explanations):
+                rec['explanation'] = explanation
+
         # Save to database
-        saved_recommendations = engine.save_recommendations(user_id, recommendations)
-        recommendations_data = [rec.to_dict() for rec in saved_recommendations]
+        saved_recommendations = get_engine().save_recommendations(user_id, recommendations, trace=trace)
+        recommendations_data = serialize_recommendations(saved_recommendations)
 
-        return jsonify({
+        response = {
             'success': True,
             'message': 'Recommendations generated successfully',
             'user_id': user_id,
             'recommendations': recommendations_data,
             'count': len(recommendations_data)
-        })
+        }
+        if trace:
+            response['trace'] = trace.to_dict()
+        return jsonify(response)
 
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @recommendations_bp.route('/popular', methods=['GET'])
 def get_popular_recommendations():
-    """Get generally popular products as recommendations"""
+    """Get generally popular or currently trending products as recommendations"""
     try:
         limit = request.args.get('limit', default=10, type=int)
+        ranking = request.args.get('ranking', current_app.config['POPULAR_RANKING'])
+        category = request.args.get('category')
 
-        # Get products with highest interaction counts
-        popular_products = db.session.query(
-            Product,
-            db.func.count(Interaction.id).label('interaction_count')
-        ).outerjoin(Interaction).group_by(Product.id).order_by(
-            db.func.count(Interaction.id).desc()
-        ).limit(limit).all()
+        rankings = current_app.config['POPULAR_RANKINGS']
+        if ranking not in rankings:
+            return jsonify({
+                'success': False,
+                'error': f'Invalid ranking. Must be one of: {list(rankings)}'
+            }), 400
+        if category and ranking != 'trending':
+            return jsonify({
+                'success': False,
+                'error': 'Filtering by category requires ranking=trending'
+            }), 400
 
         popular_recommendations = []
-        for product, interaction_count in popular_products:
-            popular_recommendations.append({
-                'product': product.to_dict(),
-                'interaction_count': interaction_count,
-                'explanation': f'This popular product has {interaction_count} user interactions',
-                'algorithm': 'popularity',
-                'score': min(1.0, interaction_count / 10.0)
-            })
+        if ranking == 'trending':
+            # Top decayed, type-weighted scores from the in-memory trending buckets
+            trending = get_trending_service().top(limit, category=category)
+            products = prefetch_products(product_id for product_id, _ in trending)
+            for product_id, trending_score in trending:
+                popular_recommendations.append({
+                    'product': products[product_id].to_dict(),
+                    'trending_score': round(trending_score, 3),
+                    'explanation': f'This product is trending, with {trending_score:.1f} weighted interactions recently',
+                    'algorithm': 'popularity',
+                    'score': min(1.0, trending_score / 10.0)
+                })
+        else:
+            # Get products with highest interaction counts from the shared popularity cache
+            popular = get_popularity_service().top(limit)
+            products = prefetch_products(product_id for product_id, _ in popular)
+            for product_id, interaction_count in popular:
+                popular_recommendations.append({
+                    'product': products[product_id].to_dict(),
+                    'interaction_count': interaction_count,
+                    'explanation': f'This popular product has {interaction_count} user interactions',
+                    'algorithm': 'popularity',
+                    'score': min(1.0, interaction_count / 10.0)
+                })
 
         return jsonify({
             'success': True,
+            'ranking': ranking,
             'recommendations': popular_recommendations,
             'count': len(popular_recommendations)
         })
 
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
+
+@recommendations_bp.route('/refresh-queue', methods=['GET'])
+def get_refresh_queue_stats():
+    """Get background refresh queue depth and lag metrics"""
+    try:
+        return jsonify({
+            'success': True,
+            'refresh_queue': get_refresh_queue().stats()
+        })
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@recommendations_bp.route('/popularity-cache', methods=['GET'])
+def get_popularity_cache_stats():
+    """Get popularity cache hit/miss counters"""
+    try:
+        return jsonify({
+            'success': True,
+            'popularity_cache': get_popularity_service().stats()
+        })
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@recommendations_bp.route('/trending-stats', methods=['GET'])
+def get_trending_stats():
+    """Get trending window, decay and heap counters"""
+    try:
+        return jsonify({
+            'success': True,
+            'trending': get_trending_service().stats()
+        })
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@recommendations_bp.route('/explanation-cache', methods=['GET'])
+def get_explanation_cache_stats():
+    """Get LLM explanation cache hit-rate and cost-saved counters"""
+    try:
+        return jsonify({
+            'success': True,
+            'explanation_cache': llm_service.cache.stats(),
+            'provider': llm_service.stats()
+        })
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
@@ -1,19 +1,59 @@
-from flask import Blueprint, request, jsonify
-from models import db, User, Interaction, Product
-from sqlalchemy import func
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from models import db, User, UserStats, Interaction
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+from services.serialization import serialize_interactions, stream_ndjson
 
 users_bp = Blueprint('users', __name__)
 
+def _get_user_with_stats_or_404(user_id):
+    """Load a user and their aggregates (with category rows) in one query"""
+    return User.query.options(
+        joinedload(User.stats).joinedload(UserStats.categories)
+    ).get_or_404(user_id)
+
+def _ndjson_response(statement, serialize, filename):
+    """Stream rows as newline-delimited JSON while they are read from the database"""
+    lines = stream_ndjson(statement, serialize, chunk_size=current_app.config['STREAM_CHUNK_SIZE'])
+    return Response(stream_with_context(lines), mimetype='application/x-ndjson', headers={
+        'Content-Disposition': f'attachment; filename={filename}'
+    })
+
 @users_bp.route('/', methods=['GET'])
 def get_users():
-    """Get all users"""
+    """Get users with cursor pagination, or stream all of them with format=ndjson"""
     try:
-        users = User.query.all()
+        if request.args.get('format') == 'ndjson':
+            return _ndjson_response(
+                select(User).order_by(User.id),
+                lambda users: [user.to_dict() for user in users],
+                'users.ndjson'
+            )
+
+        limit = request.args.get('limit', default=current_app.config['USER_PAGE_SIZE'], type=int)
+        limit = max(1, min(limit, current_app.config['MAX_USER_PAGE_SIZE']))
+        cursor = request.args.get('cursor')  # last user id of the previous page
+        if cursor is not None:
+            try:
+                cursor = int(cursor)
+            except ValueError:
+                return jsonify({
+                    'success': False,
+                    'error': 'Invalid cursor. Must be an integer user id'
+                }), 400
+
+        query = User.query.order_by(User.id)
+        if cursor is not None:
+            query = query.filter(User.id > cursor)
+        users = query.limit(limit).all()
         users_data = [user.to_dict() for user in users]
 
         return jsonify({
             'success': True,
-            'users': users_data
+            'users': users_data,
+            'limit': limit,
+            'cursor': cursor,
+            'next_cursor': users[-1].id if len(users) == limit else None
         })
 
     except Exception as e:
@@ -60,11 +100,11 @@ def create_user():
 def get_user(user_id):
     """Get specific user details"""
     try:
-        user = User.query.get_or_404(user_id)
+        user = _get_user_with_stats_or_404(user_id)
         user_dict = user.to_dict()
 
-        # Add interaction statistics
-        user_dict['total_interactions'] = len(user.interactions)
+        # Add interaction statistics from the per-user aggregates
+        user_dict['total_interactions'] = user.get_total_interactions()
         user_dict['favorite_categories'] = user.get_favorite_categories()
         user_dict['average_rating'] = user.get_average_rating_given()
 
@@ -78,12 +118,22 @@ def get_user(user_id):
 
 @users_bp.route('/<int:user_id>/interactions', methods=['GET'])
 def get_user_interactions(user_id):
-    """Get user's interaction history"""
+    """Get user's interaction history, or export all of it with format=ndjson"""
     try:
         user = User.query.get_or_404(user_id)
-        limit = request.args.get('limit', default=50, type=int)
         interaction_type = request.args.get('type')
 
+        if request.args.get('format') == 'ndjson':
+            statement = select(Interaction).filter_by(user_id=user_id)
+            if interaction_type:
+                statement = statement.filter_by(interaction_type=interaction_type)
+            return _ndjson_response(
+                statement.order_by(Interaction.timestamp.desc()),
+                serialize_interactions,
+                f'user-{user_id}-interactions.ndjson'
+            )
+
+        limit = request.args.get('limit', default=50, type=int)
         query = Interaction.query.filter_by(user_id=user_id)
         if interaction_type:
             query = query.filter_by(interaction_type=interaction_type)
@@ -92,12 +142,12 @@ def get_user_interactions(user_id):
             Interaction.timestamp.desc()
         ).limit(limit).all()
 
-        interactions_data = [interaction.to_dict() for interaction in interactions]
+        interactions_data = serialize_interactions(interactions)
 
         return jsonify({
             'success': True,
             'interactions': interactions_data,
-            'total': len(user.interactions)
+            'total': user.get_total_interactions()
         })
 
     except Exception as e:
@@ -107,40 +157,28 @@ def get_user_interactions(user_id):
 def get_user_stats(user_id):
     """Get detailed user statistics"""
     try:
-        user = User.query.get_or_404(user_id)
+        user = _get_user_with_stats_or_404(user_id)
+        stats = user.stats
 
         # Get interaction counts by type
-        interaction_stats = db.session.query(
-            Interaction.interaction_type,
-            func.count(Interaction.id).label('count')
-        ).filter_by(user_id=user_id).group_by(
-            Interaction.interaction_type
-        ).all()
-
-        interaction_counts = {stat[0]: stat[1] for stat in interaction_stats}
+        interaction_counts = {
+            interaction_type: count for interaction_type, count in stats.counts_by_type().items() if count
+        } if stats else {}
 
         # Get category preferences
-        category_stats = db.session.query(
-            Product.category,
-            func.count(Interaction.id).label('interaction_count'),
-            func.avg(Interaction.rating).label('avg_rating')
-        ).join(Interaction).filter(
-            Interaction.user_id == user_id
-        ).group_by(Product.category).all()
-
         category_preferences = []
-        for category, count, avg_rating in category_stats:
+        for category_stats in (stats.categories if stats else []):
             category_preferences.append({
-                'category': category,
-                'interaction_count': count,
-                'average_rating': float(avg_rating) if avg_rating else None
+                'category': category_stats.category,
+                'interaction_count': category_stats.total_interactions,
+                'average_rating': category_stats.average_rating
             })
 
         # Get recent activity
         recent_interactions = Interaction.query.filter_by(user_id=user_id).order_by(
             Interaction.timestamp.desc()
         ).limit(10).all()
-        recent_activity = [interaction.to_dict() for interaction in recent_interactions]
+        recent_activity = serialize_interactions(recent_interactions)
 
         return jsonify({
             'success': True,
@@ -148,7 +186,7 @@ def get_user_stats(user_id):
             'interaction_counts': interaction_counts,
             'category_preferences': category_preferences,
             'recent_activity': recent_activity,
-            'total_interactions': len(user.interactions)
+            'total_interactions': user.get_total_interactions()
         })
 
     except Exception as e:
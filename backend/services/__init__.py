@@ -1,4 +1,20 @@
-from .recommendation_engine import RecommendationEngine
-from .llm_service import LLMService
+import importlib
 
-__all__ = ['RecommendationEngine', 'LLMService']
+# Resolved on first access, so importing one light service (e.g. services.popularity)
+# does not pull numpy, scipy and sklearn in through the recommendation engine
+_EXPORTS = {
+    'RecommendationEngine': 'recommendation_engine',
+    'LLMService': 'llm_service',
+    'ContentIndex': 'content_index',
+    'get_content_index': 'content_index',
+    'SparseCollaborativeFilter': 'collaborative',
+    'UserItemModel': 'user_item_model',
+    'get_user_item_model': 'user_item_model'
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(f'.{_EXPORTS[name]}', __name__), name)
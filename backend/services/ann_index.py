@@ -0,0 +1,217 @@
+import logging
+import numpy as np
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+def _dense(matrix):
+    return matrix.toarray() if sparse.issparse(matrix) else np.asarray(matrix)
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+def _group_positions(labels, nlist, offset=0):
+    """Split positions offset..offset+len(labels) into one array per list"""
+    order = np.argsort(labels, kind='stable')
+    counts = np.bincount(labels, minlength=nlist)
+    return np.split(order.astype(np.int64) + offset, np.cumsum(counts)[:-1])
+
+class IVFIndex:
+    """Inverted-file approximate nearest-neighbour index over inner product.
+
+    Vectors (dense arrays or CSR matrices, L2-normalised for cosine) are
+    clustered with spherical k-means into nlist lists, and a query is scored
+    exactly against only the nprobe lists whose centroids are closest to it.
+    nprobe is the recall/latency knob; nprobe == nlist is an exact search.
+    add() assigns new vectors to their nearest existing list without
+    retraining the centroids, so lists drift out of balance as the index
+    grows and it should be rebuilt from time to time.
+    """
+
+    def __init__(self, nlist=None, nprobe=8, iterations=10, sample_size=50000, seed=42,
+                 chunk_size=1024, max_block=1 << 22):
+        self.requested_nlist = nlist
+        self.nprobe = nprobe
+        self.iterations = iterations
+        self.sample_size = sample_size
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.max_block = max_block  # score entries per dense block in search()
+
+        self.nlist = 0
+        self.centroids = None
+        self.lists = []
+        self.ids = np.empty(0, dtype=np.int64)
+        self.vectors = None
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def build(self, vectors, ids=None):
+        """Train centroids on a sample of vectors and fill the inverted lists; ids default to row positions"""
+        n = vectors.shape[0]
+        self.ids = np.arange(n, dtype=np.int64) if ids is None else np.asarray(ids, dtype=np.int64)
+        self.nlist = max(1, min(n, self.requested_nlist or int(round(np.sqrt(n)))))
+
+        rng = np.random.default_rng(self.seed)
+        if n:
+            sample = vectors[np.sort(rng.choice(n, min(n, self.sample_size), replace=False))]
+            self.centroids = self._train_centroids(sample, rng)
+        else:
+            self.centroids = np.zeros((1, vectors.shape[1]), dtype=np.float32)
+
+        self.vectors = vectors.tocsr() if sparse.issparse(vectors) else np.asarray(vectors, dtype=np.float32)
+        self._size = n
+        self.lists = _group_positions(self._assign(self.vectors), self.nlist)
+        return self
+
+    def _train_centroids(self, sample, rng):
+        """Spherical k-means on the training sample"""
+        seeds = rng.choice(sample.shape[0], self.nlist, replace=False)
+        centroids = _normalize_rows(_dense(sample[seeds]).astype(np.float32))
+        for _ in range(self.iterations):
+            labels = self._assign(sample, centroids)
+            members = sparse.csr_matrix(
+                (np.ones(len(labels), dtype=np.float32), (labels, np.arange(len(labels)))),
+                shape=(self.nlist, sample.shape[0])
+            )
+            sums = _dense(members @ sample).astype(np.float32)
+            # Lists that lost all their members keep their previous centroid
+            empty = np.bincount(labels, minlength=self.nlist) == 0
+            sums[empty] = centroids[empty]
+            centroids = _normalize_rows(sums)
+        return centroids
+
+    def _assign(self, vectors, centroids=None):
+        """Nearest centroid of every row, in bounded-memory chunks"""
+        centroids = self.centroids if centroids is None else centroids
+        labels = np.empty(vectors.shape[0], dtype=np.int64)
+        for start in range(0, vectors.shape[0], self.chunk_size):
+            stop = start + self.chunk_size
+            labels[start:stop] = np.argmax(_dense(vectors[start:stop] @ centroids.T), axis=1)
+        return labels
+
+    def add(self, vectors, ids=None):
+        """Insert new vectors into their nearest existing lists; ids default to the next row positions"""
+        m = vectors.shape[0]
+        if m == 0:
+            return self
+        offset = self._size
+        ids = np.arange(offset, offset + m, dtype=np.int64) if ids is None else np.asarray(ids, dtype=np.int64)
+        labels = self._assign(vectors)
+
+        if sparse.issparse(self.vectors):
+            self.vectors = sparse.vstack([self.vectors, sparse.csr_matrix(vectors)], format='csr')
+        else:
+            # Grow the dense buffer geometrically so repeated small inserts stay amortised O(1)
+            if offset + m > self.vectors.shape[0]:
+                grown = np.empty((max(offset + m, 2 * self.vectors.shape[0]), self.vectors.shape[1]), dtype=np.float32)
+                grown[:offset] = self.vectors[:offset]
+                self.vectors = grown
+            self.vectors[offset:offset + m] = _dense(vectors)
+        self.ids = np.concatenate([self.ids, ids])
+        self._size = offset + m
+
+        for label, positions in enumerate(_group_positions(labels, self.nlist, offset)):
+            if len(positions):
+                self.lists[label] = np.concatenate([self.lists[label], positions])
+        return self
+
+    def search(self, queries, k, nprobe=None, exclude_positions=None):
+        """Top-k (ids, scores) per query row, padded with -1 / -inf when fewer candidates exist.
+
+        Queries are grouped by their nearest list and each group is scored
+        against the union of its members' probed lists in one product, so
+        every query sees at least its own nprobe lists. exclude_positions
+        masks one row position per query (e.g. the query itself).
+        """
+        m = queries.shape[0]
+        out_ids = np.full((m, k), -1, dtype=np.int64)
+        out_scores = np.full((m, k), -np.inf, dtype=np.float32)
+        if m == 0 or k <= 0 or self._size == 0:
+            return out_ids, out_scores
+
+        nprobe = max(1, min(self.nlist, nprobe or self.nprobe))
+        probes = np.empty((m, nprobe), dtype=np.int64)
+        for start in range(0, m, self.chunk_size):
+            centroid_scores = _dense(queries[start:start + self.chunk_size] @ self.centroids.T)
+            nearest = np.argpartition(-centroid_scores, nprobe - 1, axis=1)[:, :nprobe]
+            order = np.argsort(-np.take_along_axis(centroid_scores, nearest, axis=1), axis=1)
+            probes[start:start + self.chunk_size] = np.take_along_axis(nearest, order, axis=1)
+
+        vectors = self.vectors if sparse.issparse(self.vectors) else self.vectors[:self._size]
+        # Narrow sparse vectors (e.g. TF-IDF) score faster as small dense blocks
+        densify = sparse.issparse(vectors) and vectors.shape[1] <= 1024
+        by_list = np.argsort(probes[:, 0], kind='stable')
+        _, starts = np.unique(probes[by_list, 0], return_index=True)
+        for group in np.split(by_list, starts[1:]):
+            candidates = np.concatenate([self.lists[probe] for probe in np.unique(probes[group])])
+            if len(candidates) == 0:
+                continue
+            candidate_vectors = _dense(vectors[candidates]) if densify else vectors[candidates]
+            # Bound the dense score block when lists are large or skewed
+            step = max(1, self.max_block // len(candidates))
+            for sub in range(0, len(group), step):
+                rows = group[sub:sub + step]
+                query_rows = _dense(queries[rows]) if densify else queries[rows]
+                self._score_rows(query_rows, rows, candidates, candidate_vectors, k,
+                                 exclude_positions, out_ids, out_scores)
+        return out_ids, out_scores
+
+    def _score_rows(self, queries, out_rows, candidates, candidate_vectors, k, exclude_positions, out_ids, out_scores):
+        scores = _dense(queries @ candidate_vectors.T).astype(np.float32)
+        if exclude_positions is not None:
+            scores[candidates[None, :] == exclude_positions[out_rows][:, None]] = -np.inf
+
+        top_k = min(k, len(candidates))
+        if top_k < len(candidates):
+            top = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+        else:
+            top = np.tile(np.arange(len(candidates)), (len(out_rows), 1))
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        out_scores[out_rows, :top_k] = top_scores
+        out_ids[out_rows, :top_k] = np.where(np.isfinite(top_scores), self.ids[candidates[top]], -1)
+
+    def to_arrays(self):
+        """Centroids, ids and flattened lists for an ArtifactStore; the vectors are saved by the owner"""
+        sizes = np.array([len(positions) for positions in self.lists], dtype=np.int64)
+        return {
+            'centroids': self.centroids,
+            'ids': self.ids,
+            'list_positions': np.concatenate(self.lists) if self.lists else np.empty(0, dtype=np.int64),
+            'list_offsets': np.concatenate([[0], np.cumsum(sizes)])
+        }
+
+    def params(self):
+        return {'nlist': self.nlist, 'nprobe': self.nprobe, 'iterations': self.iterations, 'seed': self.seed}
+
+    @classmethod
+    def from_arrays(cls, arrays, vectors, params):
+        """Rebuild an index around saved (possibly memory-mapped) arrays without retraining"""
+        index = cls(nlist=params['nlist'], nprobe=params['nprobe'], iterations=params['iterations'], seed=params['seed'])
+        index.nlist = params['nlist']
+        index.centroids = arrays['centroids']
+        index.ids = arrays['ids']
+        index.vectors = vectors
+        index._size = vectors.shape[0]
+        offsets = arrays['list_offsets']
+        # Views into the saved positions; add() replaces a list with a private copy when it grows
+        index.lists = [arrays['list_positions'][offsets[i]:offsets[i + 1]] for i in range(index.nlist)]
+        return index
+
+    def stats(self):
+        sizes = np.array([len(positions) for positions in self.lists]) if self.lists else np.zeros(1)
+        return {
+            'size': self._size,
+            'nlist': self.nlist,
+            'nprobe': self.nprobe,
+            'min_list': int(sizes.min()),
+            'mean_list': round(float(sizes.mean()), 1),
+            'max_list': int(sizes.max())
+        }
@@ -0,0 +1,89 @@
+import json
+import os
+import shutil
+import logging
+from datetime import datetime
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class ArtifactStore:
+    """Versioned directories of .npy arrays with a LATEST pointer.
+
+    Each version is written to a temporary directory and renamed into place,
+    then LATEST is replaced atomically, so readers only ever see complete
+    versions. Arrays are loaded with mmap_mode='r' by default: every process
+    that maps the same version shares its pages through the OS page cache
+    instead of holding a private copy.
+    """
+
+    def __init__(self, directory, prefix):
+        self.directory = directory
+        self.prefix = prefix
+
+    def path(self, version):
+        return os.path.join(self.directory, version)
+
+    def save(self, arrays, metadata=None, keep=None):
+        """Write a new version, make it the latest and optionally prune to the newest keep"""
+        os.makedirs(self.directory, exist_ok=True)
+        version = datetime.utcnow().strftime(f'{self.prefix}-%Y%m%d%H%M%S%f')
+        temp_path = os.path.join(self.directory, f'.{version}.tmp')
+        os.makedirs(temp_path)
+        try:
+            for name, array in arrays.items():
+                np.save(os.path.join(temp_path, f'{name}.npy'), np.ascontiguousarray(array), allow_pickle=False)
+            with open(os.path.join(temp_path, 'meta.json'), 'w') as f:
+                json.dump({'arrays': sorted(arrays), 'metadata': metadata or {}}, f)
+            os.rename(temp_path, self.path(version))
+        except Exception:
+            shutil.rmtree(temp_path, ignore_errors=True)
+            raise
+        self._write_latest(version)
+
+        if keep:
+            for old_version in self.versions()[:-keep]:
+                shutil.rmtree(self.path(old_version), ignore_errors=True)
+        return version
+
+    def load(self, version=None, mmap=True):
+        """Return (arrays, metadata, version) for a version (default: the latest), or None if there is none"""
+        version = version or self.latest()
+        if not version:
+            return None
+        path = self.path(version)
+        with open(os.path.join(path, 'meta.json')) as f:
+            manifest = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r' if mmap else None, allow_pickle=False)
+            for name in manifest['arrays']
+        }
+        return arrays, manifest['metadata'], version
+
+    def versions(self):
+        """Saved versions, oldest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            name for name in os.listdir(self.directory)
+            if name.startswith(f'{self.prefix}-') and os.path.isfile(os.path.join(self.directory, name, 'meta.json'))
+        )
+
+    def latest(self):
+        try:
+            with open(os.path.join(self.directory, 'LATEST')) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def activate(self, version):
+        """Point LATEST at an existing saved version (rollback)"""
+        if version not in self.versions():
+            raise ValueError(f"Unknown {self.prefix} version: {version}")
+        self._write_latest(version)
+
+    def _write_latest(self, version):
+        temp_path = os.path.join(self.directory, 'LATEST.tmp')
+        with open(temp_path, 'w') as f:
+            f.write(version)
+        os.replace(temp_path, os.path.join(self.directory, 'LATEST'))
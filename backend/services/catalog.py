@@ -0,0 +1,45 @@
+import threading
+import time
+from sqlalchemy import event
+from config import Config
+from models import Product
+
+class CatalogCountCache:
+    """Cached product counts per filter, dropped whenever the catalog changes.
+
+    Product inserts, updates and deletes in this process clear the cache
+    immediately; the TTL bounds staleness from writes made by other processes.
+    """
+
+    def __init__(self, ttl=60.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._counts = {}  # filter key -> (count, cached at)
+        self.hits = 0
+        self.misses = 0
+
+    def count(self, key, query):
+        """Return the cached count for key, running query.count() on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._counts.get(key)
+            if cached and now - cached[1] <= self.ttl:
+                self.hits += 1
+                return cached[0]
+            self.misses += 1
+
+        count = query.count()
+        with self._lock:
+            self._counts[key] = (count, now)
+        return count
+
+    def invalidate(self, *args):
+        with self._lock:
+            self._counts.clear()
+
+_catalog_counts = CatalogCountCache(ttl=Config.CATALOG_COUNT_CACHE_TTL)
+for _event_name in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(Product, _event_name, _catalog_counts.invalidate)
+
+def get_catalog_counts():
+    return _catalog_counts
@@ -0,0 +1,182 @@
+import copy
+import logging
+import numpy as np
+from scipy import sparse
+from models import db, Interaction
+from sqlalchemy import func
+
+logger = logging.getLogger(__name__)
+
+class SparseCollaborativeFilter:
+    """User-based collaborative filtering over a sparse CSR user-item rating matrix"""
+
+    def __init__(self, num_neighbors=5, min_similarity=0.1, like_threshold=4, min_ratings=10):
+        self.num_neighbors = num_neighbors
+        self.min_similarity = min_similarity
+        self.like_threshold = like_threshold
+        self.min_ratings = min_ratings
+
+        self.user_ids = np.empty(0, dtype=np.int64)
+        self.product_ids = np.empty(0, dtype=np.int64)
+        self.user_index = {}
+        self.product_index = {}
+        self.matrix = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self.row_norms = np.empty(0, dtype=np.float32)
+        self.num_ratings = 0
+
+    @classmethod
+    def from_database(cls, **kwargs):
+        """Build the matrix from per-(user, product) average ratings"""
+        rows = db.session.query(
+            Interaction.user_id,
+            Interaction.product_id,
+            func.avg(Interaction.rating).label('avg_rating')
+        ).filter(Interaction.rating.isnot(None)).group_by(
+            Interaction.user_id, Interaction.product_id
+        ).all()
+
+        if not rows:
+            return cls(**kwargs)
+
+        user_ids, product_ids, ratings = zip(*rows)
+        return cls.from_arrays(user_ids, product_ids, ratings, **kwargs)
+
+    @classmethod
+    def from_arrays(cls, user_ids, product_ids, ratings, **kwargs):
+        """Build the matrix from parallel arrays, one entry per (user, product) pair"""
+        model = cls(**kwargs)
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        product_ids = np.asarray(product_ids, dtype=np.int64)
+        ratings = np.asarray(ratings, dtype=np.float32)
+
+        model.user_ids, user_rows = np.unique(user_ids, return_inverse=True)
+        model.product_ids, product_cols = np.unique(product_ids, return_inverse=True)
+        model.user_index = {int(uid): i for i, uid in enumerate(model.user_ids)}
+        model.product_index = {int(pid): i for i, pid in enumerate(model.product_ids)}
+        model.matrix = sparse.csr_matrix(
+            (ratings, (user_rows, product_cols)),
+            shape=(len(model.user_ids), len(model.product_ids)),
+            dtype=np.float32
+        )
+        model.row_norms = np.sqrt(np.asarray(model.matrix.multiply(model.matrix).sum(axis=1)).ravel())
+        model.num_ratings = len(ratings)
+        return model
+
+    def with_ratings(self, user_ids, product_ids, ratings):
+        """Return a copy with these (user, product) ratings set, one entry per distinct pair.
+
+        Entries already in the matrix are overwritten in place; new pairs are
+        merged in with one sparse addition, and users or products the matrix
+        has not seen get rows and columns appended at the end. Only the rows
+        of the touched users have their norms recomputed. The original is left
+        untouched, so requests still holding it are unaffected.
+        """
+        model = copy.copy(self)
+        user_index, product_index = self.user_index, self.product_index
+        new_user_ids, new_product_ids = [], []
+        rows, cols = [], []
+        for user_id, product_id in zip(user_ids, product_ids):
+            row = user_index.get(user_id)
+            if row is None:
+                if not new_user_ids:
+                    user_index = dict(user_index)
+                row = user_index[user_id] = len(user_index)
+                new_user_ids.append(user_id)
+            col = product_index.get(product_id)
+            if col is None:
+                if not new_product_ids:
+                    product_index = dict(product_index)
+                col = product_index[product_id] = len(product_index)
+                new_product_ids.append(product_id)
+            rows.append(row)
+            cols.append(col)
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        ratings = np.asarray(ratings, dtype=np.float32)
+
+        matrix = self.matrix.copy()
+        matrix.resize((len(user_index), len(product_index)))
+        matrix.sort_indices()  # lookups below bisect each row's column indices
+        existing = np.zeros(len(rows), dtype=bool)
+        for i, (row, col) in enumerate(zip(rows.tolist(), cols.tolist())):
+            start, end = matrix.indptr[row], matrix.indptr[row + 1]
+            position = start + np.searchsorted(matrix.indices[start:end], col)
+            if position < end and matrix.indices[position] == col:
+                matrix.data[position] = ratings[i]
+                existing[i] = True
+        added = ~existing
+        if added.any():
+            matrix = (matrix + sparse.csr_matrix(
+                (ratings[added], (rows[added], cols[added])), shape=matrix.shape, dtype=np.float32
+            )).tocsr()
+            matrix.sort_indices()
+
+        touched = np.unique(rows)
+        row_norms = np.concatenate([self.row_norms, np.zeros(len(new_user_ids), dtype=self.row_norms.dtype)])
+        touched_rows = matrix[touched]
+        row_norms[touched] = np.sqrt(np.asarray(touched_rows.multiply(touched_rows).sum(axis=1)).ravel())
+
+        model.user_index, model.product_index = user_index, product_index
+        model.user_ids = np.concatenate([self.user_ids, np.asarray(new_user_ids, dtype=np.int64)])
+        model.product_ids = np.concatenate([self.product_ids, np.asarray(new_product_ids, dtype=np.int64)])
+        model.matrix = matrix
+        model.row_norms = row_norms
+        model.num_ratings = self.num_ratings + int(added.sum())
+        return model
+
+    def similar_users(self, user_id):
+        """Return (row indices, similarities) of the top neighbours of a user"""
+        row = self.user_index.get(user_id)
+        if row is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        # Cosine similarity between the target user and everyone else only
+        target = self.matrix[row]
+        dots = np.asarray((self.matrix @ target.T).todense()).ravel()
+        denom = self.row_norms * self.row_norms[row]
+        similarities = np.divide(dots, denom, out=np.zeros_like(dots), where=denom > 0)
+        similarities[row] = -np.inf  # exclude the user themselves
+
+        k = min(self.num_neighbors, len(similarities) - 1)
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        neighbors = np.argpartition(-similarities, k - 1)[:k]
+        neighbors = neighbors[np.argsort(-similarities[neighbors], kind='stable')]
+        keep = similarities[neighbors] >= self.min_similarity
+        return neighbors[keep], similarities[neighbors[keep]]
+
+    def recommend(self, user_id, num_recommendations=5):
+        """Return recommendation dicts in the engine's standard shape"""
+        if self.num_ratings < self.min_ratings:  # Not enough data for collaborative filtering
+            return []
+
+        row = self.user_index.get(user_id)
+        if row is None:
+            return []
+
+        neighbors, similarities = self.similar_users(user_id)
+        if len(neighbors) == 0:
+            return []
+
+        # Each candidate scores the best similarity among neighbours who rated it highly
+        liked = self.matrix[neighbors] >= self.like_threshold
+        weighted = sparse.diags(similarities.astype(np.float32)) @ liked.astype(np.float32)
+        scores = np.asarray(weighted.max(axis=0).todense()).ravel()
+        scores[self.matrix[row].indices] = 0  # products the user already rated
+
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > num_recommendations:
+            top = np.argpartition(-scores[candidates], num_recommendations - 1)[:num_recommendations]
+            candidates = candidates[top]
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+
+        return [
+            {
+                'product_id': int(self.product_ids[col]),
+                'score': float(scores[col]) * 0.8,  # Weight by similarity
+                'algorithm': 'collaborative',
+                'explanation': f"Users with similar preferences have highly rated this product (similarity: {scores[col]:.0%})"
+            }
+            for col in candidates
+        ]
@@ -0,0 +1,294 @@
+import threading
+import logging
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+from config import Config
+from models import db, Product
+from sqlalchemy import func
+from .ann_index import IVFIndex
+from .artifacts import ArtifactStore
+
+logger = logging.getLogger(__name__)
+
+class ContentIndex:
+    """Item-item TF-IDF similarity index with a sparse top-K neighbour list per product.
+
+    Catalogs of at least ann_min_products build their neighbour lists with an
+    IVF approximate index instead of comparing every pair of products.
+    Products appended after a build are vectorised with the existing
+    vocabulary and given neighbour lists without a rebuild, until they grow
+    the catalog by more than max_append_ratio; existing products only gain
+    the new ones as neighbours at the next full build.
+
+    A built index can be saved as a memory-mappable artifact version, which
+    server workers load read-only and share instead of each building one.
+    """
+
+    def __init__(self, top_k=50, min_similarity=0.1, max_features=100, chunk_size=1024,
+                 ann_min_products=None, ann_nlist=None, ann_nprobe=None, max_append_ratio=0.1):
+        self.top_k = top_k
+        self.min_similarity = min_similarity
+        self.max_features = max_features
+        self.chunk_size = chunk_size
+        self.ann_min_products = Config.ANN_MIN_PRODUCTS if ann_min_products is None else ann_min_products
+        self.ann_nlist = ann_nlist or Config.ANN_NLIST or None
+        self.ann_nprobe = ann_nprobe or Config.ANN_NPROBE
+        self.max_append_ratio = max_append_ratio
+
+        self.product_ids = np.empty(0, dtype=np.int64)  # sorted, looked up with searchsorted
+        self.categories = np.empty(0, dtype=str)
+        self.tfidf_matrix = None
+        self.neighbors = None  # CSR matrix, row i holds the top-K neighbours of product i
+        self.vectorizer = None
+        self.ann = None
+        self.built_size = 0
+        self.signature = None
+        self.version = None  # artifact version this index was loaded from, if any
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def catalog_signature():
+        """Cheap fingerprint of the product catalog used to detect changes"""
+        count, max_id, last_created = db.session.query(
+            func.count(Product.id),
+            func.max(Product.id),
+            func.max(Product.created_at)
+        ).one()
+        return (count, max_id, str(last_created) if last_created is not None else None)
+
+    def ensure_fresh(self):
+        """Rebuild the index if the catalog changed since the last build"""
+        signature = self.catalog_signature()
+        if signature != self.signature:
+            with self._lock:
+                if signature != self.signature and not self._append_new_products(signature):
+                    self.build(signature)
+        return self
+
+    def invalidate(self):
+        """Force a rebuild on next use"""
+        self.signature = None
+
+    def build(self, signature=None):
+        """Build TF-IDF vectors and neighbour lists from product category and description"""
+        rows = db.session.query(
+            Product.id, Product.category, Product.description
+        ).order_by(Product.id).all()
+
+        product_ids = np.array([row[0] for row in rows], dtype=np.int64)
+        categories = np.array([row[1] for row in rows], dtype=str)
+        features = [f"{row[1]} {row[2] or ''}" for row in rows]
+
+        vectorizer, tfidf_matrix, ann = None, None, None
+        neighbors = sparse.csr_matrix((len(rows), len(rows)), dtype=np.float32)
+        if rows:
+            try:
+                vectorizer = TfidfVectorizer(max_features=self.max_features, stop_words='english')
+                tfidf_matrix = vectorizer.fit_transform(features).astype(np.float32).tocsr()
+                if len(rows) >= self.ann_min_products:
+                    ann = IVFIndex(nlist=self.ann_nlist, nprobe=self.ann_nprobe, chunk_size=self.chunk_size).build(tfidf_matrix)
+                neighbors = self._top_k_neighbors(tfidf_matrix, np.arange(len(rows)), tfidf_matrix, ann)
+            except ValueError as e:
+                # Empty vocabulary, e.g. every description is only stop words
+                vectorizer = None
+                logger.warning(f"Content index built without features: {e}")
+
+        self.product_ids = product_ids
+        self.categories = categories
+        self.tfidf_matrix = tfidf_matrix
+        self.neighbors = neighbors
+        self.vectorizer = vectorizer
+        self.ann = ann
+        self.built_size = len(product_ids)
+        self.signature = signature if signature is not None else self.catalog_signature()
+        logger.info(f"Content index built for {len(product_ids)} products" + (f" ({ann.stats()})" if ann else ""))
+        return self
+
+    def _append_new_products(self, signature):
+        """Index products added since the last build in place; False when a full build is needed"""
+        if self.vectorizer is None or self.signature is None:
+            return False
+        count, max_id, _ = self.signature
+        rows = db.session.query(
+            Product.id, Product.category, Product.description
+        ).filter(Product.id > max_id).order_by(Product.id).all()
+        # Anything other than pure appends (deletions, or a catalog grown too far past the vocabulary) rebuilds
+        if not rows or count + len(rows) != signature[0]:
+            return False
+        if len(self.product_ids) + len(rows) > self.built_size * (1 + self.max_append_ratio):
+            return False
+
+        vectors = self.vectorizer.transform([f"{row[1]} {row[2] or ''}" for row in rows]).astype(np.float32).tocsr()
+        start = len(self.product_ids)
+        tfidf_matrix = sparse.vstack([self.tfidf_matrix, vectors], format='csr')
+        if self.ann is not None:
+            self.ann.add(vectors)
+        new_neighbors = self._top_k_neighbors(vectors, np.arange(start, start + len(rows)), tfidf_matrix, self.ann)
+        old_neighbors = sparse.csr_matrix(
+            (self.neighbors.data, self.neighbors.indices, self.neighbors.indptr),
+            shape=(start, tfidf_matrix.shape[0])
+        )
+
+        # Publish the wider arrays before the IDs so concurrent readers never index past them
+        self.tfidf_matrix = tfidf_matrix
+        self.neighbors = sparse.vstack([old_neighbors, new_neighbors], format='csr')
+        self.categories = np.concatenate([self.categories, np.array([row[1] for row in rows], dtype=str)])
+        self.product_ids = np.concatenate([self.product_ids, np.array([row[0] for row in rows], dtype=np.int64)])
+        self.signature = signature
+        logger.info(f"Content index extended with {len(rows)} new products")
+        return True
+
+    def _top_k_neighbors(self, queries, positions, tfidf_matrix, ann=None):
+        """Sparse top-K cosine neighbour rows for the query vectors at the given row positions"""
+        # TF-IDF rows are L2-normalised, so the dot product is the cosine similarity
+        n = tfidf_matrix.shape[0]
+        k = min(self.top_k, n - 1)
+        if k <= 0:
+            return sparse.csr_matrix((queries.shape[0], n), dtype=np.float32)
+
+        if ann is not None:
+            top, top_scores = ann.search(queries, k, exclude_positions=positions)
+        else:
+            top = np.empty((queries.shape[0], k), dtype=np.int64)
+            top_scores = np.empty((queries.shape[0], k), dtype=np.float32)
+            for start in range(0, queries.shape[0], self.chunk_size):
+                stop = min(start + self.chunk_size, queries.shape[0])
+                block = (queries[start:stop] @ tfidf_matrix.T).toarray()
+                block[np.arange(stop - start), positions[start:stop]] = 0  # no self-similarity
+                top[start:stop] = np.argpartition(-block, k - 1, axis=1)[:, :k]
+                top_scores[start:stop] = np.take_along_axis(block, top[start:stop], axis=1)
+
+        keep = top_scores >= self.min_similarity
+        return sparse.csr_matrix(
+            (top_scores[keep], top[keep], np.concatenate([[0], np.cumsum(keep.sum(axis=1))])),
+            shape=(queries.shape[0], n),
+            dtype=np.float32
+        )
+
+    def indices_for(self, product_ids):
+        """Map product IDs to matrix rows, dropping unknown IDs"""
+        known = self.product_ids
+        product_ids = np.fromiter(product_ids, dtype=np.int64)
+        if len(known) == 0 or len(product_ids) == 0:
+            return np.empty(0, dtype=np.int64)
+        rows = np.minimum(np.searchsorted(known, product_ids), len(known) - 1)
+        return rows[known[rows] == product_ids]
+
+    def score(self, liked_product_ids, exclude_product_ids=()):
+        """Max similarity of every product to any liked product, as a dense vector"""
+        liked_idx = self.indices_for(liked_product_ids)
+        scores = np.zeros(len(self.product_ids), dtype=np.float32)
+        if len(liked_idx) == 0 or self.neighbors is None:
+            return scores
+
+        scores = self.neighbors[liked_idx].max(axis=0).toarray().ravel()
+        scores[liked_idx] = 0
+        exclude_idx = self.indices_for(exclude_product_ids)
+        if len(exclude_idx):
+            scores[exclude_idx] = 0
+        return scores
+
+    def top_candidates(self, liked_product_ids, num_recommendations, exclude_product_ids=()):
+        """Return (product_id, similarity, category) for the best unseen products"""
+        scores = self.score(liked_product_ids, exclude_product_ids)
+        candidates = np.flatnonzero(scores > self.min_similarity)
+        if len(candidates) == 0:
+            return []
+
+        if len(candidates) > num_recommendations:
+            top = np.argpartition(-scores[candidates], num_recommendations - 1)[:num_recommendations]
+            candidates = candidates[top]
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+
+        return [
+            (int(self.product_ids[i]), float(scores[i]), str(self.categories[i]))
+            for i in candidates
+        ]
+
+    def similar_products(self, product_id, limit=10):
+        """Return (product_id, similarity) pairs for the nearest neighbours of a product"""
+        idx = self.indices_for([product_id])
+        if len(idx) == 0 or self.neighbors is None:
+            return []
+        row = self.neighbors.getrow(idx[0])
+        order = np.argsort(-row.data, kind='stable')[:limit]
+        return [(int(self.product_ids[row.indices[i]]), float(row.data[i])) for i in order]
+
+    def save(self, directory, keep=None):
+        """Write the index as a new artifact version and make it the latest; optionally prune to the newest keep"""
+        arrays = {
+            'product_ids': self.product_ids,
+            'categories': self.categories,
+            'neighbor_data': self.neighbors.data,
+            'neighbor_indices': self.neighbors.indices,
+            'neighbor_indptr': self.neighbors.indptr
+        }
+        if self.tfidf_matrix is not None:
+            arrays.update(tfidf_data=self.tfidf_matrix.data, tfidf_indices=self.tfidf_matrix.indices,
+                          tfidf_indptr=self.tfidf_matrix.indptr)
+        if self.vectorizer is not None:
+            vocabulary = sorted(self.vectorizer.vocabulary_, key=self.vectorizer.vocabulary_.get)
+            arrays.update(vocabulary=np.array(vocabulary, dtype=str), idf=self.vectorizer.idf_)
+        if self.ann is not None:
+            arrays.update({f'ann_{name}': array for name, array in self.ann.to_arrays().items()})
+        self.version = ArtifactStore(directory, 'content').save(arrays, {
+            'params': {'top_k': self.top_k, 'min_similarity': self.min_similarity, 'max_features': self.max_features},
+            'features': self.tfidf_matrix.shape[1] if self.tfidf_matrix is not None else 0,
+            'ann': self.ann.params() if self.ann is not None else None,
+            'built_size': self.built_size,
+            'signature': list(self.signature)
+        }, keep=keep)
+        return self.version
+
+    @classmethod
+    def load(cls, directory, version=None, mmap=True):
+        """Load a saved version (default: the latest), memory-mapped unless mmap is False; None if there is none"""
+        loaded = ArtifactStore(directory, 'content').load(version, mmap=mmap)
+        if loaded is None:
+            return None
+        arrays, metadata, version = loaded
+        index = cls(**metadata['params'])
+        n = len(arrays['product_ids'])
+        index.product_ids = arrays['product_ids']
+        index.categories = arrays['categories']
+        index.neighbors = sparse.csr_matrix(
+            (arrays['neighbor_data'], arrays['neighbor_indices'], arrays['neighbor_indptr']), shape=(n, n), copy=False
+        )
+        if 'tfidf_data' in arrays:
+            index.tfidf_matrix = sparse.csr_matrix(
+                (arrays['tfidf_data'], arrays['tfidf_indices'], arrays['tfidf_indptr']),
+                shape=(n, metadata['features']),
+                copy=False
+            )
+        if 'vocabulary' in arrays:
+            index.vectorizer = TfidfVectorizer(
+                vocabulary={str(term): i for i, term in enumerate(arrays['vocabulary'])}, stop_words='english'
+            )
+            index.vectorizer.idf_ = np.asarray(arrays['idf'])
+        if metadata['ann']:
+            index.ann = IVFIndex.from_arrays(
+                {name[len('ann_'):]: array for name, array in arrays.items() if name.startswith('ann_')},
+                index.tfidf_matrix,
+                metadata['ann']
+            )
+        index.built_size = metadata['built_size']
+        index.signature = tuple(metadata['signature'])
+        index.version = version
+        logger.info(f"Content index {version} loaded for {n} products")
+        return index
+
+# Shared process-wide index: the latest saved artifact if there is one, kept current as the catalog changes
+_content_index = None
+_content_index_lock = threading.Lock()
+
+def get_content_index():
+    """Return the shared content index, loading a newer artifact version or building it on first use"""
+    global _content_index
+    latest = ArtifactStore(Config.CONTENT_INDEX_DIR, 'content').latest()
+    if _content_index is None or (latest is not None and _content_index.version != latest):
+        with _content_index_lock:
+            if _content_index is None or (latest is not None and _content_index.version != latest):
+                loaded = ContentIndex.load(Config.CONTENT_INDEX_DIR, latest, mmap=Config.ARTIFACT_MMAP) if latest else None
+                _content_index = loaded or ContentIndex()
+    return _content_index.ensure_fresh()
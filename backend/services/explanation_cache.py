@@ -0,0 +1,114 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+def user_segment(user_profile):
+    """Reduce a user profile to the coarse segment an explanation depends on"""
+    user_profile = user_profile or {}
+    categories = []
+    for entry in user_profile.get('favorite_categories') or []:
+        category = entry.get('category') if isinstance(entry, dict) else entry
+        if category:
+            categories.append(str(category).strip().lower())
+
+    average_rating = user_profile.get('average_rating')
+    return {
+        'categories': sorted(categories[:3]),
+        'rating_bucket': round(float(average_rating)) if average_rating else None
+    }
+
+def explanation_fingerprint(user_profile, product, algorithm):
+    """Stable key for a (user segment, product, algorithm) combination"""
+    product = product or {}
+    payload = {
+        'segment': user_segment(user_profile),
+        'product': product.get('id') or [product.get('name'), product.get('category')],
+        'algorithm': algorithm
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+class ExplanationCache:
+    """Bounded LRU cache of generated explanations with an optional SQLite backing store"""
+
+    def __init__(self, max_entries=10000, path=None, cost_per_call=0.0):
+        self.max_entries = max_entries
+        self.path = path
+        self.cost_per_call = cost_per_call
+
+        self._entries = OrderedDict()  # key -> (explanation, source)
+        self._lock = threading.Lock()
+        self._store = None
+        if path:
+            self._store = sqlite3.connect(path, check_same_thread=False)
+            self._store.execute(
+                "CREATE TABLE IF NOT EXISTS explanations ("
+                "key TEXT PRIMARY KEY, explanation TEXT NOT NULL, source TEXT, created_at REAL)"
+            )
+            self._store.commit()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.cost_saved = 0.0
+
+    def get(self, key):
+        """Return the cached explanation or None, counting the lookup"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self._store is not None:
+                row = self._store.execute(
+                    "SELECT explanation, source FROM explanations WHERE key = ?", (key,)
+                ).fetchone()
+                if row:
+                    entry = (row[0], row[1])
+                    self._remember(key, entry)
+                    self.disk_hits += 1
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            if entry[1] != 'template':
+                self.cost_saved += self.cost_per_call
+            return entry[0]
+
+    def put(self, key, explanation, source):
+        with self._lock:
+            self._remember(key, (explanation, source))
+            if self._store is not None:
+                self._store.execute(
+                    "INSERT OR REPLACE INTO explanations (key, explanation, source, created_at) VALUES (?, ?, ?, ?)",
+                    (key, explanation, source, time.time())
+                )
+                self._store.commit()
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        """Hit-rate and cost-saved counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'persistent': self._store is not None,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'evictions': self.evictions,
+                'estimated_cost_saved': round(self.cost_saved, 4)
+            }
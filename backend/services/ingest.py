@@ -0,0 +1,94 @@
+import logging
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from models import db, User, Product, Interaction
+from .refresh_queue import get_refresh_queue
+
+logger = logging.getLogger(__name__)
+
+# Interaction types that change a user's recommendations
+REFRESH_TYPES = ['rating', 'favorite', 'purchase']
+
+def _integer_column(df, column):
+    """Coerce a column to integers, returning (values, mask of rows that are valid integers)"""
+    values = pd.to_numeric(df[column], errors='coerce') if column in df else pd.Series(np.nan, index=df.index)
+    valid = values.notna() & (values == values.round())
+    return values, valid
+
+def validate_interactions(records):
+    """Validate a batch column-wise, returning (rows to insert, per-item errors)"""
+    errors = {}
+    dict_mask = [isinstance(record, dict) for record in records]
+    for index, is_dict in enumerate(dict_mask):
+        if not is_dict:
+            errors[index] = 'Each interaction must be an object'
+
+    df = pd.DataFrame([record if is_dict else {} for record, is_dict in zip(records, dict_mask)])
+    df.index = range(len(records))
+    if df.empty:
+        return [], errors
+
+    def reject(mask, message):
+        for index in df.index[mask]:
+            errors.setdefault(int(index), message)
+
+    user_ids, valid_users = _integer_column(df, 'user_id')
+    product_ids, valid_products = _integer_column(df, 'product_id')
+    reject(~(valid_users & valid_products), 'user_id and product_id are required')
+
+    interaction_types = df['interaction_type'].fillna('view') if 'interaction_type' in df else pd.Series('view', index=df.index)
+    reject(~interaction_types.isin(Interaction.INTERACTION_TYPES),
+           f'Invalid interaction_type. Must be one of: {Interaction.INTERACTION_TYPES}')
+
+    raw_ratings = df['rating'] if 'rating' in df else pd.Series(np.nan, index=df.index, dtype=object)
+    ratings, valid_ratings = _integer_column(df, 'rating')
+    reject(raw_ratings.notna() & ~(valid_ratings & ratings.between(1, 5)), 'Rating must be between 1 and 5')
+
+    raw_timestamps = df['timestamp'] if 'timestamp' in df else pd.Series(None, index=df.index, dtype=object)
+    timestamps = pd.to_datetime(raw_timestamps, errors='coerce', utc=True, format='ISO8601')
+    reject(raw_timestamps.notna() & timestamps.isna(), 'timestamp must be an ISO 8601 string')
+
+    # Referenced users and products must exist: one IN query per table
+    candidate_users = set(user_ids[valid_users].astype(np.int64).tolist())
+    candidate_products = set(product_ids[valid_products].astype(np.int64).tolist())
+    known_users = {user_id for (user_id,) in db.session.query(User.id).filter(User.id.in_(candidate_users))} if candidate_users else set()
+    known_products = {product_id for (product_id,) in db.session.query(Product.id).filter(Product.id.in_(candidate_products))} if candidate_products else set()
+    reject(valid_users & ~user_ids.isin(known_users), 'Unknown user_id')
+    reject(valid_products & ~product_ids.isin(known_products), 'Unknown product_id')
+
+    now = datetime.utcnow()
+    rows = []
+    for index in df.index:
+        if int(index) in errors:
+            continue
+        timestamp = timestamps[index]
+        rows.append({
+            'user_id': int(user_ids[index]),
+            'product_id': int(product_ids[index]),
+            'interaction_type': interaction_types[index],
+            'rating': int(ratings[index]) if valid_ratings[index] else None,
+            'timestamp': timestamp.tz_convert(None).to_pydatetime() if pd.notna(timestamp) else now
+        })
+    return rows, errors
+
+def ingest_interactions(records):
+    """Validate and insert a batch of interactions, scheduling one refresh per affected user"""
+    rows, errors = validate_interactions(records)
+    created = Interaction.bulk_create(rows)
+
+    refresh_users = sorted({row['user_id'] for row in rows if row['interaction_type'] in REFRESH_TYPES})
+    queue = get_refresh_queue()
+    for user_id in refresh_users:
+        try:
+            queue.enqueue(user_id)
+        except Exception as e:
+            logger.warning(f"Failed to schedule recommendation update for user {user_id}: {e}")
+
+    return {
+        'received': len(records),
+        'inserted': len(created),
+        'rejected': len(errors),
+        'errors': [{'index': index, 'error': message} for index, message in sorted(errors.items())],
+        'refreshes_scheduled': len(refresh_users)
+    }
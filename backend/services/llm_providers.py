@@ -0,0 +1,90 @@
+import random
+import requests
+
+TEMPLATES = [
+    "Based on your interest in {category} products and previous purchases, this {product_name} aligns perfectly with your preferences. Your rating history shows you appreciate quality items in this price range.",
+
+    "Users with similar shopping patterns to yours have highly rated this {product_name}. Your preference for {category} products makes this an ideal recommendation for you.",
+
+    "This {product_name} complements your recent purchases and falls within your typical spending range. Your engagement with similar {category} items suggests you'll find this valuable.",
+
+    "Given your positive ratings for {category} products and your shopping behavior, this {product_name} represents excellent value and quality that matches your standards.",
+
+    "Your interaction history indicates a strong preference for {category} items. This {product_name} has received excellent reviews from users with similar tastes to yours.",
+
+    "Based on your purchase history and the high ratings you've given to similar products, this {product_name} in the {category} category is likely to meet your expectations.",
+
+    "This {product_name} is recommended because of your demonstrated interest in quality {category} products and your consistent preference for items in this price range."
+]
+
+ALGORITHM_SUFFIXES = {
+    'collaborative': " Similar users have given this product high ratings.",
+    'content-based': " The product features match your demonstrated preferences.",
+    'hybrid': " This recommendation combines both your preferences and community feedback.",
+    'mf': " It was picked from patterns across your whole shopping history."
+}
+
+def build_prompt(user_profile, product, recommendation_context):
+    """Prompt shared by the remote providers"""
+    categories = ', '.join(
+        entry.get('category', '') if isinstance(entry, dict) else str(entry)
+        for entry in (user_profile or {}).get('favorite_categories') or []
+    ) or 'unknown'
+    return (
+        "In two sentences, explain to a shopper why this product is recommended to them.\n"
+        f"Product: {product.get('name')} ({product.get('category')}), ${product.get('price')}\n"
+        f"Description: {product.get('description') or ''}\n"
+        f"Shopper's favorite categories: {categories}\n"
+        f"Shopper's average rating given: {(user_profile or {}).get('average_rating') or 'n/a'}\n"
+        f"Recommendation method: {recommendation_context.get('algorithm')}"
+    )
+
+class TemplateProvider:
+    """Local templates; free, instant and deterministic when seeded"""
+    name = 'template'
+
+    def generate(self, user_profile, product, recommendation_context, timeout=None, seed=None):
+        template = random.Random(seed).choice(TEMPLATES) if seed is not None else random.choice(TEMPLATES)
+        explanation = template.format(
+            category=product.get('category', 'quality').lower(),
+            product_name=product.get('name', 'item').lower(),
+        )
+        return explanation + ALGORITHM_SUFFIXES.get(recommendation_context.get('algorithm'), '')
+
+class OpenAIProvider:
+    """OpenAI chat completions"""
+    name = 'openai'
+
+    def __init__(self, api_key, model='gpt-4o-mini', max_tokens=120):
+        import openai
+
+        self.client = openai.OpenAI(api_key=api_key, max_retries=0)  # retries are handled by LLMService
+        self.model = model
+        self.max_tokens = max_tokens
+
+    def generate(self, user_profile, product, recommendation_context, timeout=None, seed=None):
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[{'role': 'user', 'content': build_prompt(user_profile, product, recommendation_context)}],
+            max_tokens=self.max_tokens,
+            timeout=timeout
+        )
+        return response.choices[0].message.content.strip()
+
+class HTTPStubProvider:
+    """Local HTTP stub (see benchmarks/llm_stub_server.py) for offline concurrency and latency tests"""
+    name = 'stub'
+
+    def __init__(self, url, pool_size=10):
+        self.url = url
+        self.session = requests.Session()
+        self.session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=pool_size))
+
+    def generate(self, user_profile, product, recommendation_context, timeout=None, seed=None):
+        response = self.session.post(self.url, json={
+            'prompt': build_prompt(user_profile, product, recommendation_context),
+            'product': product,
+            'algorithm': recommendation_context.get('algorithm')
+        }, timeout=timeout)
+        response.raise_for_status()
+        return response.json()['explanation']
@@ -1,6 +1,10 @@
-import random
+import threading
+import time
 import logging
+from concurrent.futures import ThreadPoolExecutor, wait
 from config import Config
+from .explanation_cache import ExplanationCache, explanation_fingerprint
+from .llm_providers import TemplateProvider, OpenAIProvider, HTTPStubProvider
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -8,57 +12,136 @@ logger = logging.getLogger(__name__)
 class LLMService:
     def __init__(self):
         self.api_key = Config.OPENAI_API_KEY
-        if self.api_key and self.api_key != 'your-openai-api-key-here':
+        self.template_provider = TemplateProvider()
+        self.provider = self._create_provider(Config.LLM_PROVIDER)
+        self.use_openai = self.provider.name == 'openai'
+
+        self.call_timeout = Config.LLM_CALL_TIMEOUT
+        self.max_retries = Config.LLM_MAX_RETRIES
+        self.batch_deadline = Config.LLM_BATCH_DEADLINE
+        self.max_concurrency = Config.LLM_MAX_CONCURRENCY
+        self._executor = None
+
+        self.cache = ExplanationCache(
+            max_entries=Config.LLM_CACHE_MAX_ENTRIES,
+            path=Config.LLM_CACHE_PATH,
+            cost_per_call=Config.LLM_COST_PER_CALL
+        )
+
+        self._counter_lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+
+    def _create_provider(self, name):
+        """Pick the explanation provider: openai, stub, template, or auto (openai when a key is set)"""
+        has_key = self.api_key and self.api_key != 'your-openai-api-key-here'
+        if name == 'stub':
+            return HTTPStubProvider(Config.LLM_STUB_URL, pool_size=Config.LLM_MAX_CONCURRENCY)
+        if name in ('openai', 'auto') and has_key:
             try:
-                import openai
-                openai.api_key = self.api_key
-                self.use_openai = True
+                return OpenAIProvider(self.api_key, model=Config.LLM_MODEL)
             except ImportError:
-                self.use_openai = False
                 logger.warning("OpenAI library not installed, using mock explanations")
-        else:
-            self.use_openai = False
+        elif name != 'template':
             logger.warning("OpenAI API key not configured, using mock explanations")
+        return self.template_provider
 
     def generate_explanation(self, user_profile, product, recommendation_context):
         """Generate explanation for why a product is recommended to a user"""
-        if self.use_openai:
-            return self._generate_openai_explanation(user_profile, product, recommendation_context)
-        else:
-            return self._generate_mock_explanation(user_profile, product, recommendation_context)
+        key = explanation_fingerprint(user_profile, product, recommendation_context.get('algorithm'))
+        explanation = self.cache.get(key)
+        if explanation is not None:
+            return explanation
 
-    def _generate_mock_explanation(self, user_profile, product, recommendation_context):
-        """Generate mock explanation when OpenAI is not available"""
-        templates = [
-            "Based on your interest in {category} products and previous purchases, this {product_name} aligns perfectly with your preferences. Your rating history shows you appreciate quality items in this price range.",
+        if self.provider is self.template_provider:
+            explanation = self._generate_mock_explanation(user_profile, product, recommendation_context, seed=key)
+            self.cache.put(key, explanation, 'template')
+            return explanation
 
-            "Users with similar shopping patterns to yours have highly rated this {product_name}. Your preference for {category} products makes this an ideal recommendation for you.",
+        deadline = time.monotonic() + self.call_timeout * (self.max_retries + 1)
+        explanation = self._call_provider(key, user_profile, product, recommendation_context, deadline)
+        if explanation is None:
+            explanation = self._generate_mock_explanation(user_profile, product, recommendation_context, seed=key)
+        return explanation
 
-            "This {product_name} complements your recent purchases and falls within your typical spending range. Your engagement with similar {category} items suggests you'll find this valuable.",
+    def generate_explanations(self, user_profile, items, deadline=None):
+        """Generate explanations for a whole recommendation list concurrently.
 
-            "Given your positive ratings for {category} products and your shopping behavior, this {product_name} represents excellent value and quality that matches your standards.",
+        items is a list of (product, recommendation_context) pairs. Cached
+        entries are answered immediately, the rest go to the provider on a
+        bounded thread pool. Anything not finished when the batch deadline
+        passes gets a template explanation; late provider answers still land
+        in the cache for next time.
+        """
+        deadline = time.monotonic() + (self.batch_deadline if deadline is None else deadline)
+        keys = [explanation_fingerprint(user_profile, product, context.get('algorithm')) for product, context in items]
+        explanations = [self.cache.get(key) for key in keys]
 
-            "Your interaction history indicates a strong preference for {category} items. This {product_name} has received excellent reviews from users with similar tastes to yours.",
+        pending = [i for i, explanation in enumerate(explanations) if explanation is None]
+        if pending and self.provider is not self.template_provider:
+            futures = {
+                self._get_executor().submit(
+                    self._call_provider, keys[i], user_profile, items[i][0], items[i][1], deadline
+                ): i
+                for i in pending
+            }
+            done, _ = wait(futures, timeout=max(0.0, deadline - time.monotonic()))
+            for future in done:
+                explanations[futures[future]] = future.result()
 
-            "Based on your purchase history and the high ratings you've given to similar products, this {product_name} in the {category} category is likely to meet your expectations.",
+        for i, (product, context) in enumerate(items):
+            if explanations[i] is None:
+                explanations[i] = self._generate_mock_explanation(user_profile, product, context, seed=keys[i])
+                if self.provider is self.template_provider:
+                    self.cache.put(keys[i], explanations[i], 'template')
+        return explanations
 
-            "This {product_name} is recommended because of your demonstrated interest in quality {category} products and your consistent preference for items in this price range."
-        ]
+    def _call_provider(self, key, user_profile, product, recommendation_context, deadline):
+        """Call the provider with per-call timeouts and retries until the deadline; None on failure"""
+        for attempt in range(self.max_retries + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._count('timeouts')
+                return None
+            try:
+                self._count('calls')
+                explanation = self.provider.generate(
+                    user_profile, product, recommendation_context,
+                    timeout=min(self.call_timeout, remaining), seed=key
+                )
+                self.cache.put(key, explanation, self.provider.name)
+                return explanation
+            except Exception as e:
+                self._count('failures')
+                logger.warning(f"{self.provider.name} explanation attempt {attempt + 1} failed: {e}")
+                time.sleep(min(0.1 * 2 ** attempt, max(0.0, deadline - time.monotonic())))
+        return None
 
-        # Select random template and fill in details
-        template = random.choice(templates)
+    def _count(self, counter):
+        with self._counter_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
 
-        explanation = template.format(
-            category=product.get('category', 'quality').lower(),
-            product_name=product.get('name', 'item').lower(),
-        )
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='llm')
+        return self._executor
 
-        # Add context-specific information
-        if recommendation_context.get('algorithm') == 'collaborative':
-            explanation += " Similar users have given this product high ratings."
-        elif recommendation_context.get('algorithm') == 'content-based':
-            explanation += " The product features match your demonstrated preferences."
-        elif recommendation_context.get('algorithm') == 'hybrid':
-            explanation += " This recommendation combines both your preferences and community feedback."
+    def _generate_openai_explanation(self, user_profile, product, recommendation_context):
+        """Generate an explanation with OpenAI chat completions"""
+        return self.provider.generate(user_profile, product, recommendation_context, timeout=self.call_timeout)
 
-        return explanation
+    def _generate_mock_explanation(self, user_profile, product, recommendation_context, seed=None):
+        """Generate mock explanation when OpenAI is not available"""
+        return self.template_provider.generate(user_profile, product, recommendation_context, seed=seed)
+
+    def stats(self):
+        return {
+            'provider': self.provider.name,
+            'max_concurrency': self.max_concurrency,
+            'call_timeout_seconds': self.call_timeout,
+            'batch_deadline_seconds': self.batch_deadline,
+            'calls': self.calls,
+            'failures': self.failures,
+            'timeouts': self.timeouts
+        }
@@ -0,0 +1,264 @@
+import threading
+import time
+import logging
+from datetime import datetime
+import numpy as np
+from scipy import sparse
+from sqlalchemy import case, func
+from config import Config
+from models import db, Interaction
+from .ann_index import IVFIndex
+from .artifacts import ArtifactStore
+
+logger = logging.getLogger(__name__)
+
+# Implicit signal strength per interaction type; ratings count by stars above 2
+INTERACTION_WEIGHTS = {'view': 1.0, 'click': 2.0, 'favorite': 4.0, 'purchase': 6.0}
+RATING_WEIGHT_PER_STAR = 1.5
+
+def load_interaction_weights(weights=None, rating_weight=RATING_WEIGHT_PER_STAR):
+    """Summed implicit weight per (user, product) pair, aggregated in SQL"""
+    weights = weights or INTERACTION_WEIGHTS
+    weight = case(
+        *[(Interaction.interaction_type == interaction_type, value) for interaction_type, value in weights.items()],
+        (Interaction.interaction_type == 'rating',
+         case((Interaction.rating > 2, (Interaction.rating - 2) * rating_weight), else_=0.0)),
+        else_=0.0
+    )
+    rows = db.session.query(
+        Interaction.user_id,
+        Interaction.product_id,
+        func.sum(weight)
+    ).group_by(Interaction.user_id, Interaction.product_id).all()
+
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    user_ids, product_ids, values = zip(*rows)
+    return (np.asarray(user_ids, dtype=np.int64), np.asarray(product_ids, dtype=np.int64),
+            np.asarray(values, dtype=np.float32))
+
+def _rowwise_dots(left, right, rows, cols, chunk_size=1 << 18):
+    """left[rows[i]] . right[cols[i]] for every nonzero, in bounded-memory chunks"""
+    out = np.empty(len(rows), dtype=np.float32)
+    for start in range(0, len(rows), chunk_size):
+        stop = start + chunk_size
+        out[start:stop] = np.einsum('ij,ij->i', left[rows[start:stop]], right[cols[start:stop]])
+    return out
+
+def _conjugate_gradient(X, Y, confidence, regularization, steps):
+    """One ALS half-step for all rows of X at once (Hu, Koren & Volinsky; CG as in Takacs et al.).
+
+    Solves (Y'Y + Y'(C_u - I)Y + lambda I) x_u = Y'C_u p(u) for every user,
+    where confidence holds alpha * r_ui (so C_u - I) and p(u) is 1 on its
+    nonzeros. The sparse term is applied through one CSR product per step.
+    """
+    rows = np.repeat(np.arange(confidence.shape[0]), np.diff(confidence.indptr))
+    cols = confidence.indices
+    gram = Y.T @ Y + regularization * np.eye(Y.shape[1], dtype=np.float32)
+
+    def apply(P):
+        weights = confidence.data * _rowwise_dots(P, Y, rows, cols)
+        return P @ gram + sparse.csr_matrix((weights, cols, confidence.indptr), shape=confidence.shape) @ Y
+
+    # b = Y' C_u p(u) = (confidence + 1 on nonzeros) @ Y
+    targets = sparse.csr_matrix((confidence.data + 1.0, cols, confidence.indptr), shape=confidence.shape) @ Y
+    residual = targets - apply(X)
+    direction = residual.copy()
+    residual_sq = np.einsum('ij,ij->i', residual, residual)
+    for _ in range(steps):
+        applied = apply(direction)
+        denominator = np.einsum('ij,ij->i', direction, applied)
+        step = np.divide(residual_sq, denominator, out=np.zeros_like(residual_sq), where=denominator > 1e-12)
+        X += step[:, None] * direction
+        residual -= step[:, None] * applied
+        new_residual_sq = np.einsum('ij,ij->i', residual, residual)
+        ratio = np.divide(new_residual_sq, residual_sq, out=np.zeros_like(residual_sq), where=residual_sq > 1e-12)
+        direction = residual + ratio[:, None] * direction
+        residual_sq = new_residual_sq
+    return X
+
+class ImplicitMatrixFactorization:
+    """Implicit-feedback matrix factorization trained with alternating least squares.
+
+    Serving scores every product for a user with one matrix-vector product,
+    masks the products the user already interacted with and takes the top k
+    with argpartition. With an ANN index built over the item factors, only
+    the products in the probed lists are scored. Saved models are loaded
+    memory-mapped, so server workers share one copy of the factors.
+    """
+
+    def __init__(self, factors=32, regularization=5.0, alpha=5.0, iterations=15, cg_steps=3, seed=42):
+        self.factors = factors
+        self.regularization = regularization
+        self.alpha = alpha
+        self.iterations = iterations
+        self.cg_steps = cg_steps
+        self.seed = seed
+
+        self.user_ids = np.empty(0, dtype=np.int64)
+        self.product_ids = np.empty(0, dtype=np.int64)  # sorted, so lookups need no per-process dict
+        self.user_factors = np.empty((0, factors), dtype=np.float32)
+        self.item_factors = np.empty((0, factors), dtype=np.float32)
+        self.seen = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self.ann = None
+        self.version = None
+        self.trained_at = None
+        self.training_seconds = None
+
+    def params(self):
+        return {
+            'factors': self.factors,
+            'regularization': self.regularization,
+            'alpha': self.alpha,
+            'iterations': self.iterations,
+            'cg_steps': self.cg_steps,
+            'seed': self.seed
+        }
+
+    def fit(self, user_ids, product_ids, weights):
+        """Train from parallel arrays of (user, product, summed implicit weight)"""
+        started = time.perf_counter()
+        self.user_ids, user_rows = np.unique(np.asarray(user_ids, dtype=np.int64), return_inverse=True)
+        self.product_ids, product_cols = np.unique(np.asarray(product_ids, dtype=np.int64), return_inverse=True)
+
+        shape = (len(self.user_ids), len(self.product_ids))
+        weights = np.asarray(weights, dtype=np.float32)
+        self.seen = sparse.csr_matrix((np.ones_like(weights), (user_rows, product_cols)), shape=shape, dtype=np.float32)
+        # Pairs whose only signal is a low rating stay masked at serving time but carry no preference
+        confidence = sparse.csr_matrix((self.alpha * weights, (user_rows, product_cols)), shape=shape, dtype=np.float32)
+        confidence.eliminate_zeros()
+        confidence_t = confidence.T.tocsr()
+
+        rng = np.random.default_rng(self.seed)
+        scale = 0.01
+        self.user_factors = (rng.standard_normal((shape[0], self.factors)) * scale).astype(np.float32)
+        self.item_factors = (rng.standard_normal((shape[1], self.factors)) * scale).astype(np.float32)
+
+        for _ in range(self.iterations):
+            self.user_factors = _conjugate_gradient(
+                self.user_factors, self.item_factors, confidence, self.regularization, self.cg_steps
+            )
+            self.item_factors = _conjugate_gradient(
+                self.item_factors, self.user_factors, confidence_t, self.regularization, self.cg_steps
+            )
+
+        self.trained_at = datetime.utcnow().isoformat()
+        self.training_seconds = round(time.perf_counter() - started, 3)
+        return self
+
+    @classmethod
+    def train_from_database(cls, **kwargs):
+        """Fit a model on the current interactions table"""
+        user_ids, product_ids, weights = load_interaction_weights()
+        return cls(**kwargs).fit(user_ids, product_ids, weights)
+
+    def build_ann_index(self, nlist=None, nprobe=8):
+        """Serve top-k from an IVF index over the item factors instead of scoring every product"""
+        self.ann = IVFIndex(nlist=nlist, nprobe=nprobe).build(self.item_factors)
+        return self
+
+    def user_row(self, user_id):
+        """Row of a user in the factor matrix, or None if the model has not seen them"""
+        row = int(np.searchsorted(self.user_ids, user_id))
+        return row if row < len(self.user_ids) and self.user_ids[row] == user_id else None
+
+    def recommend(self, user_id, num_recommendations=5):
+        """Return recommendation dicts in the engine's standard shape; [] for unknown users"""
+        row = self.user_row(user_id)
+        if row is None or num_recommendations <= 0:
+            return []
+        seen = self.seen.indices[self.seen.indptr[row]:self.seen.indptr[row + 1]]
+
+        if self.ann is not None:
+            # Over-fetch by the number of seen products so masking them still leaves k
+            cols, col_scores = self.ann.search(self.user_factors[row][None], num_recommendations + len(seen))
+            keep = (cols[0] >= 0) & ~np.isin(cols[0], seen)
+            top, top_scores = cols[0][keep][:num_recommendations], col_scores[0][keep][:num_recommendations]
+        else:
+            scores = self.item_factors @ self.user_factors[row]
+            scores[seen] = -np.inf
+            k = min(num_recommendations, int(np.isfinite(scores).sum()))
+            if k <= 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind='stable')]
+            top_scores = scores[top]
+
+        return [
+            {
+                'product_id': int(self.product_ids[col]),
+                'score': float(np.clip(score, 0.0, 1.0)),
+                'algorithm': 'mf',
+                'explanation': "Recommended from patterns in your views, purchases and ratings and those of similar shoppers"
+            }
+            for col, score in zip(top, top_scores)
+        ]
+
+    def save(self, directory, keep=None):
+        """Write a new version to an artifact store and make it the latest; optionally prune to the newest keep"""
+        arrays = {
+            'user_ids': self.user_ids,
+            'product_ids': self.product_ids,
+            'user_factors': self.user_factors,
+            'item_factors': self.item_factors,
+            'seen_data': self.seen.data,
+            'seen_indices': self.seen.indices,
+            'seen_indptr': self.seen.indptr
+        }
+        if self.ann is not None:
+            arrays.update({f'ann_{name}': array for name, array in self.ann.to_arrays().items()})
+        self.version = ArtifactStore(directory, 'mf').save(arrays, {
+            'params': self.params(),
+            'ann': self.ann.params() if self.ann is not None else None,
+            'trained_at': self.trained_at,
+            'training_seconds': self.training_seconds
+        }, keep=keep)
+        return self.version
+
+    @classmethod
+    def load(cls, directory, version=None, mmap=True):
+        """Load a saved version (default: the latest), memory-mapped unless mmap is False; None if there is none"""
+        loaded = ArtifactStore(directory, 'mf').load(version, mmap=mmap)
+        if loaded is None:
+            return None
+        arrays, metadata, version = loaded
+        model = cls(**metadata['params'])
+        model.user_ids = arrays['user_ids']
+        model.product_ids = arrays['product_ids']
+        model.user_factors = arrays['user_factors']
+        model.item_factors = arrays['item_factors']
+        model.seen = sparse.csr_matrix(
+            (arrays['seen_data'], arrays['seen_indices'], arrays['seen_indptr']),
+            shape=(len(model.user_ids), len(model.product_ids)),
+            copy=False
+        )
+        if metadata['ann']:
+            model.ann = IVFIndex.from_arrays(
+                {name[len('ann_'):]: array for name, array in arrays.items() if name.startswith('ann_')},
+                model.item_factors,
+                metadata['ann']
+            )
+        model.version = version
+        model.trained_at = metadata['trained_at']
+        model.training_seconds = metadata['training_seconds']
+        return model
+
+# Shared serving model, reloaded when LATEST points at a new version
+_mf_model = None
+_mf_lock = threading.Lock()
+
+def get_mf_model():
+    """Return the latest saved model, or None if none has been trained"""
+    global _mf_model
+    latest = ArtifactStore(Config.MF_MODEL_DIR, 'mf').latest()
+    if latest is None:
+        return None
+    if _mf_model is None or _mf_model.version != latest:
+        with _mf_lock:
+            if _mf_model is None or _mf_model.version != latest:
+                model = ImplicitMatrixFactorization.load(Config.MF_MODEL_DIR, latest, mmap=Config.ARTIFACT_MMAP)
+                if model.ann is None and len(model.product_ids) >= Config.ANN_MIN_PRODUCTS:
+                    model.build_ann_index(nlist=Config.ANN_NLIST or None, nprobe=Config.ANN_NPROBE)
+                _mf_model = model
+                logger.info(f"Loaded matrix factorization model {latest}")
+    return _mf_model
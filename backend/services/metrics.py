@@ -0,0 +1,190 @@
+import bisect
+import threading
+import time
+import logging
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic counter per label set"""
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}")
+        return lines
+
+class Histogram:
+    """Cumulative bucket histogram per label set, rendered in Prometheus text format"""
+
+    def __init__(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [per-bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, labels=()):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ('+Inf',), series[:-1]):
+                    cumulative += count
+                    le = ('le', bound if bound == '+Inf' else _format_value(bound))
+                    lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}")
+                label_text = _format_labels(self.label_names, labels)
+                lines.append(f"{self.name}_sum{label_text} {_format_value(series[-1])}")
+                lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+class RequestMetrics:
+    """Per-endpoint request instrumentation exported as Prometheus text.
+
+    Latency, status codes, response sizes and the number and total time of
+    SQL statements are recorded for every request. SQL statements are
+    attributed to the request whose thread executed them; statements from
+    background threads are not counted. Requests slower than
+    slow_request_threshold (seconds) are logged with their slowest
+    statements. Metrics are per process, and work done while a streamed
+    response body is being sent is not included.
+    """
+
+    def __init__(self, slow_request_threshold=None, top_statements=5):
+        self.slow_request_threshold = slow_request_threshold
+        self.top_statements = top_statements
+        self._collectors = []
+
+        labels = ('method', 'endpoint')
+        self.requests = Counter('http_requests_total', 'Requests by endpoint and status code', labels + ('status',))
+        self.latency = Histogram('http_request_duration_seconds', 'Request latency', labels)
+        self.sql_statements = Histogram('http_request_sql_statements', 'SQL statements per request', labels, STATEMENT_BUCKETS)
+        self.sql_duration = Histogram('http_request_sql_duration_seconds', 'Total SQL time per request', labels)
+        self.response_size = Histogram('http_response_size_bytes', 'Response body size', labels, SIZE_BUCKETS)
+        self.slow_requests = Counter('http_slow_requests_total', 'Requests over the slow-request threshold', labels)
+
+    def register_collector(self, collector):
+        """Add a callable returning extra Prometheus text lines to the metrics output"""
+        self._collectors.append(collector)
+
+    def _before_request(self):
+        g.metrics_started = time.perf_counter()
+        g.sql_count = 0
+        g.sql_seconds = 0.0
+        g.sql_statements = [] if self.slow_request_threshold else None
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # Kept on the execution context, which is discarded with a statement that raises
+        if has_request_context() and 'sql_count' in g:
+            context._metrics_start = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, '_metrics_start', None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        if not has_request_context() or 'sql_count' not in g:
+            return
+        g.sql_count += 1
+        g.sql_seconds += elapsed
+        if g.sql_statements is not None:
+            g.sql_statements.append((elapsed, statement))
+
+    def _after_request(self, response):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        sql_count, sql_seconds, statements = g.pop('sql_count'), g.pop('sql_seconds'), g.pop('sql_statements')
+        labels = (request.method, request.url_rule.rule if request.url_rule else 'unmatched')
+
+        self.requests.inc(labels + (str(response.status_code),))
+        self.latency.observe(elapsed, labels)
+        self.sql_statements.observe(sql_count, labels)
+        self.sql_duration.observe(sql_seconds, labels)
+        if response.content_length is not None:  # unknown for streamed responses
+            self.response_size.observe(response.content_length, labels)
+
+        if self.slow_request_threshold and elapsed >= self.slow_request_threshold:
+            self.slow_requests.inc(labels)
+            slowest = sorted(statements, key=lambda item: item[0], reverse=True)[:self.top_statements]
+            logger.warning(
+                f"Slow request {request.method} {request.full_path} {response.status_code}: "
+                f"{elapsed * 1000:.1f}ms, {sql_count} SQL statements in {sql_seconds * 1000:.1f}ms"
+                + ''.join(f"\n  {seconds * 1000:8.1f}ms  {' '.join(statement.split())[:200]}" for seconds, statement in slowest)
+            )
+        return response
+
+    def render(self):
+        """All metrics in Prometheus text exposition format"""
+        lines = []
+        for metric in (self.requests, self.latency, self.sql_statements, self.sql_duration,
+                       self.response_size, self.slow_requests):
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                lines.extend(collector())
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {e}")
+        return '\n'.join(lines) + '\n'
+
+_metrics = None
+
+def get_metrics():
+    """Return the shared request metrics, or None when metrics are disabled"""
+    return _metrics
+
+def init_metrics(app):
+    """Instrument the app's requests and SQL statements if enabled in the config"""
+    global _metrics
+    if not app.config['METRICS_ENABLED']:
+        return None
+    if _metrics is None:
+        threshold_ms = app.config['SLOW_REQUEST_THRESHOLD_MS']
+        _metrics = RequestMetrics(
+            slow_request_threshold=threshold_ms / 1000 if threshold_ms else None,
+            top_statements=app.config['SLOW_REQUEST_TOP_STATEMENTS']
+        )
+        event.listen(Engine, 'before_cursor_execute', _metrics._before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _metrics._after_cursor_execute)
+    app.before_request(_metrics._before_request)
+    app.after_request(_metrics._after_request)
+    return _metrics
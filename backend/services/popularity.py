@@ -0,0 +1,99 @@
+import bisect
+import threading
+import time
+import logging
+from config import Config
+from models import db, Product, ProductStats, on_interaction_created
+
+logger = logging.getLogger(__name__)
+
+class PopularityService:
+    """Process-wide ranked list of products by interaction count, cached with a TTL.
+
+    The ranking is loaded from the maintained product aggregates and kept
+    sorted as interactions are recorded: a count only rises by one, so the
+    product is moved up with two bisects instead of re-sorting the catalog.
+    It is reloaded once the TTL expires so writes from other processes are
+    picked up.
+    """
+
+    def __init__(self, ttl=60.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._counts = {}
+        self._ranking = []  # [(-interaction_count, product_id)] in ascending order, most interactions first
+        self._loaded_at = None
+
+        self.hits = 0
+        self.misses = 0
+        self.incremental_updates = 0
+
+    def _load(self):
+        rows = db.session.query(
+            Product.id,
+            db.func.coalesce(ProductStats.total_interactions, 0)
+        ).outerjoin(ProductStats, ProductStats.product_id == Product.id).all()
+        self._counts = {product_id: count for product_id, count in rows}
+        self._ranking = sorted((-count, product_id) for product_id, count in rows)
+        self._loaded_at = time.monotonic()
+
+    def _current_ranking(self):
+        expired = self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl
+        if expired:
+            self.misses += 1
+            self._load()
+        else:
+            self.hits += 1
+        return self._ranking
+
+    def top(self, limit, exclude_product_ids=()):
+        """Return up to limit (product_id, interaction_count) pairs, skipping excluded products"""
+        exclude_product_ids = set(exclude_product_ids)
+        results = []
+        # Read under the lock: record_interaction reorders the ranking in place
+        with self._lock:
+            for negative_count, product_id in self._current_ranking():
+                if len(results) >= limit:
+                    break
+                if product_id not in exclude_product_ids:
+                    results.append((product_id, -negative_count))
+        return results
+
+    def record_interaction(self, interaction):
+        """Bump a product's count and move it up the ranking instead of invalidating it"""
+        product_id = interaction.product_id
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            count = self._counts.get(product_id)
+            if count is not None:
+                del self._ranking[bisect.bisect_left(self._ranking, (-count, product_id))]
+            count = (count or 0) + 1
+            self._counts[product_id] = count
+            bisect.insort(self._ranking, (-count, product_id))
+            self.incremental_updates += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def stats(self):
+        """Cache hit/miss counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'incremental_updates': self.incremental_updates,
+                'products': len(self._counts),
+                'age_seconds': round(time.monotonic() - self._loaded_at, 3) if self._loaded_at else None
+            }
+
+# Shared process-wide cache, kept current by Interaction.create_interaction
+_popularity_service = PopularityService(ttl=Config.POPULARITY_CACHE_TTL)
+on_interaction_created(_popularity_service.record_interaction)
+
+def get_popularity_service():
+    return _popularity_service
@@ -0,0 +1,130 @@
+import json
+import multiprocessing
+import os
+import time
+import logging
+from datetime import datetime
+from models import db, User, Recommendation
+from .content_index import get_content_index
+from .user_item_model import get_user_item_model
+from .recommendation_engine import RecommendationEngine
+
+logger = logging.getLogger(__name__)
+
+# Set in the parent before the pool forks so workers share the matrices copy-on-write
+_worker_app = None
+_worker_engine = None
+
+def _init_worker():
+    # Connections inherited through fork must not be reused by the child
+    with _worker_app.app_context():
+        db.engine.dispose(close=False)
+
+def _generate_chunk(user_ids):
+    with _worker_app.app_context():
+        try:
+            return [
+                (user_id, _worker_engine.generate_recommendations(user_id, _worker_engine.default_recommendations))
+                for user_id in user_ids
+            ]
+        finally:
+            db.session.remove()
+
+def write_chunk(results):
+    """Replace the active recommendations of a chunk of users in one transaction"""
+    return Recommendation.replace_active({
+        user_id: [
+            {
+                'product_id': rec['product_id'],
+                'score': rec['score'],
+                'explanation': rec['explanation'],
+                'algorithm_used': rec['algorithm']
+            }
+            for rec in recommendations
+        ]
+        for user_id, recommendations in results
+    }, return_rows=False)
+
+def load_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def save_checkpoint(path, state):
+    """Write the checkpoint atomically so a crash never leaves it half-written"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+def precompute_recommendations(app, user_ids=None, processes=None, chunk_size=500,
+                               num_recommendations=5, checkpoint_path=None, resume=False, echo=print):
+    """Generate and save recommendations for all users (or a subset) across a process pool.
+
+    Users are processed in ascending ID order and written one chunk per
+    transaction; the checkpoint records the last user ID whose chunk was
+    committed, so a resumed run skips everything up to it.
+    """
+    global _worker_app, _worker_engine
+
+    with app.app_context():
+        query = db.session.query(User.id).order_by(User.id)
+        if user_ids:
+            query = query.filter(User.id.in_(user_ids))
+
+        checkpoint = load_checkpoint(checkpoint_path) if resume else None
+        if checkpoint:
+            query = query.filter(User.id > checkpoint['last_user_id'])
+            echo(f"Resuming after user {checkpoint['last_user_id']} "
+                 f"({checkpoint['processed']} users already done)")
+        pending = [user_id for (user_id,) in query.all()]
+
+        # Build the shared state once in the parent
+        model = get_user_item_model().sync()
+        model.collaborative_filter()
+        content_index = get_content_index()
+        engine = RecommendationEngine(model=model, content_index=content_index)
+        engine.default_recommendations = num_recommendations
+
+    processed = checkpoint['processed'] if checkpoint else 0
+    total = processed + len(pending)
+    if not pending:
+        echo("Nothing to precompute")
+        return {'processed': processed, 'saved': 0, 'seconds': 0.0}
+
+    chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+    processes = min(processes or os.cpu_count() or 1, len(chunks))
+    echo(f"Precomputing recommendations for {len(pending)} users in {len(chunks)} chunks on {processes} processes")
+
+    _worker_app, _worker_engine = app, engine
+    started = time.monotonic()
+    saved = 0
+    try:
+        context = multiprocessing.get_context('fork')
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        with context.Pool(processes, initializer=_init_worker) as pool, app.app_context():
+            # imap keeps chunk order, so the checkpoint only ever moves forward
+            for results in pool.imap(_generate_chunk, chunks):
+                saved += write_chunk(results)
+                processed += len(results)
+
+                if checkpoint_path:
+                    save_checkpoint(checkpoint_path, {
+                        'last_user_id': results[-1][0],
+                        'processed': processed,
+                        'updated_at': datetime.utcnow().isoformat()
+                    })
+
+                elapsed = time.monotonic() - started
+                rate = (processed - (total - len(pending))) / elapsed if elapsed else 0.0
+                eta = (total - processed) / rate if rate else 0.0
+                echo(f"{processed}/{total} users, {saved} recommendations saved, "
+                     f"{rate:.1f} users/s, ETA {eta:.0f}s")
+    finally:
+        _worker_app = _worker_engine = None
+
+    elapsed = time.monotonic() - started
+    return {'processed': processed, 'saved': saved, 'seconds': round(elapsed, 3)}
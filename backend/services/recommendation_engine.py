@@ -1,80 +1,133 @@
-import numpy as np
-import pandas as pd
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.feature_extraction.text import TfidfVectorizer
-from models import db, Product, User, Interaction, Recommendation
-from sqlalchemy import func, select
+from models import db, User, Interaction, Recommendation
+from .content_index import get_content_index
+from .user_item_model import get_user_item_model
+from .popularity import get_popularity_service
+from .trending import get_trending_service
+from .matrix_factorization import get_mf_model
+from .tracing import Trace, NULL_TRACE, current_span
+from config import Config
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class RecommendationEngine:
-    def __init__(self):
+    def __init__(self, model=None, content_index=None, algorithm=None):
         self.min_interactions = 3
         self.default_recommendations = 5
+        self.algorithm = algorithm or Config.RECOMMENDATION_ALGORITHM
+        self.popular_ranking = Config.POPULAR_RANKING
 
-    def generate_recommendations(self, user_id, num_recommendations=5):
-        """Generate recommendations for a user using hybrid approach"""
+        # Batch jobs pin a prebuilt model and content index to skip per-call freshness checks
+        self.model = model
+        self.content_index = content_index
+
+        # Per-stage spans feed the /api/metrics stage histograms; a no-op when disabled
+        self.tracing = Config.ENGINE_TRACING_ENABLED
+
+    def new_trace(self):
+        """A fresh trace when tracing is enabled, otherwise the shared no-op trace"""
+        return Trace() if self.tracing else NULL_TRACE
+
+    def generate_recommendations(self, user_id, num_recommendations=5, trace=None, algorithm=None):
+        """Generate recommendations for a user using hybrid approach, or the trained MF model with algorithm='mf'"""
+        trace = trace or self.new_trace()
+        algorithm = algorithm or self.algorithm
         try:
-            user = User.query.get(user_id)
+            with trace.span('load_user') as span:
+                user = User.query.get(user_id)
+                span.set(found=user is not None)
             if not user:
                 logger.error(f"User {user_id} not found")
                 return []
 
-            # Get user interaction history
-            user_interactions = Interaction.query.filter_by(user_id=user_id).all()
+            # Bring the in-memory user-item model up to date with the interactions table
+            with trace.span('sync_model') as span:
+                model = self.model or get_user_item_model().sync()
+                user_interactions = model.interaction_count_for(user_id)
+                span.set(interactions=model.interaction_count, user_interactions=user_interactions)
 
-            if len(user_interactions) < self.min_interactions:
+            if user_interactions < self.min_interactions:
                 # For new users, recommend popular products
-                return self._get_popular_recommendations(user_id, num_recommendations)
+                trace.fallback('popular:cold_start')
+                with trace.span('popular') as span:
+                    recommendations = self._get_popular_recommendations(user_id, num_recommendations)
+                    span.set(candidates=len(recommendations))
+                return recommendations
+
+            if algorithm == 'mf':
+                with trace.span('mf') as span:
+                    mf_recs = self._matrix_factorization(user_id, num_recommendations)
+                    span.set(candidates=len(mf_recs))
+                if mf_recs:
+                    return mf_recs
+                # No trained model yet, or the user joined after the last training run
+                trace.fallback('mf:hybrid')
 
             # Try collaborative filtering first
-            collaborative_recs = self._collaborative_filtering(user_id, num_recommendations)
+            with trace.span('collaborative') as span:
+                collaborative_recs = self._collaborative_filtering(user_id, num_recommendations)
+                span.set(candidates=len(collaborative_recs))
 
             # Try content-based filtering
-            content_based_recs = self._content_based_filtering(user_id, num_recommendations)
+            with trace.span('content_based') as span:
+                content_based_recs = self._content_based_filtering(user_id, num_recommendations)
+                span.set(candidates=len(content_based_recs))
+
+            if not collaborative_recs:
+                trace.fallback('hybrid:content_only')
+            elif not content_based_recs:
+                trace.fallback('hybrid:collaborative_only')
 
             # Combine recommendations using hybrid approach
-            hybrid_recs = self._combine_recommendations(
-                collaborative_recs, 
-                content_based_recs, 
-                num_recommendations
-            )
+            with trace.span('combine', candidates=len(collaborative_recs) + len(content_based_recs)) as span:
+                hybrid_recs = self._combine_recommendations(
+                    collaborative_recs, 
+                    content_based_recs, 
+                    num_recommendations
+                )
+                span.set(results=len(hybrid_recs))
 
             return hybrid_recs
 
         except Exception as e:
             logger.error(f"Error generating recommendations for user {user_id}: {e}")
-            return self._get_popular_recommendations(user_id, num_recommendations)
-
-    from sqlalchemy import func, select
+            trace.fallback('popular:error')
+            with trace.span('popular') as span:
+                recommendations = self._get_popular_recommendations(user_id, num_recommendations)
+                span.set(candidates=len(recommendations))
+            return recommendations
 
     def _get_popular_recommendations(self, user_id, num_recommendations):
         """Get popular products as fallback recommendations"""
         try:
-            # Subquery of product IDs the user has interacted with
-            user_product_ids = (
-                db.session.query(Interaction.product_id)
-                .filter_by(user_id=user_id)
-                .subquery()
-            )
-
-            # FIX: wrap subquery in select() for IN clause
-            popular_products = (
-                db.session.query(
-                    Product.id,
-                    func.count(Interaction.id).label("interaction_count"),
-                )
-                .outerjoin(Interaction)
-                .filter(~Product.id.in_(select(user_product_ids.c.product_id)))
-                .group_by(Product.id)
-                .order_by(func.count(Interaction.id).desc())
-                .limit(num_recommendations)
-                .all()
-            )
-
-            recommendations = [
+            # Products the user has already interacted with
+            seen_product_ids = [
+                product_id for (product_id,) in
+                db.session.query(Interaction.product_id).filter_by(user_id=user_id).distinct()
+            ]
+
+            current_span().set(excluded_products=len(seen_product_ids), ranking=self.popular_ranking)
+            recommendations = []
+            if self.popular_ranking == 'trending':
+                trending_products = get_trending_service().top(num_recommendations, exclude_product_ids=seen_product_ids)
+                recommendations = [
+                    {
+                        "product_id": product_id,
+                        "score": min(0.8, score / 10.0),
+                        "algorithm": "popularity",
+                        "explanation": f"This product is trending, with {score:.1f} weighted interactions recently. Perfect for discovering what's hot right now!",
+                    }
+                    for product_id, score in trending_products
+                ]
+                current_span().set(trending=len(recommendations))
+                # In a quiet window the rest is filled from the all-time ranking
+                seen_product_ids += [rec["product_id"] for rec in recommendations]
+
+            # Ranked list comes from the shared popularity cache
+            remaining = num_recommendations - len(recommendations)
+            popular_products = get_popularity_service().top(remaining, seen_product_ids) if remaining > 0 else []
+            recommendations += [
                 {
                     "product_id": product_id,
                     "score": min(0.8, count / 10.0),
@@ -88,150 +141,67 @@ class RecommendationEngine:
 
         except Exception as e:
             logger.error(f"Error getting popular recommendations: {e}")
+            current_span().set(error=str(e))
             import traceback; traceback.print_exc()
             return []
 
 
     def _collaborative_filtering(self, user_id, num_recommendations):
-        """User-based collaborative filtering"""
+        """User-based collaborative filtering over a sparse user-item matrix"""
         try:
-            # Create user-item matrix
-            interactions = db.session.query(
-                Interaction.user_id,
-                Interaction.product_id,
-                func.avg(Interaction.rating).label('avg_rating')
-            ).filter(Interaction.rating.isnot(None)).group_by(
-                Interaction.user_id, Interaction.product_id
-            ).all()
-
-            if len(interactions) < 10:  # Not enough data for collaborative filtering
-                return []
-
-            # Convert to pandas DataFrame
-            df = pd.DataFrame(interactions, columns=['user_id', 'product_id', 'rating'])
-
-            # Create user-item matrix
-            user_item_matrix = df.pivot_table(
-                index='user_id', 
-                columns='product_id', 
-                values='rating', 
-                fill_value=0
-            )
-
-            if user_id not in user_item_matrix.index:
-                return []
-
-            # Calculate user similarities
-            user_similarities = cosine_similarity(user_item_matrix)
-            user_sim_df = pd.DataFrame(
-                user_similarities, 
-                index=user_item_matrix.index, 
-                columns=user_item_matrix.index
-            )
-
-            # Find similar users
-            similar_users = user_sim_df[user_id].sort_values(ascending=False)[1:6]  # Top 5 similar users
-
-            # Get products liked by similar users that current user hasn't interacted with
-            user_products = set(df[df['user_id'] == user_id]['product_id'].tolist())
-            recommendations = []
-
-            for similar_user_id, similarity in similar_users.items():
-                if similarity < 0.1:  # Skip users with very low similarity
-                    continue
-
-                similar_user_products = df[
-                    (df['user_id'] == similar_user_id) & 
-                    (df['rating'] >= 4)  # Only highly rated products
-                ]['product_id'].tolist()
-
-                for product_id in similar_user_products:
-                    if product_id not in user_products:
-                        recommendations.append({
-                            'product_id': product_id,
-                            'score': similarity * 0.8,  # Weight by similarity
-                            'algorithm': 'collaborative',
-                            'explanation': f"Users with similar preferences have highly rated this product (similarity: {similarity:.0%})"
-                        })
-
-            # Remove duplicates and sort by score
-            unique_recs = {}
-            for rec in recommendations:
-                product_id = rec['product_id']
-                if product_id not in unique_recs or rec['score'] > unique_recs[product_id]['score']:
-                    unique_recs[product_id] = rec
-
-            sorted_recs = sorted(unique_recs.values(), key=lambda x: x['score'], reverse=True)
-            return sorted_recs[:num_recommendations]
+            collaborative = (self.model or get_user_item_model()).collaborative_filter()
+            current_span().set(users=collaborative.matrix.shape[0], products=collaborative.matrix.shape[1])
+            return collaborative.recommend(user_id, num_recommendations)
 
         except Exception as e:
             logger.error(f"Error in collaborative filtering: {e}")
+            current_span().set(error=str(e))
             return []
 
-    def _content_based_filtering(self, user_id, num_recommendations):
-        """Content-based filtering using product features"""
+    def _matrix_factorization(self, user_id, num_recommendations):
+        """Score products with the latest trained implicit MF model (through its ANN index on large catalogs)"""
         try:
-            # Get user's interaction history
-            user_interactions = db.session.query(
-                Interaction, Product
-            ).join(Product).filter(
-                Interaction.user_id == user_id,
-                Interaction.rating.isnot(None),
-                Interaction.rating >= 4  # Only products user liked
-            ).all()
-
-            if not user_interactions:
+            mf_model = get_mf_model()
+            if mf_model is None:
+                current_span().set(model=None)
                 return []
+            current_span().set(model=mf_model.version, users=len(mf_model.user_ids), products=len(mf_model.product_ids),
+                               ann=mf_model.ann is not None)
+            return mf_model.recommend(user_id, num_recommendations)
 
-            # Get all products
-            all_products = Product.query.all()
-
-            # Create feature vectors for products (category + description)
-            product_features = []
-            product_ids = []
+        except Exception as e:
+            logger.error(f"Error in matrix factorization: {e}")
+            current_span().set(error=str(e))
+            return []
 
-            for product in all_products:
-                feature_text = f"{product.category} {product.description or ''}"
-                product_features.append(feature_text)
-                product_ids.append(product.id)
+    def _content_based_filtering(self, user_id, num_recommendations):
+        """Content-based filtering using the precomputed item-item similarity index"""
+        try:
+            # Get products the user liked
+            liked_product_ids = (self.model or get_user_item_model()).liked_products(user_id)
+            current_span().set(liked_products=len(liked_product_ids))
 
-            # Create TF-IDF vectors
-            vectorizer = TfidfVectorizer(max_features=100, stop_words='english')
-            tfidf_matrix = vectorizer.fit_transform(product_features)
+            if not liked_product_ids:
+                return []
 
-            # Get user's liked products
-            liked_product_ids = [interaction.Interaction.product_id for interaction in user_interactions]
+            # Merge the neighbour lists of liked products instead of refitting TF-IDF
+            content_index = self.content_index or get_content_index()
+            current_span().set(products=len(content_index.product_ids))
+            candidates = content_index.top_candidates(liked_product_ids, num_recommendations)
 
-            # Calculate similarities
-            recommendations = []
-            for i, product_id in enumerate(product_ids):
-                if product_id in liked_product_ids:
-                    continue
-
-                max_similarity = 0
-                for liked_product_id in liked_product_ids:
-                    liked_idx = product_ids.index(liked_product_id)
-                    similarity = cosine_similarity(
-                        tfidf_matrix[i:i+1], 
-                        tfidf_matrix[liked_idx:liked_idx+1]
-                    )[0][0]
-                    max_similarity = max(max_similarity, similarity)
-
-                if max_similarity > 0.1:  # Only recommend if similarity is above threshold
-                    product = next(p for p in all_products if p.id == product_id)
-                    recommendations.append({
-                        'product_id': product_id,
-                        'score': max_similarity * 0.7,  # Weight content-based lower than collaborative
-                        'algorithm': 'content-based',
-                        'explanation': f"This {product.category.lower()} product is similar to items you've previously rated highly"
-                    })
-
-            # Sort by score and return top recommendations
-            sorted_recs = sorted(recommendations, key=lambda x: x['score'], reverse=True)
-            return sorted_recs[:num_recommendations]
+            return [
+                {
+                    'product_id': product_id,
+                    'score': similarity * 0.7,  # Weight content-based lower than collaborative
+                    'algorithm': 'content-based',
+                    'explanation': f"This {category.lower()} product is similar to items you've previously rated highly"
+                }
+                for product_id, similarity, category in candidates
+            ]
 
         except Exception as e:
             logger.error(f"Error in content-based filtering: {e}")
+            current_span().set(error=str(e))
             return []
 
     def _combine_recommendations(self, collaborative_recs, content_based_recs, num_recommendations):
@@ -268,30 +238,27 @@ class RecommendationEngine:
 
         except Exception as e:
             logger.error(f"Error combining recommendations: {e}")
+            current_span().set(error=str(e))
             return collaborative_recs + content_based_recs
 
-    def save_recommendations(self, user_id, recommendations):
-        """Save recommendations to database"""
-        try:
-            # Deactivate old recommendations
-            old_recs = Recommendation.query.filter_by(user_id=user_id, is_active=True).all()
-            for rec in old_recs:
-                rec.is_active = False
-
-            # Save new recommendations
-            saved_recommendations = []
-            for rec in recommendations:
-                saved_rec = Recommendation.create_recommendation(
-                    user_id=user_id,
-                    product_id=rec['product_id'],
-                    score=rec['score'],
-                    explanation=rec['explanation'],
-                    algorithm_used=rec['algorithm']
-                )
-                saved_recommendations.append(saved_rec)
-
-            return saved_recommendations
-
-        except Exception as e:
-            logger.error(f"Error saving recommendations: {e}")
-            return []
+    def save_recommendations(self, user_id, recommendations, trace=None):
+        """Save recommendations to database in a single transaction"""
+        trace = trace or self.new_trace()
+        with trace.span('save', rows=len(recommendations)) as span:
+            try:
+                return Recommendation.replace_active({
+                    user_id: [
+                        {
+                            'product_id': rec['product_id'],
+                            'score': rec['score'],
+                            'explanation': rec['explanation'],
+                            'algorithm_used': rec['algorithm']
+                        }
+                        for rec in recommendations
+                    ]
+                })
+
+            except Exception as e:
+                logger.error(f"Error saving recommendations: {e}")
+                span.set(error=str(e))
+                return []
@@ -0,0 +1,155 @@
+import atexit
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from models import db
+
+logger = logging.getLogger(__name__)
+
+class RecommendationRefreshQueue:
+    """Background worker that regenerates recommendations off the request path.
+
+    Repeated requests for the same user inside the coalescing window collapse
+    into a single refresh, and a user is never refreshed by two workers at once.
+    """
+
+    def __init__(self, app=None, workers=2, coalesce_window=2.0):
+        self.app = app
+        self.workers = workers
+        self.coalesce_window = coalesce_window
+
+        self._pending = {}  # user_id -> (first requested at, due at, count)
+        self._in_flight = set()
+        self._condition = threading.Condition()
+        self._executor = None
+        self._scheduler = None
+        self._running = False
+
+        self.enqueued = 0
+        self.coalesced = 0
+        self.completed = 0
+        self.failed = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+
+    def start(self):
+        with self._condition:
+            if self._running:
+                return self
+            self._running = True
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='rec-refresh')
+            self._scheduler = threading.Thread(target=self._run, name='rec-refresh-scheduler', daemon=True)
+            self._scheduler.start()
+        logger.info(f"Recommendation refresh queue started with {self.workers} workers")
+        return self
+
+    def stop(self, wait=True):
+        with self._condition:
+            if not self._running:
+                return
+            self._running = False
+            self._condition.notify_all()
+        self._scheduler.join()
+        self._executor.shutdown(wait=wait)
+
+    def enqueue(self, user_id):
+        """Request a refresh for a user; returns False if it was merged into a pending one"""
+        now = time.monotonic()
+        with self._condition:
+            self.enqueued += 1
+            if user_id in self._pending:
+                first, due, count = self._pending[user_id]
+                self._pending[user_id] = (first, due, count + 1)
+                self.coalesced += 1
+                return False
+            self._pending[user_id] = (now, now + self.coalesce_window, 1)
+            self._condition.notify()
+            return True
+
+    def _run(self):
+        with self._condition:
+            while self._running:
+                now = time.monotonic()
+                ready = [
+                    user_id for user_id, (_, due, _) in self._pending.items()
+                    if due <= now and user_id not in self._in_flight
+                ]
+                for user_id in ready:
+                    first, _, _ = self._pending.pop(user_id)
+                    self._in_flight.add(user_id)
+                    self._executor.submit(self._refresh, user_id, first)
+
+                waiting = [due for user_id, (_, due, _) in self._pending.items() if user_id not in self._in_flight]
+                timeout = max(0.0, min(waiting) - now) if waiting else None
+                self._condition.wait(timeout)
+
+    def _refresh(self, user_id, requested_at):
+        from .recommendation_engine import RecommendationEngine
+
+        try:
+            with self.app.app_context():
+                try:
+                    engine = RecommendationEngine()
+                    recommendations = engine.generate_recommendations(user_id)
+                    engine.save_recommendations(user_id, recommendations)
+                finally:
+                    db.session.remove()
+            succeeded = True
+        except Exception as e:
+            logger.error(f"Background refresh failed for user {user_id}: {e}")
+            succeeded = False
+
+        lag = time.monotonic() - requested_at
+        with self._condition:
+            self._in_flight.discard(user_id)
+            if succeeded:
+                self.completed += 1
+            else:
+                self.failed += 1
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self.total_lag += lag
+            # Wake the scheduler in case a request for this user arrived meanwhile
+            self._condition.notify()
+
+    def stats(self):
+        """Queue depth and lag metrics"""
+        with self._condition:
+            now = time.monotonic()
+            finished = self.completed + self.failed
+            return {
+                'running': self._running,
+                'workers': self.workers,
+                'coalesce_window_seconds': self.coalesce_window,
+                'queue_depth': len(self._pending),
+                'in_flight': len(self._in_flight),
+                'oldest_pending_seconds': round(
+                    max((now - first for first, _, _ in self._pending.values()), default=0.0), 3
+                ),
+                'enqueued': self.enqueued,
+                'coalesced': self.coalesced,
+                'completed': self.completed,
+                'failed': self.failed,
+                'last_lag_seconds': round(self.last_lag, 3),
+                'max_lag_seconds': round(self.max_lag, 3),
+                'average_lag_seconds': round(self.total_lag / finished, 3) if finished else 0.0
+            }
+
+_refresh_queue = None
+
+def get_refresh_queue():
+    return _refresh_queue
+
+def init_refresh_queue(app):
+    """Create and start the shared refresh queue for this process"""
+    global _refresh_queue
+    if _refresh_queue is None:
+        _refresh_queue = RecommendationRefreshQueue(
+            app,
+            workers=app.config['REFRESH_QUEUE_WORKERS'],
+            coalesce_window=app.config['REFRESH_COALESCE_WINDOW']
+        ).start()
+        atexit.register(_refresh_queue.stop)
+    return _refresh_queue
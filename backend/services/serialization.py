@@ -0,0 +1,50 @@
+import json
+from models import db, Product, User
+
+# Many-to-one lazy loads are served from the session identity map when the
+# target row is already loaded, so batch-loading referenced rows up front with
+# one IN query per table lets the models' own to_dict() run without extra SQL.
+
+def prefetch_products(product_ids):
+    """Load products (with their aggregates) for the given IDs in one query"""
+    product_ids = set(product_ids)
+    if not product_ids:
+        return {}
+    return {product.id: product for product in Product.query.filter(Product.id.in_(product_ids)).all()}
+
+def prefetch_users(user_ids):
+    """Load users for the given IDs in one query"""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return {}
+    return {user.id: user for user in User.query.filter(User.id.in_(user_ids)).all()}
+
+def serialize_products(products):
+    """Serialize products; aggregates come from the eagerly joined stats row"""
+    return [product.to_dict() for product in products]
+
+def serialize_interactions(interactions):
+    """Serialize interactions with a fixed number of queries for products and users"""
+    interactions = list(interactions)
+    with db.session.no_autoflush:
+        # Held as locals so the identity map keeps the rows while serializing
+        products = prefetch_products(i.product_id for i in interactions)
+        users = prefetch_users(i.user_id for i in interactions)
+        return [interaction.to_dict() for interaction in interactions]
+
+def serialize_recommendations(recommendations):
+    """Serialize recommendations with a fixed number of queries for their products"""
+    recommendations = list(recommendations)
+    with db.session.no_autoflush:
+        products = prefetch_products(r.product_id for r in recommendations)
+        return [recommendation.to_dict() for recommendation in recommendations]
+
+def stream_ndjson(statement, serialize, chunk_size=1000):
+    """Yield newline-delimited JSON, fetching and serializing chunk_size rows at a time.
+
+    Rows are read with yield_per, so only the current chunk is held in
+    memory; serialize receives each chunk as a list and may prefetch for it.
+    """
+    result = db.session.execute(statement.execution_options(yield_per=chunk_size))
+    for chunk in result.scalars().partitions():
+        yield ''.join(json.dumps(row) + '\n' for row in serialize(chunk))
@@ -0,0 +1,180 @@
+import time
+import logging
+from datetime import datetime
+import numpy as np
+from models import db, User, Product, Interaction, ProductStats, UserStats
+
+logger = logging.getLogger(__name__)
+
+CATEGORY_VOCABULARY = {
+    'Electronics': (['Wireless', 'Smart', 'Portable', 'Bluetooth', 'Noise-Cancelling', 'Compact'],
+                    ['Headphones', 'Speaker', 'Charger', 'Tracker', 'Camera', 'Keyboard', 'Monitor']),
+    'Clothing': (['Organic', 'Slim-Fit', 'Waterproof', 'Merino', 'Vintage', 'Lightweight'],
+                 ['T-Shirt', 'Jacket', 'Jeans', 'Sweater', 'Hoodie', 'Socks', 'Dress']),
+    'Home & Kitchen': (['Stainless', 'Ceramic', 'Non-Stick', 'Insulated', 'Bamboo', 'Cast-Iron'],
+                       ['Water Bottle', 'Knife Set', 'Pan', 'Kettle', 'Cutting Board', 'Mug', 'Blender']),
+    'Sports & Fitness': (['Adjustable', 'Foldable', 'Professional', 'Anti-Slip', 'Heavy-Duty', 'Ergonomic'],
+                         ['Yoga Mat', 'Dumbbells', 'Resistance Bands', 'Running Shoes', 'Jump Rope', 'Bike Helmet']),
+    'Books': (['Bestselling', 'Illustrated', 'Classic', 'Hardcover', 'Annotated', 'Pocket'],
+              ['Novel', 'Cookbook', 'Biography', 'Travel Guide', 'Poetry Collection', 'Workbook']),
+    'Beauty': (['Natural', 'Hydrating', 'Fragrance-Free', 'Vegan', 'Daily', 'Travel-Size'],
+               ['Moisturizer', 'Serum', 'Shampoo', 'Lip Balm', 'Sunscreen', 'Face Mask']),
+    'Toys & Games': (['Educational', 'Wooden', 'Interactive', 'Strategy', 'Classic', 'Outdoor'],
+                     ['Puzzle', 'Board Game', 'Building Set', 'Card Game', 'Plush Toy', 'Kite']),
+    'Garden': (['Solar', 'Self-Watering', 'Expandable', 'Weatherproof', 'Raised', 'Ergonomic'],
+               ['Planter', 'Hose', 'Pruning Shears', 'String Lights', 'Seed Kit', 'Bird Feeder'])
+}
+CATEGORY_PRICE_MEDIANS = {
+    'Electronics': 80.0, 'Clothing': 30.0, 'Home & Kitchen': 35.0, 'Sports & Fitness': 40.0,
+    'Books': 15.0, 'Beauty': 20.0, 'Toys & Games': 25.0, 'Garden': 30.0
+}
+
+# Share of each interaction type; rating rows are the only ones with a rating value
+INTERACTION_TYPE_WEIGHTS = {'view': 0.55, 'click': 0.20, 'rating': 0.12, 'favorite': 0.06, 'purchase': 0.07}
+
+def power_law_weights(n, exponent, rng):
+    """Zipf-like sampling weights over n items, assigned to items in random order"""
+    weights = 1.0 / np.arange(1, n + 1, dtype=np.float64) ** exponent
+    return rng.permutation(weights / weights.sum())
+
+def _insert(table, rows):
+    db.session.execute(table.insert(), rows)
+
+def generate_synthetic_data(num_users, num_products, num_interactions, seed=42, batch_size=50000,
+                            user_exponent=1.1, product_exponent=1.0, category_affinity=0.6,
+                            days=365, defer_indexes=True, echo=None):
+    """Append seeded synthetic users, products and interactions using bulk inserts.
+
+    User activity and product popularity both follow power laws; each user
+    has a favourite category that category_affinity of their interactions
+    are drawn from. The same arguments and seed always produce the same rows.
+    Interactions are written in batches of batch_size (one transaction each)
+    without going through the per-row listeners, so the product aggregates
+    are rebuilt once at the end and running processes must reload their
+    in-memory models. With defer_indexes the interaction indexes are dropped
+    for the load and rebuilt afterwards, which is much faster than
+    maintaining them row by row on large loads.
+    """
+    echo = echo or logger.info
+    rng = np.random.default_rng(seed)
+    started = time.perf_counter()
+    categories = list(CATEGORY_VOCABULARY)
+
+    # Products: names and descriptions from per-category vocabularies so the content index has signal
+    first_product_id = (db.session.query(db.func.max(Product.id)).scalar() or 0) + 1
+    product_categories = rng.integers(0, len(categories), num_products)
+    adjectives = rng.integers(0, 6, (num_products, 2))
+    nouns = rng.integers(0, 6, num_products)
+    prices = np.round(np.exp(rng.normal(0, 0.6, num_products)), 2)
+    quality = np.clip(rng.normal(3.8, 0.6, num_products), 1.5, 5.0)
+
+    product_rows = []
+    for i in range(num_products):
+        category = categories[product_categories[i]]
+        adjective_pool, noun_pool = CATEGORY_VOCABULARY[category]
+        first, second = adjective_pool[adjectives[i, 0]], adjective_pool[adjectives[i, 1]]
+        noun = noun_pool[nouns[i] % len(noun_pool)]
+        product_rows.append({
+            'id': first_product_id + i,
+            'name': f"{first} {noun} {first_product_id + i}",
+            'description': f"{first} and {second.lower()} {noun.lower()} for everyday {category.lower()} use",
+            'price': max(1.0, round(CATEGORY_PRICE_MEDIANS[category] * prices[i], 2)),
+            'category': category,
+            'image_url': None,
+            'created_at': datetime.utcnow()
+        })
+    for offset in range(0, num_products, batch_size):
+        _insert(Product.__table__, product_rows[offset:offset + batch_size])
+    db.session.commit()
+    del product_rows
+    echo(f"Inserted {num_products} products")
+
+    # Users, each with a favourite category
+    first_user_id = (db.session.query(db.func.max(User.id)).scalar() or 0) + 1
+    for offset in range(0, num_users, batch_size):
+        _insert(User.__table__, [
+            {
+                'id': user_id,
+                'name': f"Synthetic User {user_id}",
+                'email': f"user{user_id}@synthetic.example.com",
+                'created_at': datetime.utcnow()
+            }
+            for user_id in range(first_user_id + offset, first_user_id + min(offset + batch_size, num_users))
+        ])
+        db.session.commit()
+    favourite_categories = rng.integers(0, len(categories), num_users)
+    echo(f"Inserted {num_users} users")
+
+    # Sampling tables: global and per-category product popularity
+    user_weights = np.cumsum(power_law_weights(num_users, user_exponent, rng))
+    product_weights = power_law_weights(num_products, product_exponent, rng)
+    global_cdf = np.cumsum(product_weights)
+    category_products, category_cdfs = [], []
+    for index in range(len(categories)):
+        members = np.flatnonzero(product_categories == index)
+        category_products.append(members)
+        category_cdfs.append(np.cumsum(product_weights[members]) / product_weights[members].sum() if len(members) else None)
+
+    type_names = list(INTERACTION_TYPE_WEIGHTS)
+    type_cdf = np.cumsum(list(INTERACTION_TYPE_WEIGHTS.values()))
+    rating_type = type_names.index('rating')
+    now = np.datetime64(datetime.utcnow(), 'us')
+
+    def draw(cdf, size):
+        return np.minimum(np.searchsorted(cdf, rng.random(size) * cdf[-1]), len(cdf) - 1)
+
+    deferred = list(Interaction.__table__.indexes) if defer_indexes else []
+    for index in deferred:
+        index.drop(db.engine, checkfirst=True)
+
+    inserted = 0
+    while inserted < num_interactions:
+        size = min(batch_size, num_interactions - inserted)
+        users = draw(user_weights, size)
+        products = draw(global_cdf, size)
+
+        # Most interactions stay within the user's favourite category
+        preferred = favourite_categories[users]
+        use_favourite = rng.random(size) < category_affinity
+        for index, members in enumerate(category_products):
+            mask = use_favourite & (preferred == index)
+            if len(members) and mask.any():
+                products[mask] = members[draw(category_cdfs[index], int(mask.sum()))]
+
+        types = draw(type_cdf, size)
+        ratings = np.clip(np.rint(quality[products] + rng.normal(0, 0.9, size)), 1, 5).astype(np.int64)
+        seconds_ago = (rng.random(size) * days * 86400).astype('timedelta64[s]')
+
+        # Columns are converted to Python objects in bulk; building rows per element is the bottleneck
+        user_ids = (users + first_user_id).tolist()
+        product_ids = (products + first_product_id).tolist()
+        type_values = np.asarray(type_names, dtype=object)[types].tolist()
+        rating_values = np.where(types == rating_type, ratings.astype(object), None).tolist()
+        timestamps = (now - seconds_ago).astype('datetime64[us]').tolist()
+
+        _insert(Interaction.__table__, [
+            {'user_id': u, 'product_id': p, 'interaction_type': t, 'rating': r, 'timestamp': ts}
+            for u, p, t, r, ts in zip(user_ids, product_ids, type_values, rating_values, timestamps)
+        ])
+        db.session.commit()
+        inserted += size
+        echo(f"Inserted {inserted}/{num_interactions} interactions")
+
+    for index in deferred:
+        index.create(db.engine)
+    if deferred:
+        echo(f"Rebuilt {len(deferred)} interaction indexes")
+
+    ProductStats.rebuild()
+    UserStats.rebuild()
+    seconds = time.perf_counter() - started
+    echo(f"Rebuilt product and user aggregates; done in {seconds:.1f}s")
+    return {
+        'users': num_users,
+        'products': num_products,
+        'interactions': num_interactions,
+        'first_user_id': first_user_id,
+        'first_product_id': first_product_id,
+        'seed': seed,
+        'seconds': round(seconds, 2)
+    }
@@ -0,0 +1,125 @@
+import threading
+import time
+from .metrics import Counter, Histogram
+
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+_local = threading.local()
+
+class Span:
+    """One timed stage with free-form attributes (input sizes, candidates, errors)"""
+    __slots__ = ('name', 'attributes', 'started', 'duration')
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+        self.started = None
+        self.duration = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self):
+        return {'name': self.name, 'duration_ms': round(self.duration * 1000, 3), **self.attributes}
+
+class _SpanContext:
+    __slots__ = ('trace', 'span', 'previous')
+
+    def __init__(self, trace, span):
+        self.trace = trace
+        self.span = span
+
+    def __enter__(self):
+        self.previous = getattr(_local, 'span', None)
+        _local.span = self.span
+        self.span.started = time.perf_counter()
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        self.span.duration = time.perf_counter() - self.span.started
+        if exc is not None:
+            self.span.attributes['error'] = str(exc)
+        self.trace.spans.append(self.span)
+        stage_metrics.record_span(self.span)
+        _local.span = self.previous
+        return False
+
+class Trace:
+    """Spans and fallback paths recorded while generating one user's recommendations.
+
+    Finished spans and fallbacks are also aggregated into stage_metrics as
+    they happen, so traces need no explicit finish step.
+    """
+    enabled = True
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = []
+        self.fallbacks = []
+
+    def span(self, name, **attributes):
+        return _SpanContext(self, Span(name, attributes))
+
+    def fallback(self, path):
+        self.fallbacks.append(path)
+        stage_metrics.fallbacks.inc((path,))
+
+    def to_dict(self):
+        return {
+            'total_ms': round((time.perf_counter() - self.started) * 1000, 3),
+            'spans': [span.to_dict() for span in self.spans],
+            'fallbacks': self.fallbacks
+        }
+
+class _NullSpan:
+    """Stands in for both span and context manager when tracing is off"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+class _NullTrace:
+    enabled = False
+
+    def span(self, name, **attributes):
+        return NULL_SPAN
+
+    def fallback(self, path):
+        pass
+
+NULL_SPAN = _NullSpan()
+NULL_TRACE = _NullTrace()
+
+def current_span():
+    """The innermost span open on this thread, or a no-op span"""
+    return getattr(_local, 'span', None) or NULL_SPAN
+
+class StageMetrics:
+    """Stage latency histograms and fallback/error counters aggregated over all traces"""
+
+    def __init__(self):
+        self.duration = Histogram('recommendation_stage_duration_seconds', 'Recommendation engine stage latency',
+                                  ('stage',), STAGE_BUCKETS)
+        self.fallbacks = Counter('recommendation_fallbacks_total', 'Recommendation fallback paths taken', ('path',))
+        self.errors = Counter('recommendation_stage_errors_total', 'Recommendation engine stage errors', ('stage',))
+
+    def record_span(self, span):
+        self.duration.observe(span.duration, (span.name,))
+        if 'error' in span.attributes:
+            self.errors.inc((span.name,))
+
+    def render(self):
+        return self.duration.render() + self.fallbacks.render() + self.errors.render()
+
+stage_metrics = StageMetrics()
+
+def init_tracing(app, metrics):
+    """Export engine stage metrics through the request metrics endpoint"""
+    if metrics is not None:
+        metrics.register_collector(stage_metrics.render)
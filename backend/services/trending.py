@@ -0,0 +1,229 @@
+import heapq
+import math
+import threading
+import time
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import Integer, cast, func
+from config import Config
+from models import db, Product, Interaction, on_interaction_created
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+
+def _bucket_expression(bucket_seconds):
+    """SQL for the time bucket of Interaction.timestamp (naive UTC)"""
+    if db.engine.dialect.name == 'sqlite':
+        return cast(func.strftime('%s', Interaction.timestamp), Integer) // bucket_seconds
+    return func.floor(func.extract('epoch', Interaction.timestamp) / bucket_seconds)
+
+class TrendingService:
+    """Time-decayed, type-weighted product scores kept in a ring of time buckets.
+
+    Each interaction adds its type weight to its product in the bucket for
+    its hour, in O(1). The ring covers the last window_buckets buckets; when
+    the clock passes a bucket, its contributions are subtracted again, so a
+    score only reflects the window. Decay is applied forward from a fixed
+    landmark: a bucket's weight is scaled up by exp(rate * buckets since
+    the landmark) when added, so stored scores never need rewriting as time
+    passes, and they are scaled back to the present when reported.
+
+    Products whose score changed are pushed into max-heaps (overall and per
+    category) on the next query. Stale heap entries are dropped as they
+    surface, so a top-k query costs O((k + changed products) log n). Like
+    the popularity cache, the state is reloaded from the interactions table
+    every reload_interval seconds to pick up writes from other processes.
+    """
+
+    def __init__(self, weights=None, bucket_seconds=3600, window_buckets=168, half_life_hours=24.0,
+                 reload_interval=300.0):
+        self.weights = dict(weights or Config.TRENDING_WEIGHTS)
+        self.bucket_seconds = bucket_seconds
+        self.window_buckets = window_buckets
+        self.rate = math.log(2) * bucket_seconds / (half_life_hours * 3600)  # decay per bucket
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._loaded_at = None
+
+        self.updates = 0
+        self.reloads = 0
+        self._reset(self._bucket_at(time.time()))
+
+    def _reset(self, bucket):
+        self._buckets = [{} for _ in range(self.window_buckets)]  # slot -> {product_id: weight}
+        self._bucket_ids = [None] * self.window_buckets
+        self._current = bucket
+        self._landmark = bucket
+        self._scores = {}  # product_id -> score scaled to the landmark
+        self._live_buckets = {}  # product_id -> buckets holding it
+        self._categories = {}
+        self._dirty = set()
+        self._heaps = {None: []}  # category (None: overall) -> [(-score, product_id)]
+
+    def _bucket_at(self, seconds):
+        return int(seconds // self.bucket_seconds)
+
+    def _growth(self, bucket):
+        return math.exp(self.rate * (bucket - self._landmark))
+
+    def _add(self, product_id, weight, bucket):
+        """Add weight to a product in a bucket; buckets before the window are ignored"""
+        if weight <= 0 or bucket <= self._current - self.window_buckets:
+            return
+        if bucket > self._current:
+            self._advance(bucket)
+        slot = bucket % self.window_buckets
+        self._bucket_ids[slot] = bucket
+        weights = self._buckets[slot]
+        if product_id not in weights:
+            self._live_buckets[product_id] = self._live_buckets.get(product_id, 0) + 1
+        weights[product_id] = weights.get(product_id, 0.0) + weight
+        self._scores[product_id] = self._scores.get(product_id, 0.0) + weight * self._growth(bucket)
+        self._dirty.add(product_id)
+
+    def _advance(self, bucket):
+        """Move the window forward to end at bucket, subtracting the buckets that fall out"""
+        first = max(self._current + 1, bucket - self.window_buckets + 1)
+        for expiring in range(first, bucket + 1):
+            slot = expiring % self.window_buckets
+            weights = self._buckets[slot]
+            if weights:
+                growth = self._growth(self._bucket_ids[slot])
+                for product_id, weight in weights.items():
+                    remaining = self._live_buckets[product_id] - 1
+                    if remaining:
+                        self._live_buckets[product_id] = remaining
+                        self._scores[product_id] -= weight * growth
+                    else:
+                        del self._live_buckets[product_id]
+                        del self._scores[product_id]
+                    self._dirty.add(product_id)
+                self._buckets[slot] = {}
+            self._bucket_ids[slot] = expiring
+        self._current = bucket
+
+        # Keep exp() in range: move the landmark up and rescale once scores grow ~e^50
+        if self.rate * (bucket - self._landmark) > 50:
+            shrink = 1.0 / self._growth(bucket)
+            self._scores = {product_id: score * shrink for product_id, score in self._scores.items()}
+            self._landmark = bucket
+            self._dirty = set(self._scores)
+
+    def _load(self):
+        """Rebuild the window from the interactions table"""
+        now_bucket = self._bucket_at(time.time())
+        self._reset(now_bucket)
+        start = EPOCH + timedelta(seconds=(now_bucket - self.window_buckets + 1) * self.bucket_seconds)
+        bucket = _bucket_expression(self.bucket_seconds)
+        rows = db.session.query(
+            Interaction.product_id, Interaction.interaction_type, bucket, func.count(Interaction.id)
+        ).filter(Interaction.timestamp >= start).group_by(
+            Interaction.product_id, Interaction.interaction_type, bucket
+        )
+        for product_id, interaction_type, row_bucket, count in rows:
+            self._add(product_id, self.weights.get(interaction_type, 0) * count, min(int(row_bucket), now_bucket))
+        self._categories = dict(db.session.query(Product.id, Product.category))
+        self._loaded_at = time.monotonic()
+        self.reloads += 1
+
+    def _flush_dirty(self):
+        """Push changed products into the heaps"""
+        unknown = [product_id for product_id in self._dirty if product_id not in self._categories]
+        for start in range(0, len(unknown), 500):
+            self._categories.update(db.session.query(Product.id, Product.category).filter(
+                Product.id.in_(unknown[start:start + 500])
+            ))
+
+        # After a reload or a rescale, or once stale entries outnumber live ones, heapify from scratch
+        if 2 * len(self._dirty) > len(self._scores) or len(self._heaps[None]) > 2 * len(self._scores) + 1024:
+            self._heaps = {None: [(-score, product_id) for product_id, score in self._scores.items()]}
+            for entry in self._heaps[None]:
+                category = self._categories.get(entry[1])
+                if category is not None:
+                    self._heaps.setdefault(category, []).append(entry)
+            for heap in self._heaps.values():
+                heapq.heapify(heap)
+        else:
+            for product_id in self._dirty:
+                score = self._scores.get(product_id)
+                if score is None:
+                    continue
+                entry = (-score, product_id)
+                heapq.heappush(self._heaps[None], entry)
+                category = self._categories.get(product_id)
+                if category is not None:
+                    heapq.heappush(self._heaps.setdefault(category, []), entry)
+        self._dirty.clear()
+
+    def top(self, limit, category=None, exclude_product_ids=()):
+        """Return up to limit (product_id, score) pairs by trending score, overall or within a category"""
+        exclude_product_ids = set(exclude_product_ids)
+        with self._lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at > self.reload_interval:
+                self._load()
+            now_bucket = self._bucket_at(time.time())
+            if now_bucket > self._current:
+                self._advance(now_bucket)
+            self._flush_dirty()
+
+            heap = self._heaps.get(category, [])
+            results, valid, seen = [], [], set()
+            while heap and len(results) < limit:
+                entry = heapq.heappop(heap)
+                negative_score, product_id = entry
+                if product_id in seen or self._scores.get(product_id) != -negative_score:
+                    continue  # superseded by a newer entry for the product, or expired
+                seen.add(product_id)
+                valid.append(entry)
+                if product_id not in exclude_product_ids:
+                    results.append((product_id, -negative_score))
+            for entry in valid:
+                heapq.heappush(heap, entry)
+            # Scores are stored relative to the landmark; report them as of now
+            scale = 1.0 / self._growth(self._current)
+        return [(product_id, score * scale) for product_id, score in results]
+
+    def record_interaction(self, interaction):
+        """Add one committed interaction to its bucket"""
+        weight = self.weights.get(interaction.interaction_type, 0)
+        timestamp = interaction.timestamp or datetime.utcnow()
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            bucket = self._bucket_at((timestamp - EPOCH).total_seconds())
+            self._add(interaction.product_id, weight, min(bucket, self._bucket_at(time.time())))
+            self.updates += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def stats(self):
+        """Window, decay and heap counters"""
+        with self._lock:
+            return {
+                'bucket_seconds': self.bucket_seconds,
+                'window_buckets': self.window_buckets,
+                'half_life_hours': round(math.log(2) * self.bucket_seconds / self.rate / 3600, 3),
+                'weights': self.weights,
+                'products': len(self._scores),
+                'categories': len(self._heaps) - 1,
+                'heap_entries': len(self._heaps[None]),
+                'pending_products': len(self._dirty),
+                'updates': self.updates,
+                'reloads': self.reloads,
+                'age_seconds': round(time.monotonic() - self._loaded_at, 3) if self._loaded_at else None
+            }
+
+# Shared process-wide scores, kept current by Interaction.create_interaction and bulk_create
+_trending_service = TrendingService(
+    bucket_seconds=Config.TRENDING_BUCKET_SECONDS,
+    window_buckets=Config.TRENDING_WINDOW_BUCKETS,
+    half_life_hours=Config.TRENDING_HALF_LIFE_HOURS,
+    reload_interval=Config.TRENDING_RELOAD_INTERVAL
+)
+on_interaction_created(_trending_service.record_interaction)
+
+def get_trending_service():
+    return _trending_service
@@ -0,0 +1,184 @@
+import threading
+import time
+import logging
+import numpy as np
+from config import Config
+from models import db, Interaction, on_interaction_created
+from sqlalchemy import func
+from .collaborative import SparseCollaborativeFilter
+
+logger = logging.getLogger(__name__)
+
+class UserItemModel:
+    """Long-lived user-item model kept current by applying each new interaction as a delta.
+
+    sync() compares only the highest interaction id with the table, an index
+    seek, and catches up on rows past it. Deleted rows or ids committed out of
+    order are not visible to that check, so every verify_interval seconds the
+    row count is compared as well and a mismatch triggers a full rebuild.
+    """
+
+    def __init__(self, like_threshold=4, chunk_size=10000, verify_interval=300.0):
+        self.like_threshold = like_threshold
+        self.chunk_size = chunk_size
+        self.verify_interval = verify_interval
+        self._lock = threading.RLock()
+        self.loaded = False
+        self._verified_at = None
+        self.reset()
+
+    def reset(self):
+        """Drop all state"""
+        with self._lock:
+            # One slot per rated (user, product) pair, holding the rating sum and count
+            self._pair_slots = {}
+            self._slot_users = []
+            self._slot_products = []
+            self._slot_sums = []
+            self._slot_counts = []
+            self._changed_slots = set()  # slots rated since the collaborative filter was built
+
+            self.user_interaction_counts = {}
+            self.user_liked_products = {}
+
+            self.interaction_count = 0
+            self.max_interaction_id = 0
+            self._collaborative = None
+            self._collaborative_kwargs = None
+
+    def load(self):
+        """Full rebuild from the interactions table"""
+        with self._lock:
+            self.reset()
+            self._load_rows(Interaction.query.order_by(Interaction.id))
+            self.loaded = True
+            self._verified_at = time.monotonic()
+            logger.info(
+                f"User-item model loaded {self.interaction_count} interactions "
+                f"({len(self._pair_slots)} rated pairs)"
+            )
+        return self
+
+    def _load_rows(self, query):
+        rows = query.with_entities(
+            Interaction.id,
+            Interaction.user_id,
+            Interaction.product_id,
+            Interaction.interaction_type,
+            Interaction.rating
+        ).yield_per(self.chunk_size)
+        for interaction_id, user_id, product_id, interaction_type, rating in rows:
+            self._apply(interaction_id, user_id, product_id, interaction_type, rating)
+
+    def apply_interaction(self, interaction):
+        """Apply one committed interaction as a delta when it directly follows the watermark"""
+        with self._lock:
+            # Past a gap, rows committed by another process come first: leave the watermark where it is
+            # and let the next sync load everything after it in id order
+            if not self.loaded or interaction.id != self.max_interaction_id + 1:
+                return
+            self._apply(
+                interaction.id,
+                interaction.user_id,
+                interaction.product_id,
+                interaction.interaction_type,
+                interaction.rating
+            )
+
+    def _apply(self, interaction_id, user_id, product_id, interaction_type, rating):
+        self.interaction_count += 1
+        self.max_interaction_id = max(self.max_interaction_id, interaction_id or 0)
+        self.user_interaction_counts[user_id] = self.user_interaction_counts.get(user_id, 0) + 1
+
+        if rating is None:
+            return
+
+        if rating >= self.like_threshold:
+            self.user_liked_products.setdefault(user_id, set()).add(product_id)
+
+        # The user vector holds the average rating per product
+        slot = self._pair_slots.get((user_id, product_id))
+        if slot is None:
+            slot = len(self._slot_sums)
+            self._pair_slots[(user_id, product_id)] = slot
+            self._slot_users.append(user_id)
+            self._slot_products.append(product_id)
+            self._slot_sums.append(0.0)
+            self._slot_counts.append(0)
+
+        self._slot_sums[slot] += rating
+        self._slot_counts[slot] += 1
+        self._changed_slots.add(slot)
+
+    def sync(self):
+        """Consistency check against the table's id watermark, catching up or rebuilding as needed"""
+        with self._lock:
+            if not self.loaded:
+                return self.load()
+
+            max_id = db.session.query(func.max(Interaction.id)).scalar() or 0
+            if max_id < self.max_interaction_id:
+                logger.warning(
+                    f"User-item model ahead of the table (id {self.max_interaction_id} vs {max_id}), rebuilding"
+                )
+                return self.load()
+
+            # Rows written elsewhere (another worker, a script) past our watermark
+            if max_id > self.max_interaction_id:
+                self._load_rows(Interaction.query.filter(
+                    Interaction.id > self.max_interaction_id
+                ).order_by(Interaction.id))
+
+            if time.monotonic() - self._verified_at > self.verify_interval:
+                count = db.session.query(func.count(Interaction.id)).scalar()
+                if count != self.interaction_count:
+                    logger.warning(
+                        f"User-item model out of sync ({self.interaction_count} vs {count} interactions), rebuilding"
+                    )
+                    return self.load()
+                self._verified_at = time.monotonic()
+            return self
+
+    def collaborative_filter(self, **kwargs):
+        """Sparse collaborative filter over the current averaged ratings, patched with the pairs rated since"""
+        with self._lock:
+            # Patching costs a copy of the matrix plus the changed pairs; past a tenth of all pairs, rebuild
+            rebuild = (self._collaborative is None or self._collaborative_kwargs != kwargs
+                       or 10 * len(self._changed_slots) > len(self._slot_sums))
+            if rebuild:
+                ratings = np.divide(
+                    np.asarray(self._slot_sums, dtype=np.float32),
+                    np.asarray(self._slot_counts, dtype=np.float32)
+                ) if self._slot_sums else np.empty(0, dtype=np.float32)
+                self._collaborative = SparseCollaborativeFilter.from_arrays(
+                    self._slot_users, self._slot_products, ratings, **kwargs
+                )
+                self._collaborative_kwargs = kwargs
+            elif self._changed_slots:
+                slots = sorted(self._changed_slots)
+                self._collaborative = self._collaborative.with_ratings(
+                    [self._slot_users[slot] for slot in slots],
+                    [self._slot_products[slot] for slot in slots],
+                    [self._slot_sums[slot] / self._slot_counts[slot] for slot in slots]
+                )
+            self._changed_slots.clear()
+            return self._collaborative
+
+    def interaction_count_for(self, user_id):
+        return self.user_interaction_counts.get(user_id, 0)
+
+    def liked_products(self, user_id):
+        """Products the user has rated at or above the like threshold"""
+        return sorted(self.user_liked_products.get(user_id, ()))
+
+# Shared process-wide model, fed by Interaction.create_interaction
+_user_item_model = UserItemModel(verify_interval=Config.USER_ITEM_VERIFY_INTERVAL)
+on_interaction_created(_user_item_model.apply_interaction)
+
+def get_user_item_model():
+    """Return the shared model, loading it on first use"""
+    if not _user_item_model.loaded:
+        with _user_item_model._lock:
+            if not _user_item_model.loaded:
+                _user_item_model.load()
+    return _user_item_model
@@ -0,0 +1,45 @@
+import threading
+import time
+import logging
+from models import db
+
+logger = logging.getLogger(__name__)
+
+WARMUP_MODES = ('off', 'background', 'blocking')
+
+def warm_up(app):
+    """Import the recommendation stack and load the shared models ahead of the first request"""
+    start = time.perf_counter()
+    with app.app_context():
+        # numpy, scipy, sklearn and pandas come in with these
+        from .recommendation_engine import RecommendationEngine  # noqa: F401
+        from .ingest import ingest_interactions  # noqa: F401
+        from .content_index import get_content_index
+        from .user_item_model import get_user_item_model
+        from .matrix_factorization import get_mf_model
+
+        get_user_item_model()
+        get_content_index()
+        get_mf_model()
+        if app.config['POPULAR_RANKING'] == 'trending':
+            from .trending import get_trending_service
+            get_trending_service().top(1)
+        db.session.remove()
+    logger.info(f"Warm-up finished in {time.perf_counter() - start:.2f}s")
+
+def _warm_up_safely(app):
+    try:
+        warm_up(app)
+    except Exception as e:
+        # Everything warm-up loads is loaded again on first use, so a failure only costs latency
+        logger.warning(f"Warm-up failed: {e}")
+
+def init_warmup(app):
+    """Warm up per WARMUP: not at all, in a background thread, or before create_app returns"""
+    mode = app.config['WARMUP']
+    if mode not in WARMUP_MODES:
+        raise ValueError(f"Invalid WARMUP. Must be one of: {list(WARMUP_MODES)}")
+    if mode == 'background':
+        threading.Thread(target=_warm_up_safely, args=(app,), name='warmup', daemon=True).start()
+    elif mode == 'blocking':
+        _warm_up_safely(app)
@@ -0,0 +1,395 @@
+import atexit
+import fcntl
+import glob
+import json
+import os
+import threading
+import time
+import logging
+from datetime import datetime
+from models import db, Interaction
+
+logger = logging.getLogger(__name__)
+
+DURABILITY_MODES = ('memory', 'journal', 'fsync')
+
+class InteractionWriteBuffer:
+    """In-process write-behind buffer for low-value interaction types.
+
+    Events are flushed in bulk through Interaction.bulk_create when the buffer
+    reaches flush_size or every flush_interval seconds. Durability:
+      - memory:  buffered events are lost if the process dies before a flush
+      - journal: each event is appended to a journal file of this process
+                 (journal_path.<pid>); journals left by processes that died
+                 are replayed on startup (at-least-once; a crash between
+                 commit and journal cleanup can replay a flushed batch).
+                 If the database is down at startup the journals are kept
+                 and the flusher retries the replay every flush_interval
+      - fsync:   like journal, with an fsync per event
+    Each process holds an flock on journal_path.<pid>.lock while it runs, so
+    a starting worker only replays journals whose owner is gone.
+    When the buffer is full, put() waits up to block_timeout for a flush and
+    then returns False so the caller writes synchronously instead.
+
+    A batch that fails while the database is reachable is split in halves
+    until the rejected rows are isolated; the rest is written. Rejected rows
+    are retried one at a time on later flushes and dropped, with an error
+    log, after max_attempts. When the database itself is down, the whole
+    batch is kept for the next flush.
+    """
+
+    def __init__(self, app, types=('view', 'click'), max_size=10000, flush_size=500,
+                 flush_interval=1.0, block_timeout=0.5, durability='memory', journal_path=None, max_attempts=3):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"durability must be one of {DURABILITY_MODES}")
+        if durability != 'memory' and not journal_path:
+            raise ValueError("journal_path is required for journal durability")
+
+        self.app = app
+        self.types = set(types)
+        self.max_size = max_size
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.block_timeout = block_timeout
+        self.max_attempts = max_attempts
+        self.durability = durability
+        self.journal_base = journal_path
+        self.journal_path = f"{journal_path}.{os.getpid()}" if journal_path else None
+
+        self._buffer = []
+        self._retry = []  # (row, failed attempts) for rows the database rejected
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._journal = None
+        self._journal_lock = None
+        self._journal_seq = 0
+        self._replay_pending = False
+        self._thread = None
+        self._running = False
+
+        self.buffered = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.flush_failures = 0
+        self.rejected = 0
+        self.dropped = 0
+        self.sync_fallbacks = 0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self.total_flush_seconds = 0.0
+
+    def accepts(self, interaction_type):
+        return self._running and interaction_type in self.types
+
+    def start(self):
+        if self.durability != 'memory':
+            directory = os.path.dirname(self.journal_base)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # One starting process at a time, so none takes another's fresh journal for an orphan
+            with open(f"{self.journal_base}.lock", 'a') as replay_lock:
+                fcntl.flock(replay_lock, fcntl.LOCK_EX)
+                self._replay_pending = not self._replay_journals()
+                self._journal_lock = open(f"{self.journal_path}.lock", 'a')
+                fcntl.flock(self._journal_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                self._journal = open(self.journal_path, 'a')
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='interaction-write-behind', daemon=True)
+        self._thread.start()
+        logger.info(f"Write-behind buffer started for {sorted(self.types)} ({self.durability} durability)")
+        return self
+
+    def stop(self):
+        """Stop the flusher and write out everything still buffered"""
+        with self._condition:
+            if not self._running:
+                return
+            self._running = False
+            self._condition.notify_all()
+        self._thread.join()
+        self.flush()
+        if self._journal:
+            self._journal.close()
+            self._journal = None
+            if not self._buffer and not self._retry:
+                # Removed before unlocking, so no starting worker sees the lock free while the journal remains;
+                # with events left, the lock file stays and the next start replays the journal as an orphan
+                os.remove(self.journal_path)
+                os.remove(f"{self.journal_path}.lock")
+            self._journal_lock.close()
+            self._journal_lock = None
+
+    def put(self, user_id, product_id, interaction_type, rating=None):
+        """Buffer an event; returns False if the buffer stayed full and the caller must write it"""
+        row = {
+            'user_id': user_id,
+            'product_id': product_id,
+            'interaction_type': interaction_type,
+            'rating': rating,
+            'timestamp': datetime.utcnow()
+        }
+        deadline = time.monotonic() + self.block_timeout
+        with self._condition:
+            while len(self._buffer) >= self.max_size:
+                self._condition.notify_all()  # wake the flusher
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._running:
+                    self.sync_fallbacks += 1
+                    return False
+                self._condition.wait(remaining)
+
+            self._buffer.append(row)
+            self._write_journal([row])
+            self.buffered += 1
+            if len(self._buffer) >= self.flush_size:
+                self._condition.notify_all()
+        return True
+
+    def _run(self):
+        while True:
+            with self._condition:
+                # Other notifications (a flush freeing space) do not end the wait, so rejected rows
+                # are retried at most once per interval
+                deadline = time.monotonic() + self.flush_interval
+                while self._running and len(self._buffer) < self.flush_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                if not self._running:
+                    return
+            if self._replay_pending:
+                with open(f"{self.journal_base}.lock", 'a') as replay_lock:
+                    fcntl.flock(replay_lock, fcntl.LOCK_EX)
+                    self._replay_pending = not self._replay_journals()
+            self.flush()
+
+    def flush(self):
+        """Write the buffered events in one transaction, isolating rows the database rejects"""
+        with self._flush_lock:
+            with self._condition:
+                if not self._buffer and not self._retry:
+                    return 0
+                batch, self._buffer = self._buffer, []
+                retry, self._retry = self._retry, []
+                flushing_path = self._rotate_journal()
+                self._condition.notify_all()  # space freed for blocked producers
+
+            started = time.monotonic()
+            rejected = []
+            error = self._insert(batch)
+            if error is not None and not self._database_available():
+                logger.error(f"Write-behind flush of {len(batch)} events failed: {error}")
+                with self._condition:
+                    self.flush_failures += 1
+                    # Keep the events for the next attempt, oldest first
+                    self._buffer = batch + self._buffer
+                    self._retry = retry + self._retry
+                    self._write_journal(batch + [row for row, _ in retry])
+                if flushing_path:
+                    os.remove(flushing_path)
+                return 0
+
+            inserted = len(batch)
+            if error is not None:
+                with self._condition:
+                    self.flush_failures += 1
+                middle = len(batch) // 2
+                inserted = (self._insert_isolating(batch[:middle], rejected)
+                            + self._insert_isolating(batch[middle:], rejected))
+                logger.warning(f"Write-behind flush of {len(batch)} events failed ({error}); "
+                               f"{len(rejected)} rejected after splitting")
+            rejected = [(row, 1, row_error) for row, row_error in rejected]
+
+            # Rows rejected by earlier flushes go one at a time, so they cannot fail a batch again
+            for row, attempts in retry:
+                row_error = self._insert([row])
+                if row_error is None:
+                    inserted += 1
+                else:
+                    rejected.append((row, attempts + 1, row_error))
+
+            kept = []
+            for row, attempts, row_error in rejected:
+                if attempts >= self.max_attempts:
+                    logger.error(f"Dropping write-behind event after {attempts} failed attempts: {row} ({row_error})")
+                else:
+                    kept.append((row, attempts))
+
+            elapsed = time.monotonic() - started
+            with self._condition:
+                self._retry = kept + self._retry
+                self._write_journal([row for row, _ in kept])
+                self.rejected += len(rejected)
+                self.dropped += len(rejected) - len(kept)
+                self.flushes += 1
+                self.flushed += inserted
+                self.last_flush_seconds = elapsed
+                self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+                self.total_flush_seconds += elapsed
+            if flushing_path:
+                os.remove(flushing_path)
+            return inserted
+
+    def _insert(self, rows):
+        """Insert rows in one transaction; returns the error, or None on success"""
+        if not rows:
+            return None
+        try:
+            with self.app.app_context():
+                try:
+                    Interaction.bulk_create(rows)
+                finally:
+                    db.session.remove()
+        except Exception as e:
+            return e
+        return None
+
+    def _insert_isolating(self, rows, rejected):
+        """Insert rows, halving failed batches down to single rows; returns how many were written"""
+        error = self._insert(rows)
+        if error is None:
+            return len(rows)
+        if len(rows) == 1:
+            rejected.append((rows[0], error))
+            return 0
+        middle = len(rows) // 2
+        return self._insert_isolating(rows[:middle], rejected) + self._insert_isolating(rows[middle:], rejected)
+
+    def _database_available(self):
+        """Whether a failed batch points at the rows (database up) rather than at the database"""
+        try:
+            with self.app.app_context():
+                try:
+                    db.session.execute(db.select(1))
+                finally:
+                    db.session.remove()
+        except Exception:
+            return False
+        return True
+
+    def _write_journal(self, rows):
+        if not self._journal:
+            return
+        for row in rows:
+            self._journal.write(json.dumps({**row, 'timestamp': row['timestamp'].isoformat()}) + '\n')
+        self._journal.flush()
+        if self.durability == 'fsync':
+            os.fsync(self._journal.fileno())
+
+    def _rotate_journal(self):
+        """Move the live journal aside for the batch being flushed (caller holds the condition)"""
+        if not self._journal:
+            return None
+        self._journal.close()
+        self._journal_seq += 1
+        flushing_path = f"{self.journal_path}.{self._journal_seq}.flushing"
+        os.replace(self.journal_path, flushing_path)
+        self._journal = open(self.journal_path, 'a')
+        return flushing_path
+
+    def _orphaned_journals(self):
+        """Journal files of processes that no longer hold their lock (caller holds the replay lock)"""
+        paths = []
+        for lock_path in glob.glob(f"{self.journal_base}.*.lock"):
+            journal = lock_path[:-len('.lock')]
+            with open(lock_path, 'a') as lock:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue  # a live process owns it
+            paths += sorted(glob.glob(f"{journal}.*.flushing"), key=lambda path: int(path.split('.')[-2]))
+            if os.path.exists(journal):
+                paths.append(journal)
+            paths.append(lock_path)
+        return paths
+
+    def _replay_journals(self):
+        """Insert events left behind by processes that died, then remove their journals.
+
+        Returns False, keeping the journals, when the database cannot be reached.
+        """
+        paths = self._orphaned_journals()
+
+        rows = []
+        for path in paths:
+            if path.endswith('.lock'):
+                continue
+            with open(path) as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        row = json.loads(line)
+                    except ValueError:
+                        continue  # torn final line from a crash mid-write
+                    row['timestamp'] = datetime.fromisoformat(row['timestamp'])
+                    rows.append(row)
+
+        rejected = []
+        if rows:
+            error = self._insert(rows)
+            if error is not None:
+                if not self._database_available():
+                    logger.error(f"Replay of {len(rows)} journaled interactions failed, keeping the journals "
+                                 f"for a retry: {error}")
+                    return False
+                # Keep one bad row from blocking startup: write the rest and log what is dropped
+                middle = len(rows) // 2
+                self._insert_isolating(rows[:middle], rejected)
+                self._insert_isolating(rows[middle:], rejected)
+                for row, row_error in rejected:
+                    logger.error(f"Dropping journaled event the database rejected: {row} ({row_error})")
+            logger.info(f"Replayed {len(rows) - len(rejected)} journaled interactions")
+        for path in paths:
+            os.remove(path)
+        return True
+
+    def stats(self):
+        """Buffer depth and flush latency metrics"""
+        with self._condition:
+            return {
+                'running': self._running,
+                'types': sorted(self.types),
+                'durability': self.durability,
+                'replay_pending': self._replay_pending,
+                'depth': len(self._buffer),
+                'max_size': self.max_size,
+                'flush_size': self.flush_size,
+                'flush_interval_seconds': self.flush_interval,
+                'buffered': self.buffered,
+                'flushed': self.flushed,
+                'flushes': self.flushes,
+                'flush_failures': self.flush_failures,
+                'retrying': len(self._retry),
+                'rejected': self.rejected,
+                'dropped': self.dropped,
+                'sync_fallbacks': self.sync_fallbacks,
+                'last_flush_seconds': round(self.last_flush_seconds, 4),
+                'max_flush_seconds': round(self.max_flush_seconds, 4),
+                'average_flush_seconds': round(self.total_flush_seconds / self.flushes, 4) if self.flushes else 0.0
+            }
+
+_write_buffer = None
+
+def get_write_buffer():
+    """Return the shared buffer, or None when write-behind is disabled"""
+    return _write_buffer
+
+def init_write_buffer(app):
+    """Start the write-behind buffer if enabled in the config"""
+    global _write_buffer
+    if _write_buffer is None and app.config['WRITE_BEHIND_ENABLED']:
+        _write_buffer = InteractionWriteBuffer(
+            app,
+            types=app.config['WRITE_BEHIND_TYPES'],
+            max_size=app.config['WRITE_BEHIND_MAX_SIZE'],
+            flush_size=app.config['WRITE_BEHIND_FLUSH_SIZE'],
+            flush_interval=app.config['WRITE_BEHIND_FLUSH_INTERVAL'],
+            block_timeout=app.config['WRITE_BEHIND_BLOCK_TIMEOUT'],
+            durability=app.config['WRITE_BEHIND_DURABILITY'],
+            journal_path=app.config['WRITE_BEHIND_JOURNAL'],
+            max_attempts=app.config['WRITE_BEHIND_MAX_ATTEMPTS']
+        ).start()
+        atexit.register(_write_buffer.stop)
+    return _write_buffer
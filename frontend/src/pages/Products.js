@@ -27,7 +27,7 @@ const Products = () => {
   const loadProducts = async () => {
     setLoading(true);
     try {
-      const params = selectedCategory ? { category: selectedCategory } : {};
+      const params = selectedCategory ? { category: selectedCategory, category_match: 'exact' } : {};
       const response = await getProducts(params);
       setProducts(response.data.products);
     } catch (error) {